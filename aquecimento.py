@@ -0,0 +1,76 @@
+"""
+Aquecimento do servidor após a partida.
+
+Os módulos pesados (scipy.signal, scipy.optimize, scipy.io e matplotlib)
+são importados sob demanda, o que deixa a partida rápida, mas transfere o
+custo para a primeira requisição que os usa. Essa requisição também paga
+as inicializações da primeira chamada: o cache de fontes do matplotlib, as
+figuras pré-montadas de cada thread e as tabelas do filtro Savitzky-Golay.
+
+Com AQUECIMENTO=1, aquecer() roda em cada worker do pool de execução
+durante a partida, antes de o servidor aceitar requisições, de modo que as
+primeiras não esperem atrás dele na fila do pool. Ele importa os módulos
+e exercita a filtragem, a identificação, a simulação e a renderização com
+um ensaio sintético pequeno.
+"""
+import os
+import time
+import importlib
+
+import numpy as np
+
+AQUECIMENTO_HABILITADO = os.environ.get("AQUECIMENTO", "0") == "1"
+
+
+def aquecer():
+    """
+    Executa os caminhos de cálculo com dados sintéticos. Retorna a duração
+    (s) de cada etapa.
+    """
+    duracoes = {}
+    inicio = time.perf_counter()
+
+    def marcar(nome):
+        nonlocal inicio
+        agora = time.perf_counter()
+        duracoes[nome] = agora - inicio
+        inicio = agora
+
+    # Módulos usados só dentro das funções (ingestão do .mat v5 e mínimos quadrados)
+    importlib.import_module("scipy.io")
+    importlib.import_module("scipy.optimize")
+    from scipy.signal import savgol_filter
+    from filtros import recomendar_filtro
+    from identificacao import identificar_sinais
+    from metricas import calc_metricas
+    from renderizacao import grafico_resposta
+    from simulacao import resposta_degrau
+    from sintonia import sintonia_imc, sintonia_itae
+    marcar("imports")
+
+    # Ensaio ao degrau sintético: k = 2, tau = 20, theta = 5
+    rng = np.random.default_rng(0)
+    t = np.arange(600, dtype=float)
+    entrada = np.where(t >= 50, 1.0, 0.0)
+    saida = 2.0 * np.clip(1 - np.exp(-(t - 55) / 20), 0, None) + rng.normal(0, 0.02, len(t))
+
+    y = savgol_filter(saida, window_length=31, polyorder=3)
+    recomendar_filtro(saida)
+    marcar("filtro")
+
+    for metodo in ("smith", "least_squares"):
+        identificar_sinais(t, saida, y, entrada, metodo, 5.0)
+    marcar("identificacao")
+
+    kp_imc, ti_imc, td_imc = sintonia_imc(2.0, 20.0, 5.0, 1.0)
+    kp_itae, ti_itae, td_itae = sintonia_itae(2.0, 20.0, 5.0)
+    t_sim = np.linspace(0, 100, 500)
+    y_imc = resposta_degrau(2.0, 20.0, 5.0, kp_imc, ti_imc, td_imc, t_sim)
+    y_lote = resposta_degrau(2.0, 20.0, 5.0, np.array([kp_imc, kp_itae]), np.array([ti_imc, ti_itae]),
+                             np.array([td_imc, td_itae]), t_sim)
+    calc_metricas(t_sim, y_lote)
+    marcar("simulacao")
+
+    grafico_resposta(t_sim, y_imc, t_sim, y_lote[1])
+    marcar("renderizacao")
+    return duracoes
@@ -0,0 +1,330 @@
+"""
+Armazenamento colunar binário dos experimentos.
+
+Cada experimento é salvo em ``datasets/<file_id>.npy`` como uma matriz
+float64 de forma (3, n), uma linha por coluna (tempo, saida, entrada).
+Os endpoints abrem esse arquivo memory-mapped, sem reprocessar texto a
+cada requisição. O CSV fica apenas como exportação opcional.
+
+Os metadados do upload (SHA-256 do arquivo enviado, nome original e resumo
+dos dados) ficam em ``datasets/<file_id>.json``; o índice hash -> file_id
+permite reaproveitar o dataset quando o mesmo arquivo é enviado de novo, e
+a reserva do hash durante a ingestão evita duas cópias do mesmo conteúdo
+em uploads simultâneos.
+
+Migração única dos CSVs existentes:
+
+    python armazenamento.py migrar
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DATASETS_DIR = "datasets"
+COLUNAS = ("tempo", "saida", "entrada")
+
+
+def caminho_dataset(file_id):
+    return f"{DATASETS_DIR}/{file_id}.npy"
+
+
+def caminho_csv(file_id):
+    return f"{DATASETS_DIR}/{file_id}.csv"
+
+
+def caminho_metadados(file_id):
+    return f"{DATASETS_DIR}/{file_id}.json"
+
+
+def dataset_existe(file_id):
+    return os.path.exists(caminho_dataset(file_id)) or os.path.exists(caminho_csv(file_id))
+
+
+def listar_datasets():
+    """
+    file_ids de todos os datasets armazenados (.npy ou CSV ainda não migrado).
+    """
+    ids = set()
+    for nome in os.listdir(DATASETS_DIR):
+        raiz, ext = os.path.splitext(nome)
+        if ext in (".npy", ".csv"):
+            ids.add(raiz)
+    return sorted(ids)
+
+
+def _temporario(path):
+    # Nome único por processo e thread: gravações simultâneas do mesmo arquivo
+    # (ex.: a migração de um CSV lido por dois workers) não se misturam
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def salvar_dataset(file_id, tempo, saida, entrada):
+    """
+    Grava as três colunas como float64 em um único .npy (escrita atômica).
+    """
+    dados = np.vstack([
+        np.asarray(tempo, dtype=np.float64).ravel(),
+        np.asarray(saida, dtype=np.float64).ravel(),
+        np.asarray(entrada, dtype=np.float64).ravel(),
+    ])
+    path = caminho_dataset(file_id)
+    tmp_path = _temporario(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, dados)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def salvar_dataset_em_blocos(file_id, n, blocos):
+    """
+    Grava o dataset a partir de blocos (tempo, saida, entrada), sem montar as
+    colunas inteiras em memória. n é o número total de amostras.
+    """
+    path = caminho_dataset(file_id)
+    tmp_path = _temporario(path)
+    dados = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(len(COLUNAS), n))
+    try:
+        inicio = 0
+        for bloco in blocos:
+            m = len(bloco[0])
+            if inicio + m > n:
+                raise ValueError(f"O arquivo tem mais amostras que as {n} esperadas")
+            for i, coluna in enumerate(bloco):
+                dados[i, inicio:inicio + m] = coluna
+            inicio += m
+        if inicio != n:
+            raise ValueError(f"Esperadas {n} amostras, mas foram lidas {inicio}")
+        dados.flush()
+    except Exception:
+        del dados
+        os.remove(tmp_path)
+        raise
+    del dados
+    os.replace(tmp_path, path)
+    return path
+
+
+def carregar_dataset(file_id):
+    """
+    Retorna (tempo, saida, entrada) como visões memory-mapped somente leitura.
+    Datasets ainda em CSV são convertidos na primeira leitura.
+    """
+    path = caminho_dataset(file_id)
+    if not os.path.exists(path):
+        if not os.path.exists(caminho_csv(file_id)):
+            raise FileNotFoundError(path)
+        migrar_csv(file_id)
+    dados = np.load(path, mmap_mode="r")
+    return dados[0], dados[1], dados[2]
+
+
+def salvar_metadados(file_id, metadados):
+    path = caminho_metadados(file_id)
+    tmp_path = _temporario(path)
+    with open(tmp_path, "w") as f:
+        json.dump(metadados, f)
+    os.replace(tmp_path, path)
+    return metadados
+
+
+def carregar_metadados(file_id):
+    try:
+        with open(caminho_metadados(file_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def hash_arquivo(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while bloco := f.read(1024 * 1024):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+# Índice hash -> file_id em memória, completado incrementalmente: só os
+# metadados ainda não lidos são abertos, e nada é relido se o diretório não mudou
+_indice_hash = {}
+_metadados_lidos = set()
+_mtime_diretorio = None
+_lock_indice = threading.Lock()
+# Sem fcntl, as reservas e as migrações são travadas só neste processo
+_lock_reservas = threading.Lock()
+_lock_migracao = threading.Lock()
+
+
+def _atualizar_indice():
+    # Lê os metadados novos (outros processos podem ter registrado uploads) e
+    # calcula o hash dos .mat antigos que ainda não têm metadados
+    global _mtime_diretorio
+    mtime = os.stat(DATASETS_DIR).st_mtime_ns
+    if mtime == _mtime_diretorio:
+        return
+    _mtime_diretorio = mtime
+    for nome in sorted(os.listdir(DATASETS_DIR)):
+        file_id, ext = os.path.splitext(nome)
+        if ext == ".json" and file_id not in _metadados_lidos:
+            sha256 = carregar_metadados(file_id).get("sha256")
+            if sha256:
+                _indice_hash.setdefault(sha256, file_id)
+            _metadados_lidos.add(file_id)
+        elif ext == ".mat" and dataset_existe(file_id) and not os.path.exists(caminho_metadados(file_id)):
+            sha256 = hash_arquivo(f"{DATASETS_DIR}/{nome}")
+            salvar_metadados(file_id, {"sha256": sha256, "filename": nome})
+            _indice_hash.setdefault(sha256, file_id)
+            _metadados_lidos.add(file_id)
+
+
+def buscar_por_hash(sha256):
+    """
+    file_id de um dataset existente enviado com o mesmo conteúdo, ou None.
+    """
+    with _lock_indice:
+        file_id = _indice_hash.get(sha256)
+        if file_id is None:
+            _atualizar_indice()
+            file_id = _indice_hash.get(sha256)
+        if file_id is not None and not dataset_existe(file_id):
+            del _indice_hash[sha256]
+            return None
+        return file_id
+
+
+def registrar_upload(file_id, sha256, **metadados):
+    with _lock_indice:
+        salvar_metadados(file_id, {"sha256": sha256, "uploaded_at": time.time(), **metadados})
+        _indice_hash[sha256] = file_id
+        _metadados_lidos.add(file_id)
+
+
+def _travar(nome, lock):
+    """
+    Trava exclusiva entre os processos do servidor (flock em
+    datasets/.reservas/<nome>), ou, sem fcntl, o lock dado, só entre as
+    threads deste processo. Bloqueia; retorna o objeto a passar a _destravar().
+    """
+    if fcntl is None:
+        lock.acquire()
+        return lock
+    # Em um subdiretório, para não alterar o mtime de datasets/ (ver _atualizar_indice)
+    os.makedirs(f"{DATASETS_DIR}/.reservas", exist_ok=True)
+    path = f"{DATASETS_DIR}/.reservas/{nome}"
+    while True:
+        trava = open(path, "a")
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        # Removido por quem liberou enquanto esperávamos: travar o arquivo novo
+        try:
+            if os.fstat(trava.fileno()).st_ino == os.stat(path).st_ino:
+                return trava
+        except FileNotFoundError:
+            pass
+        trava.close()
+
+
+def _destravar(trava):
+    if fcntl is None:
+        trava.release()
+        return
+    try:
+        os.remove(trava.name)
+    finally:
+        trava.close()
+
+
+def reservar_hash(sha256):
+    """
+    Reserva o conteúdo até liberar_hash(): um upload simultâneo do mesmo
+    arquivo, neste ou em outro processo do servidor, espera aqui e depois
+    encontra o dataset registrado por buscar_por_hash, em vez de ingerir
+    uma segunda cópia. Bloqueia; retorna o objeto a passar a liberar_hash().
+    """
+    return _travar(f"{sha256}.lock", _lock_reservas)
+
+
+def liberar_hash(trava):
+    _destravar(trava)
+
+
+def exportar_csv(file_id, destino=None):
+    """
+    Exporta o dataset para CSV (tempo,saida,entrada). Sem destino, retorna o texto.
+    """
+    import pandas as pd
+
+    tempo, saida, entrada = carregar_dataset(file_id)
+    df = pd.DataFrame({"tempo": tempo, "saida": saida, "entrada": entrada})
+    if destino is None:
+        return df.to_csv(index=False)
+    df.to_csv(destino, index=False)
+    return destino
+
+
+def migrar_csv(file_id):
+    """
+    Converte o CSV do dataset para .npy. Leituras simultâneas do mesmo
+    dataset antigo (threads, workers do pool ou outro processo) migram uma
+    vez só: as demais esperam a trava e encontram o .npy pronto.
+    """
+    import pandas as pd
+
+    trava = _travar(f"{file_id}.migracao.lock", _lock_migracao)
+    try:
+        path = caminho_dataset(file_id)
+        if os.path.exists(path):
+            return path
+        df = pd.read_csv(caminho_csv(file_id))
+        return salvar_dataset(
+            file_id,
+            df.iloc[:, 0].values,
+            df.iloc[:, 1].values,
+            df.iloc[:, 2].values,
+        )
+    finally:
+        _destravar(trava)
+
+
+def migrar_csvs():
+    """
+    Converte todos os datasets/*.csv que ainda não têm .npy correspondente.
+    """
+    migrados = []
+    for nome in sorted(os.listdir(DATASETS_DIR)):
+        if not nome.endswith(".csv"):
+            continue
+        file_id = nome[:-len(".csv")]
+        if os.path.exists(caminho_dataset(file_id)):
+            continue
+        try:
+            migrar_csv(file_id)
+            migrados.append(file_id)
+        except Exception as e:
+            logger.error(f"Erro ao migrar {nome}: {str(e)}")
+    return migrados
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "migrar":
+        print("Uso: python armazenamento.py migrar")
+        sys.exit(1)
+    migrados = migrar_csvs()
+    print(f"{len(migrados)} datasets migrados para .npy")
@@ -1,27 +1,134 @@
 import os
 import sys
+import time
 import logging
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
 import numpy as np
 from io import StringIO
-from scipy.io import loadmat
-from control import tf, pade, feedback, series, step_response
-import matplotlib.pyplot as plt
 import uuid
-from scipy.signal import savgol_filter
+import hashlib
 import json
-from fastapi.staticfiles import StaticFiles
+import asyncio
+from armazenamento import (
+    DATASETS_DIR, dataset_existe, listar_datasets, carregar_dataset, exportar_csv,
+    buscar_por_hash, carregar_metadados, registrar_upload, reservar_hash, liberar_hash
+)
+from ingestao import FORMATOS_UPLOAD, ingerir
+import cache_sinais
+import memoria_compartilhada
+from cache_sinais import obter_sinais, obter_suavizado, obter_filtro_recomendado
+from filtros import CRITERIOS, avaliar_filtros, grade_padrao, recomendar_filtro
+from identificacao import METODOS, ErroIdentificacao, identificar_dataset, simular_modelo
+import execucao
+from execucao import executar, encerrar
+from simulacao import resposta_degrau
+from sintonia import sintonia_imc, sintonia_itae
+from metricas import calc_metricas
+from incerteza import (
+    PERCENTIS_PADRAO, amostrar_modelos, grade_simulacao, simular_bloco, resumir as resumir_monte_carlo
+)
+from robustez import PONTOS_FREQUENCIA_PADRAO, grade_frequencias, analisar as analisar_robustez
+from otimizacao import OBJETIVOS, otimizar_lambda
+from cache_graficos import (
+    PLOTS_DIR, caminho_grafico, chave_grafico, obter_resultado, salvar_resultado,
+    salvar_imagem, obter_imagem, imutavel, iniciar_coletor, parar_coletor, imagens
+)
+from renderizacao import (
+    FORMATOS_IMAGEM, TIPOS_MIDIA, grafico_dados, grafico_identificacao, grafico_resposta,
+    grafico_varredura, grafico_filtros
+)
+from reducao import PONTOS_MIN, PONTOS_PADRAO, serie
+import jobs
+import catalogo
+import sessoes
+import instrumentacao
+from instrumentacao import etapa
+from identificacao_online import IdentificadorOnline
+from aquecimento import AQUECIMENTO_HABILITADO, aquecer
 
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+async def _aquecer():
+    """
+    Executa aquecimento.aquecer() uma vez por worker do pool. Submetido direto
+    ao pool, fora da contagem de tarefas em andamento de executar().
+    """
+    inicio = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        duracoes = await asyncio.gather(*(
+            loop.run_in_executor(execucao.obter_executor(), aquecer) for _ in range(execucao.EXECUCAO_WORKERS)
+        ))
+    except Exception as e:
+        logger.warning(f"Falha no aquecimento dos workers: {str(e)}")
+        return
+    etapas = ", ".join(f"{nome} {segundos:.2f} s" for nome, segundos in duracoes[0].items())
+    logger.info(f"Aquecimento concluído em {time.perf_counter() - inicio:.2f} s ({etapas})")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Coleta periódica de plots/ e datasets/ (ver cache_graficos.py)
+    iniciar_coletor()
+    # Aquecimento dos workers antes de aceitar requisições (ver aquecimento.py)
+    if AQUECIMENTO_HABILITADO:
+        await _aquecer()
+    yield
+    # Encerrar o coletor e os pools de execução e de jobs
+    parar_coletor()
+    encerrar()
+    jobs.encerrar()
+    # Soltar as referências deste processo aos blocos compartilhados (ver memoria_compartilhada.py)
+    memoria_compartilhada.encerrar()
+
+
 # Criar a aplicação FastAPI
-app = FastAPI(title="API de Identificação de Sistemas e Sintonia PID")
+app = FastAPI(title="API de Identificação de Sistemas e Sintonia PID", lifespan=lifespan)
+
+class LimitarUpload:
+    """
+    Rejeita com 413 os corpos do /upload/ acima de UPLOAD_MAX_MB antes que o
+    Starlette grave o multipart inteiro no arquivo temporário: de imediato
+    pelo Content-Length ou, sem ele (transferência chunked), assim que os
+    bytes recebidos passam do limite.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/upload/":
+            await self.app(scope, receive, send)
+            return
+        # Folga para os cabeçalhos do multipart e os demais campos do formulário
+        limite = UPLOAD_MAX_MB * 1024 * 1024 + UPLOAD_FOLGA_BYTES
+        detalhe = f"Arquivo maior que o limite de {UPLOAD_MAX_MB:g} MB"
+        tamanho = dict(scope["headers"]).get(b"content-length")
+        if tamanho is not None and tamanho.isdigit() and int(tamanho) > limite:
+            await JSONResponse(status_code=413, content={"detail": detalhe})(scope, receive, send)
+            return
+        recebidos = 0
+
+        async def receber():
+            nonlocal recebidos
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > limite:
+                    raise HTTPException(status_code=413, detail=detalhe)
+            return mensagem
+
+        await self.app(scope, receber, send)
+
+
+# Registrado antes do CORS e da instrumentação para que o 413 passe por eles
+app.add_middleware(LimitarUpload)
 
 # Configurar CORS para permitir requisições do frontend hospedado no GitHub Pages
 app.add_middleware(
@@ -32,177 +139,483 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Servir a pasta plots como arquivos estáticos
-app.mount("/plots", StaticFiles(directory="plots"), name="plots")
+@app.middleware("http")
+async def medir_requisicao(request: Request, call_next):
+    """
+    Mede as etapas de cada requisição (ver instrumentacao.py): histogramas do
+    /metrics e cabeçalho Server-Timing.
+    """
+    etapas = instrumentacao.iniciar_requisicao(perfil=request.headers.get("x-profile") == "1")
+    inicio = time.perf_counter()
+    response = await call_next(request)
+    rota = request.scope.get("route")
+    response.headers["Server-Timing"] = instrumentacao.finalizar_requisicao(
+        etapas, time.perf_counter() - inicio, request.method,
+        rota.path if rota is not None else "other", response.status_code
+    )
+    response.headers["Timing-Allow-Origin"] = "*"
+    perfil_id = instrumentacao.guardar_perfil()
+    if perfil_id is not None:
+        response.headers["X-Profile-Id"] = perfil_id
+    return response
 
 
-# Diretórios para armazenamento
-DATASETS_DIR = "datasets"
-PLOTS_DIR = "plots"
+# Exportar também um CSV a cada upload (o formato principal é o .npy colunar)
+EXPORTAR_CSV = os.environ.get("EXPORTAR_CSV", "0") == "1"
 os.makedirs(DATASETS_DIR, exist_ok=True)
 os.makedirs(PLOTS_DIR, exist_ok=True)
 
+# Tamanho máximo de um upload (MB) e tamanho dos blocos gravados em disco
+UPLOAD_MAX_MB = float(os.environ.get("UPLOAD_MAX_MB", "512"))
+UPLOAD_BLOCO_BYTES = 1024 * 1024
+UPLOAD_FOLGA_BYTES = 64 * 1024
+
+# Máximo de malhas simuladas em uma varredura de lambda
+MAX_MALHAS_VARREDURA = int(os.environ.get("MAX_MALHAS_VARREDURA", "2000"))
+# Máximo de plantas sorteadas no Monte Carlo e mínimo de plantas por bloco paralelo
+MONTE_CARLO_AMOSTRAS_MAX = int(os.environ.get("MONTE_CARLO_AMOSTRAS_MAX", "20000"))
+MONTE_CARLO_BLOCO_MIN = int(os.environ.get("MONTE_CARLO_BLOCO_MIN", "500"))
+# Máximo de pontos da grade de frequências (e de malhas × pontos retornados no /robustness/)
+MAX_PONTOS_FREQUENCIA = int(os.environ.get("MAX_PONTOS_FREQUENCIA", "200000"))
+
+# Formatos de saída: imagem renderizada (png, webp) ou séries reduzidas (data)
+FORMATOS = FORMATOS_IMAGEM + ("data",)
+
+
+# Etapas numéricas e de renderização, executadas fora do event loop (ver execucao.py)
+
+def _processar_arquivo(path, file_id):
+    """
+    Converte o arquivo enviado para o armazenamento colunar e retorna o resumo dos dados.
+    """
+    # Salvar no armazenamento colunar binário (leitura em blocos, ver ingestao.py)
+    with etapa("ingestao"):
+        ingerir(path, file_id)
+    if EXPORTAR_CSV and not path.endswith(".csv"):
+        with etapa("exportar_csv"):
+            exportar_csv(file_id, f"{DATASETS_DIR}/{file_id}.csv")
+    return _resumo_dataset(file_id)
+
+def _resumo_dataset(file_id):
+    # Resumo calculado sobre as colunas memory-mapped
+    tempo, saida, entrada = carregar_dataset(file_id)
+    return {
+        "samples": len(tempo),
+        "time_range": [float(tempo.min()), float(tempo.max())],
+        "output_range": [float(saida.min()), float(saida.max())],
+        "input_range": [float(entrada.min()), float(entrada.max())]
+    }
+
+def _plot_dados(file_id, formato="png", reaproveitar=False):
+    plot_path = f"{PLOTS_DIR}/{file_id}_raw.{formato}"
+    if reaproveitar and os.path.exists(plot_path):
+        return plot_path
+    tempo, saida, entrada = obter_sinais(file_id)
+    return salvar_imagem(plot_path, grafico_dados(tempo, saida, entrada, formato))
+
+def _dataset_existente(file_id):
+    """
+    Resumo salvo nos metadados de um dataset já enviado (calculado se faltar).
+    """
+    data_summary = carregar_metadados(file_id).get("data_summary")
+    return data_summary or _resumo_dataset(file_id)
+
+def _indexar_catalogo(file_id):
+    # O catálogo é um índice derivado: uma falha aqui não invalida o upload
+    try:
+        catalogo.indexar(file_id)
+    except Exception as e:
+        logger.error(f"Erro ao indexar {file_id} no catálogo: {str(e)}")
+
+def _registrar_identificacao(file_id, metodo, resultado):
+    try:
+        catalogo.registrar_identificacao(file_id, metodo, resultado)
+    except Exception as e:
+        logger.error(f"Erro ao registrar identificação de {file_id} no catálogo: {str(e)}")
+
+def _dados_dados(file_id, max_points):
+    tempo, saida, entrada = obter_sinais(file_id)
+    return {"series": [
+        serie("Saída", tempo, saida, max_points, painel=0),
+        serie("Entrada", tempo, entrada, max_points, painel=1)
+    ]}
+
+def _plot_identificacao(file_id, metodo, window_length, polyorder, resultado, formato="png"):
+    t, y_original, entrada = obter_sinais(file_id)
+    y = obter_suavizado(file_id, window_length, polyorder)
+    plot_path = f"{PLOTS_DIR}/{file_id}_identify_{metodo}.{formato}"
+    
+    # Resposta do modelo ajustado por mínimos quadrados
+    y_modelo = None
+    if "fit" in resultado:
+        fit = resultado["fit"]
+        y_modelo = simular_modelo(t, entrada, fit["k"], fit["tau"], fit["theta"], fit["y0"])
+    
+    conteudo = grafico_identificacao(t, y_original, y, entrada, resultado, metodo, y_modelo, formato)
+    return salvar_imagem(plot_path, conteudo)
+
+def _dados_identificacao(file_id, window_length, polyorder, resultado, max_points):
+    t, y_original, entrada = obter_sinais(file_id)
+    y = obter_suavizado(file_id, window_length, polyorder)
+    series = [
+        serie("Dados Originais", t, y_original, max_points),
+        serie("Dados Suavizados", t, y, max_points)
+    ]
+    if "fit" in resultado:
+        fit = resultado["fit"]
+        y_modelo = simular_modelo(t, entrada, fit["k"], fit["tau"], fit["theta"], fit["y0"])
+        series.append(serie("Modelo ajustado", t, y_modelo, max_points))
+    series.append(serie("Entrada", t, entrada, max_points, painel=1))
+    return {"series": series}
+
+def _simular_respostas(k, tau, theta, kp_imc, ti_imc, td_imc, kp_itae, ti_itae, td_itae,
+                       simulation_time, num_points, derivative_filter):
+    """
+    Simula a resposta ao degrau em malha fechada dos controladores IMC e ITAE.
+    """
+    # Resposta ao degrau (planta FOPDT com atraso exato, ver simulacao.py)
+    t = np.linspace(0, simulation_time, num_points)
+    t1 = t2 = t
+    with etapa("simulacao"):
+        y1 = resposta_degrau(k, tau, theta, kp_imc, ti_imc, td_imc, t, n_filtro=derivative_filter)
+        y2 = resposta_degrau(k, tau, theta, kp_itae, ti_itae, td_itae, t, n_filtro=derivative_filter)
+    
+    # Calcular métricas de desempenho
+    with etapa("metricas"):
+        metrics_imc = calc_metricas(t1, y1)
+        metrics_itae = calc_metricas(t2, y2)
+    
+    return t1, y1, t2, y2, metrics_imc, metrics_itae
+
+def _plot_resposta(plot_path, t1, y1, t2, y2, formato="png"):
+    return salvar_imagem(plot_path, grafico_resposta(t1, y1, t2, y2, formato))
+
+def _dados_resposta(t1, y1, t2, y2, max_points):
+    return {"series": [
+        serie("IMC", t1, y1, max_points),
+        serie("ITAE", t2, y2, max_points),
+        serie("Erro IMC", t1, 1 - y1, max_points, painel=1),
+        serie("Erro ITAE", t2, 1 - y2, max_points, painel=1)
+    ]}
+
+def _malhas_varredura(modelos, lambdas):
+    """
+    Parâmetros de todas as malhas IMC (modelo × lambda) e ITAE (por modelo),
+    uma por linha: (k, tau, theta, lam, kp, ti, td, n_imc).
+    """
+    modelos = np.asarray(modelos, dtype=float)
+    lambdas = np.asarray(lambdas, dtype=float)
+    n_modelos, n_lambdas = len(modelos), len(lambdas)
+    
+    # IMC: uma linha por (modelo, lambda); ITAE: uma linha por modelo
+    k = np.concatenate([np.repeat(modelos[:, 0], n_lambdas), modelos[:, 0]])
+    tau = np.concatenate([np.repeat(modelos[:, 1], n_lambdas), modelos[:, 1]])
+    theta = np.concatenate([np.repeat(modelos[:, 2], n_lambdas), modelos[:, 2]])
+    lam = np.tile(lambdas, n_modelos)
+    kp_imc, ti_imc, td_imc = sintonia_imc(k[:-n_modelos], tau[:-n_modelos], theta[:-n_modelos], lam)
+    kp_itae, ti_itae, td_itae = sintonia_itae(modelos[:, 0], modelos[:, 1], modelos[:, 2])
+    kp = np.concatenate([kp_imc, kp_itae])
+    ti = np.concatenate([ti_imc, ti_itae])
+    td = np.concatenate([td_imc, td_itae])
+    return k, tau, theta, lam, kp, ti, td, n_modelos * n_lambdas
+
+def _finito(valor):
+    # inf/NaN (ITAE com theta = 0, margem sem cruzamento na grade) viram null no JSON
+    return float(valor) if np.isfinite(valor) else None
+
+def _resultado_malha(i, k, tau, theta, lam, kp, ti, td, n_imc):
+    imc = i < n_imc
+    return {
+        "method": "IMC" if imc else "ITAE",
+        "model": {"k": float(k[i]), "tau": float(tau[i]), "theta": float(theta[i])},
+        "lambda": float(lam[i]) if imc else None,
+        "controller": {"Kp": _finito(kp[i]), "Ti": _finito(ti[i]), "Td": _finito(td[i])}
+    }
+
+def _simular_varredura(modelos, lambdas, simulation_time, num_points, derivative_filter):
+    """
+    Simula de uma vez todas as malhas IMC (modelo × lambda) e ITAE (por modelo).
+    """
+    malhas = _malhas_varredura(modelos, lambdas)
+    k, tau, theta, _, kp, ti, td, _ = malhas
+    
+    t = np.linspace(0, simulation_time, num_points)
+    with etapa("simulacao"):
+        y = resposta_degrau(k, tau, theta, kp, ti, td, t, n_filtro=derivative_filter)
+    
+    # Métricas de todas as malhas de uma vez
+    with etapa("metricas"):
+        metricas = calc_metricas(t, y)
+    
+    results = [{**_resultado_malha(i, *malhas), "metrics": metricas[i]} for i in range(len(kp))]
+    return t, y, results
+
+def _analisar_robustez(modelos, lambdas, derivative_filter, num_frequencies, w_min, w_max, frequency_response):
+    """
+    Margens de estabilidade de todas as malhas IMC (modelo × lambda) e ITAE (por modelo).
+    """
+    malhas = _malhas_varredura(modelos, lambdas)
+    k, tau, theta, _, kp, ti, td, _ = malhas
+    if w_min is None or w_max is None:
+        w = grade_frequencias(tau, theta, ti, td, derivative_filter, num_frequencies)
+        w_min = w[0] if w_min is None else w_min
+        w_max = w[-1] if w_max is None else w_max
+    w = np.logspace(np.log10(w_min), np.log10(w_max), num_frequencies)
+    
+    with etapa("resposta_frequencia"):
+        margens = analisar_robustez(k, tau, theta, kp, ti, td, w, derivative_filter, frequency_response)
+    
+    results = []
+    for i in range(len(kp)):
+        gm = margens["gain_margin"][i]
+        resultado = {
+            **_resultado_malha(i, *malhas),
+            "robustness": {
+                "gain_margin": _finito(gm),
+                "gain_margin_db": _finito(20 * np.log10(gm)),
+                "phase_margin": _finito(margens["phase_margin"][i]),
+                "ms": _finito(margens["ms"][i]),
+                "mt": _finito(margens["mt"][i]),
+                "phase_crossover_frequency": _finito(margens["phase_crossover"][i]),
+                "gain_crossover_frequency": _finito(margens["gain_crossover"][i]),
+                "ms_frequency": _finito(margens["ms_frequency"][i])
+            }
+        }
+        if frequency_response:
+            L = margens["L"][i]
+            resultado["frequency_response"] = {
+                "magnitude_db": (20 * np.log10(np.abs(L))).tolist(),
+                "phase_deg": np.degrees(margens["phase"][i]).tolist(),
+                "real": L.real.tolist(),
+                "imag": L.imag.tolist()
+            } if np.isfinite(L).all() else None
+        results.append(resultado)
+    return w, results
+
+def _plot_varredura(plot_path, t, y, results, formato="png"):
+    return salvar_imagem(plot_path, grafico_varredura(t, y, results, formato))
+
+def _analisar_filtros(file_id, window_lengths, polyorder, criterion, max_window):
+    _, y_original, _ = obter_sinais(file_id)
+    
+    pares = []
+    for window in window_lengths:
+        if window < 3 or window > len(y_original):
+            continue
+            
+        if polyorder >= window:
+            po = window - 1
+        else:
+            po = polyorder
+        
+        pares.append((window, po))
+    
+    # Calcular métricas de suavização de todos os filtros em lote
+    results = []
+    if pares:
+        with etapa("avaliar_filtros"):
+            metricas = avaliar_filtros(y_original, pares)
+        for i, (window, po) in enumerate(pares):
+            results.append({
+                "window_length": window,
+                "polyorder": po,
+                **{nome: float(valores[i]) for nome, valores in metricas.items()}
+            })
+    
+    # Recomendação automática sobre a grade densa de (janela, ordem)
+    if max_window is None:
+        recommended = obter_filtro_recomendado(file_id, criterion)
+    else:
+        with etapa("recomendar_filtro"):
+            recommended = recomendar_filtro(y_original, criterion, grade_padrao(len(y_original), max_window))
+    
+    return results, recommended
+
+def _plot_filtros(file_id, results, recommended=None, formato="png"):
+    t, y_original, _ = obter_sinais(file_id)
+    plot_path = f"{PLOTS_DIR}/{file_id}_filter_analysis.{formato}"
+    
+    filtrados = [
+        (r["window_length"], r["polyorder"], obter_suavizado(file_id, r["window_length"], r["polyorder"]))
+        for r in results
+    ]
+    if recommended is not None:
+        recommended = (
+            recommended["window_length"], recommended["polyorder"],
+            obter_suavizado(file_id, recommended["window_length"], recommended["polyorder"])
+        )
+    return salvar_imagem(plot_path, grafico_filtros(t, y_original, filtrados, recommended, formato))
+
+def _dados_filtros(file_id, results, recommended, max_points):
+    t, y_original, _ = obter_sinais(file_id)
+    series = [serie("Original", t, y_original, max_points)]
+    for r in results:
+        y_filtered = obter_suavizado(file_id, r["window_length"], r["polyorder"])
+        series.append(serie(f'Janela={r["window_length"]}, Ordem={r["polyorder"]}', t, y_filtered, max_points))
+    if recommended is not None:
+        y_filtered = obter_suavizado(file_id, recommended["window_length"], recommended["polyorder"])
+        series.append(serie(
+            f'Recomendado: Janela={recommended["window_length"]}, Ordem={recommended["polyorder"]}',
+            t, y_filtered, max_points
+        ))
+    return {"series": series}
+
+def _validar_formato(formato, max_points):
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use 'png', 'webp' ou 'data'")
+    if max_points < PONTOS_MIN:
+        raise HTTPException(status_code=400, detail=f"max_points deve ser pelo menos {PONTOS_MIN}")
+
 @app.get("/")
 def read_root():
     return {"message": "API de Identificação de Sistemas e Sintonia PID"}
 
+@app.api_route("/plots/{nome}", methods=["GET", "HEAD"])
+def servir_grafico(nome: str, request: Request):
+    """
+    Serve um gráfico de plots/ (da memória quando possível) com ETag forte.
+    """
+    formato = os.path.splitext(nome)[1].lstrip(".")
+    if nome.startswith(".") or formato not in TIPOS_MIDIA:
+        raise HTTPException(status_code=404, detail="Gráfico não encontrado")
+    imagem = obter_imagem(nome)
+    if imagem is None:
+        raise HTTPException(status_code=404, detail="Gráfico não encontrado")
+    conteudo, etag = imagem
+    
+    # Gráficos nomeados pelo hash dos parâmetros nunca mudam; os demais são revalidados
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if imutavel(nome) else "no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=conteudo, media_type=TIPOS_MIDIA[formato], headers=headers)
+
+def _gravar_bloco(f, sha256, bloco):
+    sha256.update(bloco)
+    f.write(bloco)
+
 @app.post("/upload/")
-async def upload_mat(file: UploadFile = File(...)):
+async def upload_mat(
+    file: UploadFile = File(...),
+    format: str = Form("png"),  # png ou webp (gráfico renderizado) ou data (séries reduzidas)
+    max_points: int = Form(PONTOS_PADRAO)  # Pontos por série no formato data
+):
     """
-    Recebe um arquivo .mat contendo dados de experimento.
+    Recebe um arquivo de experimento: .mat (v5 ou v7.3), .csv ou .parquet.
     """
     # Verificar extensão do arquivo
-    if not file.filename.endswith('.mat'):
-        raise HTTPException(status_code=400, detail="Apenas arquivos .mat são aceitos")
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext not in FORMATOS_UPLOAD:
+        raise HTTPException(status_code=400, detail="Apenas arquivos .mat, .csv e .parquet são aceitos")
+    _validar_formato(format, max_points)
     
     # Gerar ID único para o arquivo
     file_id = str(uuid.uuid4())
-    path = f"{DATASETS_DIR}/{file_id}.mat"
+    path = f"{DATASETS_DIR}/{file_id}{ext}"
     
     try:
-        # Salvar .mat no disco
+        # Salvar no disco em blocos, com limite de tamanho e hash incremental
         logger.info(f"Salvando arquivo {file.filename} como {path}")
-        with open(path, "wb") as f:
-            f.write(await file.read())
-        
-        # Carregar dados do arquivo .mat
-        logger.info(f"Carregando dados do arquivo {path}")
-        try:
-            mat_data = loadmat(path)
-            logger.info(f"Chaves disponíveis no arquivo .mat: {mat_data.keys()}")
-            
-            # Verificar se a estrutura esperada existe
-            if 'reactionExperiment' not in mat_data:
-                # Tentar encontrar outras estruturas de dados
-                data_keys = [k for k in mat_data.keys() if not k.startswith('__')]
-                logger.info(f"Estrutura 'reactionExperiment' não encontrada. Chaves disponíveis: {data_keys}")
-                
-                if len(data_keys) > 0:
-                    # Usar a primeira estrutura de dados disponível
-                    key = data_keys[0]
-                    logger.info(f"Usando a estrutura '{key}' como fonte de dados")
-                    
-                    # Tentar extrair dados dessa estrutura
-                    try:
-                        dados = mat_data[key]
-                        # Verificar se é uma matriz ou estrutura
-                        if isinstance(dados, np.ndarray):
-                            if dados.ndim == 2:
-                                # Assumir que as colunas são tempo, saída, entrada
-                                if dados.shape[1] >= 3:
-                                    tempo = dados[:, 0]
-                                    saida = dados[:, 1]
-                                    entrada = dados[:, 2]
-                                else:
-                                    raise ValueError(f"A matriz '{key}' não tem colunas suficientes (precisa de pelo menos 3)")
-                            else:
-                                raise ValueError(f"A estrutura '{key}' não é uma matriz 2D")
-                        else:
-                            raise ValueError(f"A estrutura '{key}' não é uma matriz numpy")
-                    except Exception as e:
-                        logger.error(f"Erro ao extrair dados da estrutura '{key}': {str(e)}")
-                        raise HTTPException(
-                            status_code=400, 
-                            detail=f"Não foi possível extrair dados da estrutura '{key}': {str(e)}"
-                        )
-                else:
+        sha256 = hashlib.sha256()
+        tamanho = 0
+        with etapa("recebimento"), open(path, "wb") as f:
+            while bloco := await file.read(UPLOAD_BLOCO_BYTES):
+                tamanho += len(bloco)
+                if tamanho > UPLOAD_MAX_MB * 1024 * 1024:
                     raise HTTPException(
-                        status_code=400, 
-                        detail="Estrutura de dados não reconhecida no arquivo .mat"
+                        status_code=413,
+                        detail=f"Arquivo maior que o limite de {UPLOAD_MAX_MB:g} MB"
                     )
-            else:
-                # Extrair dados da estrutura reactionExperiment
-                try:
-                    dados = mat_data["reactionExperiment"][0, 0]
-                    tempo = dados[0].ravel()
-                    saida = dados[1].ravel()
-                    entrada = dados[2].ravel()
-                except Exception as e:
-                    logger.error(f"Erro ao extrair dados da estrutura 'reactionExperiment': {str(e)}")
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Erro ao extrair dados da estrutura 'reactionExperiment': {str(e)}"
-                    )
-        except Exception as e:
-            logger.error(f"Erro ao carregar arquivo .mat: {str(e)}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Erro ao carregar arquivo .mat: {str(e)}"
-            )
+                # Hash e gravação fora do event loop
+                await asyncio.to_thread(_gravar_bloco, f, sha256, bloco)
+        sha256 = sha256.hexdigest()
         
-        # Criar DataFrame e salvar como CSV
-        df = pd.DataFrame({
-            "tempo": tempo,
-            "saida": saida,
-            "entrada": entrada
-        })
+        # Reservar o hash até o registro: um upload simultâneo do mesmo conteúdo espera e é deduplicado
+        reserva = await asyncio.to_thread(reservar_hash, sha256)
+        try:
+            # Conteúdo já enviado: reaproveitar o dataset, o resumo e o gráfico existentes
+            existente = await executar(buscar_por_hash, sha256)
+            if existente is not None:
+                os.remove(path)
+                logger.info(f"Arquivo {file.filename} já enviado como {existente}")
+                file_id, duplicado = existente, True
+                data_summary = await executar(_dataset_existente, file_id)
+            else:
+                # Carregar dados do arquivo e converter para o armazenamento colunar
+                logger.info(f"Carregando dados do arquivo {path}")
+                duplicado = False
+                data_summary = await executar(_processar_arquivo, path, file_id)
+                registrar_upload(file_id, sha256, filename=file.filename, data_summary=data_summary)
+        finally:
+            liberar_hash(reserva)
         
-        csv_path = f"{DATASETS_DIR}/{file_id}.csv"
-        df.to_csv(csv_path, index=False)
+        # Indexar no catálogo (datasets anteriores ao catálogo entram no primeiro reenvio)
+        if not duplicado or await executar(catalogo.obter, file_id) is None:
+            await executar(_indexar_catalogo, file_id)
         
         # Gerar visualização inicial dos dados
-        plt.figure(figsize=(10, 6))
-        plt.subplot(2, 1, 1)
-        plt.plot(tempo, saida, 'b-', label='Saída')
-        plt.grid(True)
-        plt.legend()
-        plt.title('Dados do Experimento')
-        
-        plt.subplot(2, 1, 2)
-        plt.plot(tempo, entrada, 'r-', label='Entrada')
-        plt.grid(True)
-        plt.legend()
-        plt.xlabel('Tempo')
-        
-        # Salvar gráfico
-        plot_path = f"{PLOTS_DIR}/{file_id}_raw.png"
-        plt.savefig(plot_path)
-        plt.close()
+        if format == "data":
+            plot_path, plot_data = None, await executar(_dados_dados, file_id, max_points)
+        else:
+            plot_path, plot_data = await executar(_plot_dados, file_id, format, duplicado), None
         
         logger.info(f"Arquivo processado com sucesso: {file_id}")
         return {
             "file_id": file_id,
-            "message": "Arquivo .mat processado com sucesso",
+            "message": f"Arquivo {ext} processado com sucesso",
+            "sha256": sha256,
+            "deduplicated": duplicado,
             "plot_path": plot_path,
-            "data_summary": {
-                "samples": len(tempo),
-                "time_range": [float(tempo.min()), float(tempo.max())],
-                "output_range": [float(saida.min()), float(saida.max())],
-                "input_range": [float(entrada.min()), float(entrada.max())]
-            }
+            **({"plot_data": plot_data} if plot_data else {}),
+            "data_summary": data_summary
         }
     
     except Exception as e:
         # Remover arquivo em caso de erro
         if os.path.exists(path):
             os.remove(path)
-        logger.error(f"Erro ao processar arquivo .mat: {str(e)}")
+        if isinstance(e, HTTPException):
+            raise e
+        logger.error(f"Erro ao processar arquivo {ext}: {str(e)}")
         return JSONResponse(
             status_code=500, 
-            content={"erro": f"Erro ao processar arquivo .mat: {str(e)}"}
+            content={"erro": f"Erro ao processar arquivo {ext}: {str(e)}"}
         )
 
 @app.post("/identify/")
 async def identificar_modelo(
     file_id: str = Form(...),
-    metodo: str = Form("smith"),  # smith ou sundaresan
+    metodo: str = Form("smith"),  # smith, sundaresan ou least_squares
     window_length: int = Form(11),  # Parâmetro ajustável para o filtro Savgol
     polyorder: int = Form(3),  # Ordem do polinômio para o filtro Savgol
-    offset_percent: float = Form(15.0)  # Percentual inicial a ignorar (para evitar ruído inicial)
+    auto_filter: bool = Form(False),  # true: usar o filtro recomendado para o dataset
+    offset_percent: float = Form(15.0),  # Percentual inicial a ignorar (para evitar ruído inicial)
+    format: str = Form("png"),  # png ou webp (gráfico renderizado) ou data (séries reduzidas)
+    max_points: int = Form(PONTOS_PADRAO)  # Pontos por série no formato data
 ):
     """
     Identifica os parâmetros do modelo a partir dos dados.
     Permite ajustar os parâmetros de suavização para melhorar a identificação.
     """
     try:
+        _validar_formato(format, max_points)
+        
         # Verificar se o arquivo existe
-        csv_path = f"{DATASETS_DIR}/{file_id}.csv"
-        if not os.path.exists(csv_path):
+        if not dataset_existe(file_id):
             raise HTTPException(status_code=404, detail="Arquivo não encontrado")
         
         # Verificar método
-        if metodo not in ["smith", "sundaresan"]:
-            raise HTTPException(status_code=400, detail="Método inválido. Use 'smith' ou 'sundaresan'")
+        if metodo not in METODOS:
+            raise HTTPException(status_code=400, detail="Método inválido. Use 'smith', 'sundaresan' ou 'least_squares'")
+        
+        # Com auto_filter, usar o filtro recomendado para o dataset
+        if auto_filter:
+            recomendado = await executar(obter_filtro_recomendado, file_id)
+            window_length = recomendado["window_length"]
+            polyorder = recomendado["polyorder"]
         
         # Verificar parâmetros do filtro
         if window_length % 2 == 0:
@@ -214,106 +627,37 @@ async def identificar_modelo(
         if polyorder >= window_length:
             polyorder = window_length - 1
         
-        # Carregar dados
-        df = pd.read_csv(csv_path)
-        t = df.iloc[:, 0].values
-        y_original = df.iloc[:, 1].values
-        entrada = df.iloc[:, 2].values
-        
-        # Aplicar filtro Savgol para suavização
-        y = savgol_filter(y_original, window_length=window_length, polyorder=polyorder)
-        
-        # Valores iniciais e finais
-        y_inicial = y[0]
-        y_final = y[-1]
-        dy = y_final - y_inicial
-        
-        # Calcular pontos de interesse baseado no método escolhido
-        if metodo == "smith":
-            y1 = y_inicial + 0.283 * dy
-            y2 = y_inicial + 0.632 * dy
-        else:  # sundaresan
-            y1 = y_inicial + 0.353 * dy
-            y2 = y_inicial + 0.853 * dy
-        
-        # Calcular offset baseado em percentual
-        offset = int(len(t) * offset_percent / 100)
-        if offset < 1:
-            offset = 1
-        
-        # Encontrar índices onde a resposta atinge y1 e y2
-        idx1 = np.where(y[offset:] >= y1)[0]
-        idx2 = np.where(y[offset:] >= y2)[0]
-        
-        if len(idx1) == 0 or len(idx2) == 0:
-            raise HTTPException(
-                status_code=400, 
-                detail="A resposta não atingiu os níveis necessários para identificação. Tente ajustar os parâmetros."
+        # Carregar, suavizar (cache em memória) e identificar
+        try:
+            resultado = await executar(
+                identificar_dataset, file_id, metodo, window_length, polyorder, offset_percent
             )
+        except ErroIdentificacao as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        filter_params = {
+            "window_length": window_length,
+            "polyorder": polyorder,
+            "offset_percent": offset_percent,
+            "automatic": auto_filter
+        }
+        await executar(_registrar_identificacao, file_id, metodo, {**resultado, "filter_params": filter_params})
         
-        # Corrigir índices para compensar o offset
-        t1 = t[offset + idx1[0]]
-        t2 = t[offset + idx2[0]]
-        
-        if t1 >= t2:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"t1 ({t1}) não é menor que t2 ({t2}). Tente ajustar os parâmetros de suavização."
+        # Gerar gráfico (ou séries) com visualização da suavização e pontos identificados
+        if format == "data":
+            plot_path = None
+            resultado["plot_data"] = await executar(
+                _dados_identificacao, file_id, window_length, polyorder, resultado, max_points
+            )
+        else:
+            plot_path = await executar(
+                _plot_identificacao, file_id, metodo, window_length, polyorder, resultado, format
             )
-        
-        # Cálculo dos parâmetros do modelo
-        if metodo == "smith":
-            tau = 1.5 * (t2 - t1)
-            theta = t2 - tau
-        else:  # sundaresan
-            tau = 2/3 * (t2 - t1)
-            theta = 1.3 * t1 - 0.29 * t2
-        
-        # Cálculo do ganho
-        k = dy / (entrada.max() - entrada.min())
-        
-        # Gerar gráfico com visualização da suavização e pontos identificados
-        plt.figure(figsize=(12, 8))
-        
-        # Plot dos dados originais e suavizados
-        plt.subplot(2, 1, 1)
-        plt.plot(t, y_original, 'b-', alpha=0.5, label='Dados Originais')
-        plt.plot(t, y, 'r-', label='Dados Suavizados')
-        plt.axhline(y1, color='g', linestyle='--', label=f'y1 ({y1:.2f})')
-        plt.axhline(y2, color='m', linestyle='--', label=f'y2 ({y2:.2f})')
-        plt.axvline(t1, color='g', linestyle='-.')
-        plt.axvline(t2, color='m', linestyle='-.')
-        plt.grid(True)
-        plt.legend()
-        plt.title(f'Identificação de Modelo - Método {metodo.capitalize()}')
-        
-        # Plot da entrada
-        plt.subplot(2, 1, 2)
-        plt.plot(t, entrada, 'k-', label='Entrada')
-        plt.grid(True)
-        plt.legend()
-        plt.xlabel('Tempo')
-        
-        # Salvar gráfico
-        plot_path = f"{PLOTS_DIR}/{file_id}_identify_{metodo}.png"
-        plt.savefig(plot_path)
-        plt.close()
         
         # Retornar resultados
         return {
-            "k": float(k),
-            "tau": float(tau),
-            "theta": float(theta),
-            "t1": float(t1),
-            "t2": float(t2),
-            "y1": float(y1),
-            "y2": float(y2),
+            **resultado,
             "plot_path": plot_path,
-            "filter_params": {
-                "window_length": window_length,
-                "polyorder": polyorder,
-                "offset_percent": offset_percent
-            }
+            "filter_params": filter_params
         }
     
     except HTTPException as e:
@@ -322,15 +666,117 @@ async def identificar_modelo(
         logger.error(f"Erro ao identificar modelo: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao identificar modelo: {str(e)}")
 
+@app.websocket("/ws/identify/{file_id}")
+async def sessao_identificacao(websocket: WebSocket, file_id: str, max_points: int = sessoes.SESSAO_PONTOS_PADRAO):
+    """
+    Sessão interativa de identificação (ver sessoes.py): o cliente envia
+    {"seq", "metodo", "window_length", "polyorder", "offset_percent"} a cada
+    mudança e recebe o resultado dos parâmetros mais recentes.
+    """
+    await websocket.accept()
+    if not dataset_existe(file_id):
+        await websocket.send_json({"type": "error", "detail": "Arquivo não encontrado"})
+        await websocket.close(code=4404)
+        return
+    try:
+        sessao = await asyncio.to_thread(sessoes.abrir, file_id, max_points)
+    except sessoes.SessaoCheia:
+        await websocket.send_json({"type": "error", "detail": "Limite de sessões abertas atingido"})
+        await websocket.close(code=1013)
+        return
+    
+    tarefa = None
+    try:
+        await websocket.send_json(await asyncio.to_thread(sessao.inicial))
+        tarefa = asyncio.create_task(sessao.processar(websocket.send_json))
+        while True:
+            try:
+                mensagem = await websocket.receive_json()
+            except ValueError:
+                mensagem = None
+            if not isinstance(mensagem, dict):
+                await websocket.send_json({"type": "error", "detail": "Mensagem deve ser um objeto JSON"})
+                continue
+            sessao.atualizar(mensagem)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if tarefa is not None:
+            tarefa.cancel()
+        sessoes.fechar()
+
+@app.websocket("/ws/stream")
+async def identificacao_online(
+    websocket: WebSocket,
+    estimate_every: int = 50,  # Amostras entre estimativas
+    max_delay: int = 200,  # Maior tempo morto considerado, em amostras
+    forgetting: float = 1.0,  # Fator de esquecimento (< 1 para acompanhar mudanças lentas)
+    smoothing: float = 0.3  # Coeficiente do filtro passa-baixa (1 = sem filtro)
+):
+    """
+    Identificação FOPDT online (ver identificacao_online.py): o cliente envia
+    blocos {"time": [...], "output": [...], "input": [...]} à medida que as
+    amostras chegam e recebe uma estimativa a cada estimate_every amostras.
+    {"reset": true} recomeça a identificação.
+    """
+    await websocket.accept()
+    erro = None
+    if estimate_every < 1:
+        erro = "estimate_every deve ser pelo menos 1"
+    elif max_delay < 0:
+        erro = "max_delay não pode ser negativo"
+    elif not 0 < forgetting <= 1:
+        erro = "forgetting deve estar em (0, 1]"
+    elif not 0 < smoothing <= 1:
+        erro = "smoothing deve estar em (0, 1]"
+    if erro is not None:
+        await websocket.send_json({"type": "error", "detail": erro})
+        await websocket.close(code=1008)
+        return
+    identificador = IdentificadorOnline(max_delay, forgetting, smoothing, estimate_every)
+    await websocket.send_json({"type": "ready", "delays": identificador.atrasos.tolist()})
+    
+    try:
+        while True:
+            try:
+                mensagem = await websocket.receive_json()
+            except ValueError:
+                mensagem = None
+            if not isinstance(mensagem, dict):
+                await websocket.send_json({"type": "error", "detail": "Mensagem deve ser um objeto JSON"})
+                continue
+            try:
+                if mensagem.get("reset"):
+                    identificador.reiniciar()
+                    continue
+                estimativas = await asyncio.to_thread(
+                    identificador.adicionar, mensagem["time"], mensagem["output"], mensagem["input"]
+                )
+            except (ValueError, TypeError, KeyError) as e:
+                detalhe = f"Campo ausente: {e}" if isinstance(e, KeyError) else str(e)
+                await websocket.send_json({"type": "error", "detail": detalhe})
+                continue
+            for estimativa in estimativas:
+                await websocket.send_json({"type": "estimate", **estimativa})
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/tune/")
 async def sintonizar_pid(
     k: float = Form(...),
     tau: float = Form(...),
     theta: float = Form(...),
-    lam: float = Form(1.0)  # Lambda ajustável para IMC
+    lam: float = Form(1.0),  # Lambda ajustável para IMC
+    optimize: bool = Form(False),  # Buscar automaticamente o lambda ótimo
+    objective: str = Form("iae"),  # iae, itae ou settling_time
+    lam_min: float = Form(None),  # Faixa de busca (padrão: 0.01 a 3 vezes tau + theta)
+    lam_max: float = Form(None),
+    max_overshoot: float = Form(5.0),  # Sobressinal máximo (%) aceito pelo otimizador
+    time_budget: float = Form(10.0)  # Tempo máximo de espera pela busca (s)
 ):
     """
     Sintoniza controladores PID usando métodos IMC e ITAE.
+    Com optimize=true, o lambda do IMC é escolhido pelo otimizador.
     """
     try:
         # Verificar parâmetros
@@ -340,17 +786,36 @@ async def sintonizar_pid(
                 detail="Parâmetros inválidos. k e tau devem ser positivos, theta deve ser não-negativo."
             )
         
+        otimizacao = None
+        if optimize:
+            if objective not in OBJETIVOS:
+                raise HTTPException(status_code=400, detail=f"Objetivo inválido. Use um de: {', '.join(OBJETIVOS)}")
+            if not time_budget > 0:
+                raise HTTPException(status_code=422, detail="time_budget deve ser positivo")
+            inicio = time.perf_counter()
+            # A busca continua no pool após o tempo limite e fica memorizada
+            # para a próxima requisição igual
+            busca = asyncio.ensure_future(executar(
+                otimizar_lambda, k, tau, theta, objective, lam_min, lam_max, max_overshoot
+            ))
+            try:
+                otimizacao = await asyncio.wait_for(asyncio.shield(busca), time_budget)
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"A busca do lambda não terminou em {time_budget} s. Tente novamente em instantes.",
+                    headers={"Retry-After": str(execucao.EXECUCAO_RETRY_AFTER)}
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            otimizacao = {**otimizacao, "elapsed": time.perf_counter() - inicio}
+            lam = otimizacao["lambda"]
+        
         # IMC (lambda ajustável)
-        kp_imc = (2*tau + theta) / (k * (2*lam + theta))
-        ti_imc = tau + theta/2
-        td_imc = (tau * theta) / (2*tau + theta)
+        kp_imc, ti_imc, td_imc = sintonia_imc(k, tau, theta, lam)
         
         # ITAE (constantes da tabela)
-        A, B, C, D, E, F = 0.965, -0.85, 0.796, -0.147, 0.308, 0.929
-        theta_tau = theta / tau
-        kp_itae = (A / k) * (theta_tau ** B)
-        ti_itae = tau * (C + D * theta_tau)
-        td_itae = tau * E * (theta_tau ** F)
+        kp_itae, ti_itae, td_itae = sintonia_itae(k, tau, theta)
         
         # Retornar resultados
         return {
@@ -364,7 +829,8 @@ async def sintonizar_pid(
                 "Kp": float(kp_itae),
                 "Ti": float(ti_itae),
                 "Td": float(td_itae)
-            }
+            },
+            **({"optimization": dict(otimizacao)} if otimizacao else {})
         }
     
     except HTTPException as e:
@@ -380,12 +846,17 @@ async def plotar_resposta(
     theta: float = Form(...),
     lam: float = Form(1.0),  # Lambda ajustável para IMC
     simulation_time: float = Form(50.0),  # Tempo de simulação
-    num_points: int = Form(1000)  # Número de pontos na simulação
+    num_points: int = Form(1000),  # Número de pontos na simulação
+    derivative_filter: float = Form(0.0),  # N do filtro derivativo Td·s/(1 + Td·s/N); 0 = derivativo ideal
+    format: str = Form("png"),  # png ou webp (gráfico renderizado) ou data (séries reduzidas)
+    max_points: int = Form(PONTOS_PADRAO)  # Pontos por série no formato data
 ):
     """
     Gera gráficos de resposta ao degrau para os controladores sintonizados.
     """
     try:
+        _validar_formato(format, max_points)
+        
         # Verificar parâmetros
         if k <= 0 or tau <= 0 or theta < 0:
             raise HTTPException(
@@ -393,107 +864,37 @@ async def plotar_resposta(
                 detail="Parâmetros inválidos. k e tau devem ser positivos, theta deve ser não-negativo."
             )
         
+        # Gráfico endereçado pelos parâmetros: requisições repetidas reaproveitam o resultado
+        plot_path = caminho_grafico("response", chave_grafico(
+            "response", k=k, tau=tau, theta=theta, lam=lam, simulation_time=simulation_time,
+            num_points=num_points, derivative_filter=derivative_filter, format=format
+        ), format)
+        resultado = obter_resultado(plot_path) if format != "data" else None
+        if resultado is not None:
+            return resultado
+        
         # Parâmetros IMC
-        kp_imc = (2*tau + theta) / (k * (2*lam + theta))
-        ti_imc = tau + theta/2
-        td_imc = (tau * theta) / (2*tau + theta)
+        kp_imc, ti_imc, td_imc = sintonia_imc(k, tau, theta, lam)
         
         # Parâmetros ITAE
-        A, B, C, D, E, F = 0.965, -0.85, 0.796, -0.147, 0.308, 0.929
-        theta_tau = theta / tau
-        kp_itae = (A / k) * (theta_tau ** B)
-        ti_itae = tau * (C + D * theta_tau)
-        td_itae = tau * E * (theta_tau ** F)
+        kp_itae, ti_itae, td_itae = sintonia_itae(k, tau, theta)
         
-        # Sistema planta com atraso (aproximação de Padé)
-        num_pade, den_pade = pade(theta, 20)
-        planta = series(tf(k, [tau, 1]), tf(num_pade, den_pade))
-        
-        # PID - IMC
-        pid_imc = tf([kp_imc * td_imc, kp_imc, kp_imc / ti_imc], [1, 0])
-        malha_fechada_imc = feedback(series(pid_imc, planta), 1)
-        
-        # PID - ITAE
-        pid_itae = tf([kp_itae * td_itae, kp_itae, kp_itae / ti_itae], [1, 0])
-        malha_fechada_itae = feedback(series(pid_itae, planta), 1)
-        
-        # Resposta ao degrau
-        t = np.linspace(0, simulation_time, num_points)
-        t1, y1 = step_response(malha_fechada_imc, t)
-        t2, y2 = step_response(malha_fechada_itae, t)
-        
-        # Calcular métricas de desempenho
-        # Tempo de subida (10% a 90%)
-        def calc_rise_time(t, y):
-            y_norm = (y - y[0]) / (y[-1] - y[0]) if y[-1] != y[0] else np.ones_like(y)
-            t_10 = t[np.where(y_norm >= 0.1)[0][0]]
-            t_90 = t[np.where(y_norm >= 0.9)[0][0]]
-            return t_90 - t_10
-        
-        # Sobressinal
-        def calc_overshoot(y):
-            if y[-1] <= 0:
-                return 0
-            return max(0, (np.max(y) / y[-1] - 1) * 100)
-        
-        # Tempo de acomodação (5%)
-        def calc_settling_time(t, y):
-            y_norm = (y - y[0]) / (y[-1] - y[0]) if y[-1] != y[0] else np.ones_like(y)
-            settled = np.where(np.abs(y_norm - 1) <= 0.05)[0]
-            if len(settled) > 0:
-                idx = settled[0]
-                # Verificar se permanece dentro da faixa
-                for i in range(idx, len(y_norm)):
-                    if np.abs(y_norm[i] - 1) > 0.05:
-                        return calc_settling_time(t[i:], y[i:])
-                return t[idx]
-            return t[-1]
-        
-        # Calcular métricas
-        metrics_imc = {
-            "rise_time": float(calc_rise_time(t1, y1)),
-            "overshoot": float(calc_overshoot(y1)),
-            "settling_time": float(calc_settling_time(t1, y1))
-        }
-        
-        metrics_itae = {
-            "rise_time": float(calc_rise_time(t2, y2)),
-            "overshoot": float(calc_overshoot(y2)),
-            "settling_time": float(calc_settling_time(t2, y2))
-        }
+        # Simulação e métricas de desempenho
+        t1, y1, t2, y2, metrics_imc, metrics_itae = await executar(
+            _simular_respostas, k, tau, theta, kp_imc, ti_imc, td_imc, kp_itae, ti_itae, td_itae,
+            simulation_time, num_points, derivative_filter
+        )
         
-        # Plot
-        plt.figure(figsize=(12, 8))
-        
-        # Resposta ao degrau
-        plt.subplot(2, 1, 1)
-        plt.plot(t1, y1, 'b-', linewidth=2, label="IMC")
-        plt.plot(t2, y2, 'r-', linewidth=2, label="ITAE")
-        plt.axhline(1, color='gray', linestyle='--')
-        plt.grid(True)
-        plt.legend()
-        plt.title("Comparação de Respostas - IMC vs ITAE")
-        plt.ylabel("Saída")
-        
-        # Erro
-        plt.subplot(2, 1, 2)
-        plt.plot(t1, 1 - y1, 'b-', linewidth=2, label="Erro IMC")
-        plt.plot(t2, 1 - y2, 'r-', linewidth=2, label="Erro ITAE")
-        plt.axhline(0, color='gray', linestyle='--')
-        plt.grid(True)
-        plt.legend()
-        plt.xlabel("Tempo (s)")
-        plt.ylabel("Erro")
-        
-        # Salvar gráfico
-        plot_id = str(uuid.uuid4())
-        plot_path = f"{PLOTS_DIR}/response_{plot_id}.png"
-        plt.savefig(plot_path)
-        plt.close()
+        if format == "data":
+            plot_path, plot_data = None, await executar(_dados_resposta, t1, y1, t2, y2, max_points)
+        else:
+            plot_data = None
+            await executar(_plot_resposta, plot_path, t1, y1, t2, y2, format)
         
         # Retornar resultados
-        return {
+        resultado = {
             "plot_path": plot_path,
+            **({"plot_data": plot_data} if plot_data else {}),
             "metrics": {
                 "IMC": metrics_imc,
                 "ITAE": metrics_itae
@@ -511,6 +912,7 @@ async def plotar_resposta(
                 }
             }
         }
+        return salvar_resultado(plot_path, resultado) if plot_path else resultado
     
     except HTTPException as e:
         raise e
@@ -518,19 +920,262 @@ async def plotar_resposta(
         logger.error(f"Erro ao gerar gráfico: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao gerar gráfico: {str(e)}")
 
+def _modelos_formulario(models, k, tau, theta):
+    """
+    Modelos [[k, tau, theta], ...] da lista JSON 'models' ou dos campos k, tau e theta.
+    """
+    if models:
+        try:
+            modelos = json.loads(models)
+            modelos = [[float(v) for v in m] for m in modelos]
+            if not modelos or any(len(m) != 3 for m in modelos):
+                raise ValueError
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="'models' deve ser uma lista JSON de [k, tau, theta]")
+    elif k is not None and tau is not None and theta is not None:
+        modelos = [[k, tau, theta]]
+    else:
+        raise HTTPException(status_code=400, detail="Informe k, tau e theta ou a lista 'models'")
+    
+    if any(m[0] <= 0 or m[1] <= 0 or m[2] < 0 for m in modelos):
+        raise HTTPException(
+            status_code=400, 
+            detail="Parâmetros inválidos. k e tau devem ser positivos, theta deve ser não-negativo."
+        )
+    return modelos
+
+def _lambdas_formulario(lambdas, padrao, n_modelos):
+    """
+    Valores de lambda da lista JSON 'lambdas' (ou o padrão), limitando o total de malhas.
+    """
+    if lambdas:
+        try:
+            valores_lambda = [float(v) for v in json.loads(lambdas)]
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="'lambdas' deve ser uma lista JSON de números")
+    else:
+        valores_lambda = padrao
+    
+    if not valores_lambda or any(v <= 0 for v in valores_lambda):
+        raise HTTPException(status_code=400, detail="Os valores de lambda devem ser positivos")
+    
+    if n_modelos * (len(valores_lambda) + 1) > MAX_MALHAS_VARREDURA:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Varredura muito grande. Máximo de {MAX_MALHAS_VARREDURA} malhas por requisição."
+        )
+    return valores_lambda
+
+@app.post("/plot/sweep/")
+async def varrer_lambda(
+    k: float = Form(None),
+    tau: float = Form(None),
+    theta: float = Form(None),
+    lambdas: str = Form(None),  # Lista JSON de valores de lambda, ex.: "[0.5, 1, 2]"
+    lam_min: float = Form(0.1),  # Faixa usada quando 'lambdas' não é informado
+    lam_max: float = Form(10.0),
+    lam_count: int = Form(50),
+    models: str = Form(None),  # Lista JSON opcional de modelos [[k, tau, theta], ...]
+    simulation_time: float = Form(50.0),
+    num_points: int = Form(1000),
+    derivative_filter: float = Form(0.0),
+    format: str = Form("png")  # png ou webp
+):
+    """
+    Simula vários controladores IMC (um por lambda e modelo) e ITAE de uma vez.
+    """
+    try:
+        if format not in FORMATOS_IMAGEM:
+            raise HTTPException(status_code=400, detail="Formato inválido. Use 'png' ou 'webp'")
+        
+        modelos = _modelos_formulario(models, k, tau, theta)
+        valores_lambda = _lambdas_formulario(
+            lambdas, np.linspace(lam_min, lam_max, max(lam_count, 1)).tolist(), len(modelos)
+        )
+        
+        plot_path = caminho_grafico("sweep", chave_grafico(
+            "sweep", models=modelos, lambdas=valores_lambda, simulation_time=simulation_time,
+            num_points=num_points, derivative_filter=derivative_filter, format=format
+        ), format)
+        resultado = obter_resultado(plot_path)
+        if resultado is not None:
+            return resultado
+        
+        # Simulação vetorizada e métricas de todas as malhas
+        t, y, results = await executar(
+            _simular_varredura, modelos, valores_lambda, simulation_time, num_points, derivative_filter
+        )
+        
+        # Gráfico sobreposto
+        await executar(_plot_varredura, plot_path, t, y, results, format)
+        
+        return salvar_resultado(plot_path, {
+            "plot_path": plot_path,
+            "results": results
+        })
+    
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro ao gerar varredura: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar varredura: {str(e)}")
+
+@app.post("/robustness/")
+async def analisar_robustez_pid(
+    k: float = Form(None),
+    tau: float = Form(None),
+    theta: float = Form(None),
+    lam: float = Form(1.0),  # Lambda do IMC quando 'lambdas' não é informado
+    lambdas: str = Form(None),  # Lista JSON de valores de lambda, ex.: "[0.5, 1, 2]"
+    models: str = Form(None),  # Lista JSON opcional de modelos [[k, tau, theta], ...]
+    derivative_filter: float = Form(0.0),  # N do filtro derivativo Td·s/(1 + Td·s/N); 0 = derivativo ideal
+    num_frequencies: int = Form(PONTOS_FREQUENCIA_PADRAO),  # Pontos da grade logarítmica
+    w_min: float = Form(None),  # Faixa da grade em rad/s (padrão: a partir das constantes de tempo)
+    w_max: float = Form(None),
+    frequency_response: bool = Form(False)  # Incluir os dados de Bode e Nyquist
+):
+    """
+    Margens de ganho e de fase, Ms e Mt dos controladores IMC (um por lambda
+    e modelo) e ITAE, pela resposta em frequência exata da malha.
+    """
+    try:
+        modelos = _modelos_formulario(models, k, tau, theta)
+        valores_lambda = _lambdas_formulario(lambdas, [lam], len(modelos))
+        
+        if not 10 <= num_frequencies <= MAX_PONTOS_FREQUENCIA:
+            raise HTTPException(
+                status_code=400, detail=f"num_frequencies deve estar entre 10 e {MAX_PONTOS_FREQUENCIA}"
+            )
+        if (w_min is not None and w_min <= 0) or (w_max is not None and w_max <= 0) or (
+            w_min is not None and w_max is not None and w_min >= w_max
+        ):
+            raise HTTPException(status_code=400, detail="w_min e w_max devem ser positivos, com w_min < w_max")
+        if frequency_response and len(modelos) * (len(valores_lambda) + 1) * num_frequencies > MAX_PONTOS_FREQUENCIA:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Resposta em frequência muito grande. Máximo de {MAX_PONTOS_FREQUENCIA} pontos "
+                       f"(malhas × num_frequencies) com frequency_response."
+            )
+        
+        w, results = await executar(
+            _analisar_robustez, modelos, valores_lambda, derivative_filter, num_frequencies, w_min, w_max,
+            frequency_response
+        )
+        return {
+            **({"frequencies": w.tolist()} if frequency_response else {}),
+            "frequency_range": [float(w[0]), float(w[-1])],
+            "results": results
+        }
+    
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro ao analisar robustez: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao analisar robustez: {str(e)}")
+
+@app.post("/monte-carlo/")
+async def simular_monte_carlo(
+    k: float = Form(...),
+    tau: float = Form(...),
+    theta: float = Form(...),
+    lam: float = Form(1.0),  # Lambda ajustável para IMC
+    k_uncertainty: float = Form(20.0),  # Incerteza de cada parâmetro (± % do valor nominal)
+    tau_uncertainty: float = Form(20.0),
+    theta_uncertainty: float = Form(20.0),
+    samples: int = Form(1000),  # Plantas sorteadas
+    seed: int = Form(None),  # Semente do sorteio (para reproduzir o resultado)
+    percentiles: str = Form(None),  # Lista JSON de percentis (padrão: [5, 25, 50, 75, 95])
+    simulation_time: float = Form(50.0),
+    num_points: int = Form(500),
+    derivative_filter: float = Form(0.0)  # N do filtro derivativo Td·s/(1 + Td·s/N); 0 = derivativo ideal
+):
+    """
+    Simula os controladores IMC e ITAE do modelo nominal com plantas sorteadas
+    na faixa de incerteza e retorna os envelopes de percentis da resposta e as
+    distribuições das métricas.
+    """
+    try:
+        if k <= 0 or tau <= 0 or theta <= 0:
+            raise HTTPException(
+                status_code=400, 
+                detail="Parâmetros inválidos. k, tau e theta devem ser positivos (a regra ITAE exige theta > 0)."
+            )
+        incertezas = (k_uncertainty, tau_uncertainty, theta_uncertainty)
+        if any(not 0 <= u < 100 for u in incertezas):
+            raise HTTPException(status_code=400, detail="As incertezas devem estar entre 0 e 100 (%)")
+        if not 1 <= samples <= MONTE_CARLO_AMOSTRAS_MAX:
+            raise HTTPException(status_code=400, detail=f"samples deve estar entre 1 e {MONTE_CARLO_AMOSTRAS_MAX}")
+        if not 2 <= num_points <= 5000 or simulation_time <= 0:
+            raise HTTPException(
+                status_code=400, detail="num_points deve estar entre 2 e 5000 e simulation_time deve ser positivo"
+            )
+        if percentiles:
+            try:
+                percentis = [float(p) for p in json.loads(percentiles)]
+                if not percentis or any(not 0 <= p <= 100 for p in percentis):
+                    raise ValueError
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="'percentiles' deve ser uma lista JSON de números entre 0 e 100")
+        else:
+            percentis = list(PERCENTIS_PADRAO)
+        
+        kp_imc, ti_imc, td_imc = sintonia_imc(k, tau, theta, lam)
+        kp_itae, ti_itae, td_itae = sintonia_itae(k, tau, theta)
+        controladores = [(kp_imc, ti_imc, td_imc), (kp_itae, ti_itae, td_itae)]
+        
+        # Blocos de plantas simulados em paralelo no pool
+        modelos = amostrar_modelos(k, tau, theta, incertezas, samples, seed)
+        t = np.linspace(0, simulation_time, num_points)
+        # Mesma grade das métricas para todos os blocos, independente de num_points
+        grade = grade_simulacao(simulation_time)
+        n_blocos = max(1, min(execucao.EXECUCAO_WORKERS, samples // MONTE_CARLO_BLOCO_MIN))
+        partes = await asyncio.gather(*(
+            executar(simular_bloco, bloco, controladores, t, derivative_filter, grade)
+            for bloco in np.array_split(modelos, n_blocos)
+        ))
+        
+        # Envelopes em uma thread do servidor: no modo "process", o pool serializaria as respostas de novo
+        with etapa("envelopes"):
+            imc, itae = await asyncio.to_thread(resumir_monte_carlo, partes, percentis)
+        
+        return {
+            "samples": samples,
+            "seed": seed,
+            "nominal": {"k": k, "tau": tau, "theta": theta},
+            "uncertainty_percent": dict(zip(("k", "tau", "theta"), incertezas)),
+            "time": t.tolist(),
+            "controllers": {
+                "IMC": {"Kp": _finito(kp_imc), "Ti": _finito(ti_imc), "Td": _finito(td_imc), "lambda": lam},
+                "ITAE": {"Kp": _finito(kp_itae), "Ti": _finito(ti_itae), "Td": _finito(td_itae)}
+            },
+            "results": {"IMC": imc, "ITAE": itae}
+        }
+    
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro na simulação de Monte Carlo: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro na simulação de Monte Carlo: {str(e)}")
+
 @app.post("/analyze-filter/")
 async def analisar_filtro(
     file_id: str = Form(...),
     window_lengths: str = Form("[11, 21, 31, 51]"),  # Lista de tamanhos de janela para testar
-    polyorder: int = Form(2)  # Ordem do polinômio
+    polyorder: int = Form(2),  # Ordem do polinômio
+    criterion: str = Form("gcv"),  # Critério da recomendação automática: gcv ou whiteness
+    max_window: int = Form(None),  # Maior janela da grade de busca (padrão 151)
+    format: str = Form("png"),  # png ou webp (gráfico renderizado) ou data (séries reduzidas)
+    max_points: int = Form(PONTOS_PADRAO)  # Pontos por série no formato data
 ):
     """
-    Analisa o efeito de diferentes parâmetros de filtro nos dados.
+    Analisa o efeito de diferentes parâmetros de filtro nos dados
+    e recomenda automaticamente uma janela.
     """
     try:
+        _validar_formato(format, max_points)
+        
         # Verificar se o arquivo existe
-        csv_path = f"{DATASETS_DIR}/{file_id}.csv"
-        if not os.path.exists(csv_path):
+        if not dataset_existe(file_id):
             raise HTTPException(status_code=404, detail="Arquivo não encontrado")
         
         # Converter string para lista
@@ -544,53 +1189,25 @@ async def analisar_filtro(
         # Garantir que todos os tamanhos de janela sejam ímpares
         window_lengths = [w if w % 2 == 1 else w + 1 for w in window_lengths]
         
-        # Carregar dados
-        df = pd.read_csv(csv_path)
-        t = df.iloc[:, 0].values
-        y_original = df.iloc[:, 1].values
+        if criterion not in CRITERIOS:
+            raise HTTPException(status_code=400, detail=f"Critério inválido. Use um de: {', '.join(CRITERIOS)}")
         
         # Aplicar diferentes filtros
-        plt.figure(figsize=(12, 8))
-        plt.plot(t, y_original, 'k-', alpha=0.5, label='Original')
-        
-        results = []
-        for window in window_lengths:
-            if window < 3:
-                continue
-                
-            if polyorder >= window:
-                po = window - 1
-            else:
-                po = polyorder
-                
-            y_filtered = savgol_filter(y_original, window_length=window, polyorder=po)
-            plt.plot(t, y_filtered, '-', label=f'Janela={window}, Ordem={po}')
-            
-            # Calcular métricas de suavização
-            noise_reduction = np.std(y_original - y_filtered) / np.std(y_original)
-            signal_preservation = np.corrcoef(y_original, y_filtered)[0, 1]
-            
-            results.append({
-                "window_length": window,
-                "polyorder": po,
-                "noise_reduction": float(noise_reduction),
-                "signal_preservation": float(signal_preservation)
-            })
-        
-        plt.grid(True)
-        plt.legend()
-        plt.title('Comparação de Diferentes Parâmetros de Filtro')
-        plt.xlabel('Tempo')
-        plt.ylabel('Saída')
+        results, recommended = await executar(
+            _analisar_filtros, file_id, window_lengths, polyorder, criterion, max_window
+        )
         
-        # Salvar gráfico
-        plot_path = f"{PLOTS_DIR}/{file_id}_filter_analysis.png"
-        plt.savefig(plot_path)
-        plt.close()
+        # Salvar gráfico (ou séries)
+        if format == "data":
+            plot_path, plot_data = None, await executar(_dados_filtros, file_id, results, recommended, max_points)
+        else:
+            plot_path, plot_data = await executar(_plot_filtros, file_id, results, recommended, format), None
         
         return {
             "plot_path": plot_path,
-            "filter_results": results
+            **({"plot_data": plot_data} if plot_data else {}),
+            "filter_results": results,
+            "recommended": recommended
         }
     
     except HTTPException as e:
@@ -599,6 +1216,182 @@ async def analisar_filtro(
         logger.error(f"Erro ao analisar filtro: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao analisar filtro: {str(e)}")
 
+@app.post("/jobs/identify")
+async def criar_job_identificacao(
+    file_ids: str = Form("all"),  # Lista JSON de file_ids ou "all"
+    metodo: str = Form("smith"),
+    window_length: int = Form(11),
+    polyorder: int = Form(3),
+    auto_filter: bool = Form(False),  # true: filtro recomendado para cada dataset
+    offset_percent: float = Form(15.0),
+    render_plots: bool = Form(True)  # false para execuções em lote sem gráficos
+):
+    """
+    Inicia a identificação em lote de vários datasets em um pool de processos.
+    """
+    if metodo not in METODOS:
+        raise HTTPException(status_code=400, detail="Método inválido. Use 'smith', 'sundaresan' ou 'least_squares'")
+    
+    if file_ids == "all":
+        ids = listar_datasets()
+    else:
+        try:
+            ids = json.loads(file_ids)
+            if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+                raise ValueError
+        except ValueError:
+            raise HTTPException(status_code=400, detail="'file_ids' deve ser \"all\" ou uma lista JSON de file_ids")
+        faltando = [i for i in ids if not dataset_existe(i)]
+        if faltando:
+            raise HTTPException(status_code=404, detail=f"Arquivos não encontrados: {faltando}")
+    
+    if auto_filter:
+        # Janela e ordem escolhidas por dataset, dentro de cada tarefa
+        window_length = polyorder = None
+    else:
+        if window_length % 2 == 0:
+            window_length += 1
+        window_length = max(window_length, 3)
+    
+    job = jobs.criar_job(
+        ids, metodo, window_length, polyorder, offset_percent,
+        renderizar=_plot_identificacao if render_plots else None
+    )
+    return job.resumo(incluir_resultados=False)
+
+@app.get("/jobs/{job_id}")
+def consultar_job(job_id: str, include_results: bool = True):
+    """
+    Progresso e resultados (parciais) de um job.
+    """
+    job = jobs.obter_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.resumo(incluir_resultados=include_results)
+
+@app.post("/jobs/{job_id}/cancel")
+def cancelar_job(job_id: str):
+    """
+    Cancela as tarefas ainda não iniciadas de um job.
+    """
+    job = jobs.obter_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    job.cancelar()
+    return job.resumo(incluir_resultados=False)
+
+def _medidores():
+    # Estado dos caches, do pool de execução e das sessões para o /metrics
+    caches = {"signals": cache_sinais.cache.estatisticas(), "images": imagens.estatisticas()}
+    pool = execucao.estatisticas()
+    compartilhada = memoria_compartilhada.estatisticas()
+    def por_cache(campo):
+        return [({"cache": nome}, e[campo]) for nome, e in caches.items()]
+    medidores = [
+        ("api_cache_hits_total", "counter", "Acertos dos caches em memória.", por_cache("hits")),
+        ("api_cache_misses_total", "counter", "Falhas dos caches em memória.", por_cache("misses")),
+        ("api_cache_evictions_total", "counter", "Remoções por falta de espaço nos caches.", por_cache("evictions")),
+        ("api_cache_hit_ratio", "gauge", "Taxa de acerto dos caches.", por_cache("hit_rate")),
+        ("api_cache_bytes", "gauge", "Bytes ocupados nos caches.", por_cache("bytes")),
+        ("api_cache_entries", "gauge", "Entradas nos caches.", por_cache("entries")),
+        ("api_pool_workers", "gauge", "Workers do pool de execução.", [({}, pool["workers"])]),
+        ("api_pool_in_flight", "gauge", "Tarefas em andamento no pool (executando e na fila).", [({}, pool["in_flight"])]),
+        ("api_pool_queued", "gauge", "Tarefas aguardando um worker livre.", [({}, pool["queued"])]),
+        ("api_pool_max_in_flight", "gauge", "Limite de tarefas em andamento antes do HTTP 503.", [({}, pool["max_in_flight"])]),
+        ("api_sessions_open", "gauge", "Sessões interativas de identificação abertas.", [({}, sessoes.estatisticas()["open"])])
+    ]
+    if compartilhada["enabled"]:
+        medidores += [
+            ("api_shared_blocks", "gauge", "Blocos de memória compartilhada no host.", [({}, compartilhada["blocks"])]),
+            ("api_shared_bytes", "gauge", "Bytes em blocos de memória compartilhada no host.", [({}, compartilhada["bytes"])]),
+            ("api_shared_max_bytes", "gauge", "Limite da memória compartilhada antes das remoções.", [({}, compartilhada["max_bytes"])]),
+            ("api_shared_attached", "gauge", "Blocos compartilhados anexados por este processo.", [({}, compartilhada["attached"])])
+        ]
+    return medidores
+
+@app.get("/metrics")
+def metricas_prometheus():
+    """
+    Métricas no formato de texto do Prometheus.
+    """
+    return PlainTextResponse(instrumentacao.exportar(_medidores()), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{perfil_id}")
+def consultar_perfil(perfil_id: str):
+    """
+    Pilhas amostradas de uma requisição feita com X-Profile: 1 (formato folded).
+    """
+    perfil = instrumentacao.obter_perfil(perfil_id)
+    if perfil is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return PlainTextResponse(perfil)
+
+@app.get("/datasets")
+def listar_catalogo(
+    filename: str = None,  # Trecho do nome do arquivo enviado
+    method: str = None,  # Método da última identificação
+    identified: bool = None,
+    samples_min: int = None,
+    samples_max: int = None,
+    noise_std_max: float = None,
+    tau_min: float = None,
+    tau_max: float = None,
+    theta_min: float = None,
+    theta_max: float = None,
+    sort: str = "-uploaded_at",  # Campo de ordenação; prefixo "-" para ordem decrescente
+    limit: int = 50,
+    offset: int = 0
+):
+    """
+    Lista os datasets do catálogo com filtros, ordenação e paginação.
+    """
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit deve estar entre 1 e 500")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset não pode ser negativo")
+    filtros = {
+        "filename": filename,
+        "method": method,
+        "identified": identified,
+        "samples_min": samples_min,
+        "samples_max": samples_max,
+        "noise_std_max": noise_std_max,
+        "tau_min": tau_min,
+        "tau_max": tau_max,
+        "theta_min": theta_min,
+        "theta_max": theta_max
+    }
+    try:
+        total, itens = catalogo.listar(
+            filtros, ordenar=sort.lstrip("-"), descendente=sort.startswith("-"), limite=limit, deslocamento=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"total": total, "limit": limit, "offset": offset, "items": itens}
+
+@app.get("/datasets/{file_id}")
+def consultar_catalogo(file_id: str):
+    """
+    Resumo e última identificação de um dataset do catálogo.
+    """
+    item = catalogo.obter(file_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Dataset não encontrado no catálogo")
+    return item
+
+@app.get("/datasets/{file_id}/csv")
+def exportar_dataset_csv(file_id: str):
+    """
+    Exporta um dataset armazenado no formato CSV.
+    """
+    if not dataset_existe(file_id):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return PlainTextResponse(
+        exportar_csv(file_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{file_id}.csv"'}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,364 @@
+"""
+Benchmark dos endpoints da API sobre os experimentos de datasets/.
+
+Cada conteúdo distinto entre os arquivos .mat e .csv de datasets/ é
+enviado uma vez ao /upload/ (arquivos idênticos byte a byte seriam
+deduplicados pelo servidor e mediriam só o atalho do hash) e, com os
+file_ids resultantes, são medidos /identify/ (cada método), /analyze-filter/,
+/tune/ e /plot/ pelo TestClient do FastAPI, sem servidor. Por endpoint:
+
+- latência (p50, p90, p99, média e máximo) nas repetições sequenciais, e a
+  mediana da primeira passada (caches vazios) em separado;
+- vazão (requisições/s) com vários clientes simultâneos;
+- pico de memória alocada (tracemalloc) em uma passada à parte, para não
+  distorcer as latências. No modo EXECUCAO_MODO=process, só conta o
+  processo principal.
+
+A partida do servidor é medida à parte, em processos novos: o import do
+backend, a primeira requisição a GET / e o primeiro /plot/, que ainda paga
+os imports sob demanda e as inicializações do matplotlib.
+
+O servidor roda em um diretório temporário com cópia dos arquivos, sem
+alterar datasets/ e plots/. /tune/ e /plot/ usam um conjunto fixo de
+modelos (um por arquivo), para que a carga não dependa do resultado da
+identificação.
+
+    python benchmark.py executar --saida atual.json [--comparar base.json]
+    python benchmark.py comparar base.json atual.json [--limite 0.2]
+
+A comparação aponta as métricas que pioraram mais que o limite relativo
+(latências e memória maiores, vazão menor) e termina com código 1 se houver
+regressões.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+METODOS_IDENTIFICACAO = ("smith", "sundaresan", "least_squares")
+
+# Métricas comparadas: nome -> True se valores maiores são piores
+METRICAS = {
+    "p50_ms": True,
+    "p90_ms": True,
+    "p99_ms": True,
+    "cold_p50_ms": True,
+    "throughput_rps": False,
+    "peak_memory_mb": True,
+    "import_ms": True,
+    "first_root_ms": True,
+    "first_plot_ms": True
+}
+
+# Executado em um processo novo a cada medição da partida
+_SCRIPT_PARTIDA = """
+import sys, json, time
+inicio = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import backend
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(backend.app) as cliente:
+    t0 = time.perf_counter()
+    cliente.get("/")
+    raiz = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cliente.post("/plot/", data={"k": 1, "tau": 10, "theta": 2})
+    plot = time.perf_counter() - t0
+print(json.dumps({
+    "import_ms": (importado - inicio) * 1000, "first_root_ms": raiz * 1000, "first_plot_ms": plot * 1000
+}))
+"""
+
+
+def _distintas(fontes):
+    """
+    Primeiro arquivo de cada conteúdo (SHA-256) entre as fontes.
+    """
+    vistos, distintas = set(), []
+    for fonte in fontes:
+        with open(fonte, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        if sha256 not in vistos:
+            vistos.add(sha256)
+            distintas.append(fonte)
+    return distintas
+
+
+def _modelos(n):
+    # Modelos FOPDT fixos para /tune/ e /plot/ (um por arquivo)
+    return [
+        {"k": 0.5 + 0.05 * i, "tau": 5.0 + 1.5 * i, "theta": 0.5 + 0.3 * i}
+        for i in range(n)
+    ]
+
+
+def _requisicoes(file_ids, formato):
+    """
+    Requisições (url, dados do formulário) de uma passada, por endpoint.
+    """
+    casos = {}
+    for metodo in METODOS_IDENTIFICACAO:
+        casos[f"identify_{metodo}"] = [
+            ("/identify/", {"file_id": file_id, "metodo": metodo, "format": formato}) for file_id in file_ids
+        ]
+    casos["analyze_filter"] = [
+        ("/analyze-filter/", {"file_id": file_id, "format": formato}) for file_id in file_ids
+    ]
+    modelos = _modelos(len(file_ids))
+    casos["tune"] = [("/tune/", modelo) for modelo in modelos]
+    casos["plot"] = [
+        ("/plot/", {**modelo, "simulation_time": 10 * (modelo["tau"] + modelo["theta"]), "format": formato})
+        for modelo in modelos
+    ]
+    return casos
+
+
+def _percentis(latencias):
+    ms = np.asarray(latencias) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max())
+    }
+
+
+def _medir(enviar, requisicoes):
+    latencias, status = [], {}
+    for requisicao in requisicoes:
+        inicio = time.perf_counter()
+        codigo = enviar(requisicao)
+        latencias.append(time.perf_counter() - inicio)
+        status[codigo] = status.get(codigo, 0) + 1
+    return latencias, status
+
+
+def _memoria(enviar, requisicoes):
+    tracemalloc.start()
+    try:
+        for requisicao in requisicoes:
+            enviar(requisicao)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 * 1024)
+
+
+def _vazao(enviar, requisicoes, clientes):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as executor:
+        list(executor.map(enviar, requisicoes))
+    return len(requisicoes) / (time.perf_counter() - inicio)
+
+
+def medir_partida(repeticoes=3):
+    """
+    Medianas do import do backend e das primeiras requisições, cada medição
+    em um processo novo e em um diretório temporário.
+    """
+    medidas = []
+    ambiente = {**os.environ, "COLETOR_INTERVALO_S": "0"}
+    for _ in range(repeticoes):
+        diretorio = tempfile.mkdtemp(prefix="benchmark_partida_")
+        try:
+            saida = subprocess.run(
+                [sys.executable, "-c", _SCRIPT_PARTIDA, RAIZ], cwd=diretorio, env=ambiente,
+                capture_output=True, text=True, check=True
+            ).stdout
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+        medidas.append(json.loads(saida.strip().splitlines()[-1]))
+    return {nome: float(np.median([m[nome] for m in medidas])) for nome in medidas[0]}
+
+
+def executar(repeticoes=3, clientes=4, arquivos=None, formato="png", endpoints=None, log=print):
+    """
+    Roda o benchmark em um diretório temporário e retorna os resultados.
+    """
+    partida = medir_partida(repeticoes)
+    log(f"partida: import {partida['import_ms']:.0f} ms, primeiro GET / {partida['first_root_ms']:.0f} ms, "
+        f"primeiro /plot/ {partida['first_plot_ms']:.0f} ms")
+
+    arquivos_encontrados = sorted(
+        os.path.join(RAIZ, "datasets", nome) for nome in os.listdir(os.path.join(RAIZ, "datasets"))
+        if nome.endswith((".mat", ".csv"))
+    )
+    fontes = _distintas(arquivos_encontrados)[:arquivos]
+    log(f"datasets: {len(arquivos_encontrados)} arquivos, {len(fontes)} conteúdos distintos medidos")
+    diretorio = tempfile.mkdtemp(prefix="benchmark_")
+    cwd = os.getcwd()
+    os.environ.setdefault("COLETOR_INTERVALO_S", "0")
+    try:
+        os.chdir(diretorio)
+        sys.path.insert(0, RAIZ)
+        from fastapi.testclient import TestClient
+        import backend
+
+        resultados = {"startup": partida}
+        with TestClient(backend.app) as cliente:
+            def postar(requisicao):
+                url, dados = requisicao
+                return cliente.post(url, data=dados).status_code
+
+            # Upload: uma vez por conteúdo distinto, para medir a ingestão e não o atalho do hash
+            file_ids, latencias, status, deduplicados = [], [], {}, 0
+            tracemalloc.start()
+            for fonte in fontes:
+                inicio = time.perf_counter()
+                with open(fonte, "rb") as f:
+                    resposta = cliente.post(
+                        "/upload/", files={"file": (os.path.basename(fonte), f)}, data={"format": formato}
+                    )
+                latencias.append(time.perf_counter() - inicio)
+                status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+                if resposta.status_code == 200:
+                    file_ids.append(resposta.json()["file_id"])
+                    deduplicados += resposta.json()["deduplicated"]
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultados["upload"] = {
+                "requests": len(latencias),
+                "status": status,
+                "deduplicated": deduplicados,
+                **_percentis(latencias),
+                "cold_p50_ms": float(np.median(latencias) * 1000),
+                "throughput_rps": len(latencias) / sum(latencias),
+                "peak_memory_mb": pico / (1024 * 1024)
+            }
+            log(f"upload: {len(file_ids)} datasets ({deduplicados} deduplicados), p50 {resultados['upload']['p50_ms']:.1f} ms")
+
+            for nome, requisicoes in _requisicoes(file_ids, formato).items():
+                if endpoints and nome not in endpoints:
+                    continue
+                frio, status = _medir(postar, requisicoes)
+                latencias = list(frio)
+                for _ in range(repeticoes - 1):
+                    quente, status_quente = _medir(postar, requisicoes)
+                    latencias += quente
+                    for codigo, n in status_quente.items():
+                        status[codigo] = status.get(codigo, 0) + n
+                resultados[nome] = {
+                    "requests": len(latencias),
+                    "status": status,
+                    **_percentis(latencias),
+                    "cold_p50_ms": float(np.median(frio) * 1000),
+                    "throughput_rps": _vazao(postar, requisicoes, clientes),
+                    "peak_memory_mb": _memoria(postar, requisicoes)
+                }
+                r = resultados[nome]
+                log(f"{nome}: p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms, "
+                    f"{r['throughput_rps']:.1f} req/s, pico {r['peak_memory_mb']:.1f} MB")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "execution_mode": os.environ.get("EXECUCAO_MODO", "thread"),
+            "files": len(arquivos_encontrados),
+            "distinct_datasets": len(fontes),
+            "repetitions": repeticoes,
+            "clients": clientes,
+            "format": formato
+        },
+        "endpoints": resultados
+    }
+
+
+def comparar(base, atual, limite=0.2, minimo_ms=1.0):
+    """
+    Regressões de `atual` em relação a `base`: lista de (endpoint, métrica,
+    valor base, valor atual, variação relativa). Diferenças de latência
+    menores que minimo_ms são ignoradas (ruído de medição).
+    """
+    regressoes = []
+    for endpoint, antes in base["endpoints"].items():
+        depois = atual["endpoints"].get(endpoint)
+        if depois is None:
+            continue
+        for metrica, maior_pior in METRICAS.items():
+            if metrica not in antes or metrica not in depois or antes[metrica] <= 0:
+                continue
+            variacao = (depois[metrica] - antes[metrica]) / antes[metrica]
+            if not maior_pior:
+                variacao = -variacao
+            if metrica.endswith("_ms") and abs(depois[metrica] - antes[metrica]) < minimo_ms:
+                continue
+            if variacao > limite:
+                regressoes.append((endpoint, metrica, antes[metrica], depois[metrica], variacao))
+    return regressoes
+
+
+def _relatorio(base, atual, limite, minimo_ms):
+    regressoes = comparar(base, atual, limite, minimo_ms)
+    print(f"{'endpoint':<26}{'métrica':<18}{'base':>12}{'atual':>12}{'variação':>10}")
+    for endpoint in atual["endpoints"]:
+        for metrica in METRICAS:
+            antes = base["endpoints"].get(endpoint, {}).get(metrica)
+            depois = atual["endpoints"][endpoint].get(metrica)
+            if antes is None or depois is None:
+                continue
+            variacao = (depois - antes) / antes if antes else 0.0
+            marca = "  REGRESSÃO" if any(r[:2] == (endpoint, metrica) for r in regressoes) else ""
+            print(f"{endpoint:<26}{metrica:<18}{antes:>12.2f}{depois:>12.2f}{variacao:>+10.1%}{marca}")
+    if regressoes:
+        print(f"\n{len(regressoes)} regressões acima de {limite:.0%}")
+    else:
+        print(f"\nNenhuma regressão acima de {limite:.0%}")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da API")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_executar = comandos.add_parser("executar", help="roda o benchmark e salva os resultados")
+    p_executar.add_argument("--saida", default="benchmark.json", help="arquivo JSON dos resultados")
+    p_executar.add_argument("--repeticoes", type=int, default=3, help="passadas sequenciais por endpoint")
+    p_executar.add_argument("--clientes", type=int, default=4, help="clientes simultâneos na medição de vazão")
+    p_executar.add_argument("--arquivos", type=int, default=None, help="usar só os N primeiros conteúdos distintos")
+    p_executar.add_argument("--formato", default="png", choices=("png", "webp", "data"))
+    p_executar.add_argument("--endpoints", nargs="*", help="medir só estes endpoints (além do upload)")
+    p_executar.add_argument("--comparar", help="baseline JSON para comparar ao final")
+    p_executar.add_argument("--limite", type=float, default=0.2, help="piora relativa que conta como regressão")
+    p_executar.add_argument("--minimo-ms", type=float, default=1.0, help="diferença de latência ignorada")
+
+    p_comparar = comandos.add_parser("comparar", help="compara dois resultados salvos")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("atual")
+    p_comparar.add_argument("--limite", type=float, default=0.2)
+    p_comparar.add_argument("--minimo-ms", type=float, default=1.0)
+
+    args = parser.parse_args()
+    if args.comando == "executar":
+        atual = executar(args.repeticoes, args.clientes, args.arquivos, args.formato, args.endpoints)
+        with open(args.saida, "w") as f:
+            json.dump(atual, f, indent=2)
+        print(f"Resultados salvos em {args.saida}")
+        if not args.comparar:
+            sys.exit(0)
+        with open(args.comparar) as f:
+            base = json.load(f)
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.atual) as f:
+            atual = json.load(f)
+    sys.exit(1 if _relatorio(base, atual, args.limite, args.minimo_ms) else 0)
@@ -0,0 +1,251 @@
+"""
+Cache endereçado por conteúdo dos gráficos e coleta de lixo de plots/ e datasets/.
+
+Os gráficos de simulação são nomeados pelo hash dos parâmetros de entrada
+(``plots/response_<hash>.png``), com o resultado da requisição salvo ao lado
+em ``.json``. Uma requisição repetida reaproveita os dois arquivos sem
+simular nem renderizar de novo. O mtime marca o último uso, e o coletor
+remove os gráficos mais antigos que o limite de idade e, em seguida, os
+menos usados até caber no limite de tamanho. Também remove os gráficos e
+arquivos de datasets que não pertencem mais a nenhum dataset.
+
+As imagens recém-geradas ou lidas ficam também em um cache em memória,
+com o ETag (hash do conteúdo) usado para servi-las em GET /plots/{nome}.
+
+Coleta única, sem o servidor:
+
+    python cache_graficos.py coletar
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from armazenamento import DATASETS_DIR, dataset_existe
+from cache_sinais import CacheLRU
+from instrumentacao import etapa
+
+logger = logging.getLogger(__name__)
+
+PLOTS_DIR = "plots"
+# Incrementar quando a aparência dos gráficos mudar, para não reaproveitar os antigos
+VERSAO_GRAFICOS = 1
+
+# Limites do coletor: tamanho total de plots/ (MB) e idade desde o último uso (horas)
+PLOTS_MAX_MB = float(os.environ.get("PLOTS_MAX_MB", "200"))
+PLOTS_MAX_IDADE_H = float(os.environ.get("PLOTS_MAX_IDADE_H", "168"))
+# Intervalo entre coletas (s); 0 desativa o coletor em segundo plano
+COLETOR_INTERVALO_S = float(os.environ.get("COLETOR_INTERVALO_S", "600"))
+# Arquivos mais novos que isso nunca são tratados como órfãos (upload em andamento)
+CARENCIA_ORFAOS_S = 3600
+# Tamanho máximo do cache de imagens em memória (MB)
+CACHE_IMAGENS_MB = float(os.environ.get("CACHE_IMAGENS_MB", "64"))
+# Prefixos dos gráficos nomeados pelo hash dos parâmetros (conteúdo imutável)
+PREFIXOS_IMUTAVEIS = ("response_", "sweep_")
+
+_UUID = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})")
+
+
+def chave_grafico(tipo, **parametros):
+    """
+    Hash dos parâmetros de entrada de um gráfico.
+    """
+    conteudo = json.dumps([VERSAO_GRAFICOS, tipo, parametros], sort_keys=True)
+    return hashlib.sha256(conteudo.encode()).hexdigest()[:32]
+
+
+def caminho_grafico(tipo, chave, formato="png"):
+    return f"{PLOTS_DIR}/{tipo}_{chave}.{formato}"
+
+
+imagens = CacheLRU(CACHE_IMAGENS_MB)
+
+
+def _etag(conteudo):
+    return '"' + hashlib.sha256(conteudo).hexdigest()[:32] + '"'
+
+
+def salvar_imagem(plot_path, conteudo):
+    """
+    Grava a imagem renderizada em plots/ (escrita atômica) e a mantém em memória.
+    """
+    tmp_path = f"{plot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with etapa("gravar_imagem"):
+        with open(tmp_path, "wb") as f:
+            f.write(conteudo)
+        os.replace(tmp_path, plot_path)
+    st = os.stat(plot_path)
+    nome = os.path.basename(plot_path)
+    imagens.put(("imagem", nome, (st.st_mtime_ns, st.st_size)), (conteudo, _etag(conteudo)), len(conteudo))
+    return plot_path
+
+
+def obter_imagem(nome):
+    """
+    (conteúdo, etag) da imagem plots/<nome>, da memória quando possível, ou None.
+    """
+    path = f"{PLOTS_DIR}/{nome}"
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    chave = ("imagem", nome, (st.st_mtime_ns, st.st_size))
+    item = imagens.get(chave)
+    if item is None:
+        # Gravada por outro processo (pool de processos ou jobs) ou antes de reiniciar
+        imagens.invalidar(nome, manter=chave[2])
+        with open(path, "rb") as f:
+            conteudo = f.read()
+        item = imagens.put(chave, (conteudo, _etag(conteudo)), len(conteudo))
+    return item
+
+
+def imutavel(nome):
+    return nome.startswith(PREFIXOS_IMUTAVEIS)
+
+
+def _caminho_resultado(plot_path):
+    return os.path.splitext(plot_path)[0] + ".json"
+
+
+def obter_resultado(plot_path):
+    """
+    Resultado salvo junto ao gráfico, ou None se algum dos dois não existir.
+    Um acerto atualiza o mtime (último uso) dos arquivos.
+    """
+    try:
+        with open(_caminho_resultado(plot_path)) as f:
+            resultado = json.load(f)
+        os.utime(plot_path)
+        os.utime(_caminho_resultado(plot_path))
+    except (OSError, ValueError):
+        return None
+    return resultado
+
+
+def salvar_resultado(plot_path, resultado):
+    """
+    Salva o resultado ao lado do gráfico já renderizado (escrita atômica).
+    """
+    path = _caminho_resultado(plot_path)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(resultado, f)
+    os.replace(tmp_path, path)
+    return resultado
+
+
+def _orfao(nome, diretorio):
+    # Arquivo de um dataset que não existe mais, ou temporário abandonado
+    if nome.endswith(".tmp"):
+        return True
+    m = _UUID.match(nome)
+    if m is None:
+        return False
+    if diretorio == DATASETS_DIR and nome.endswith((".npy", ".csv")):
+        return False
+    return not dataset_existe(m.group(1))
+
+
+def coletar(max_mb=None, max_idade_h=None):
+    """
+    Remove órfãos, gráficos sem uso há mais de max_idade_h e, por fim, os
+    gráficos menos usados até plots/ caber em max_mb. Retorna as contagens.
+    """
+    max_bytes = (max_mb if max_mb is not None else PLOTS_MAX_MB) * 1024 * 1024
+    max_idade_s = (max_idade_h if max_idade_h is not None else PLOTS_MAX_IDADE_H) * 3600
+    agora = time.time()
+    removidos = {"orphans": 0, "expired": 0, "evicted": 0, "bytes_freed": 0}
+
+    def remover(path, tamanho, motivo):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        removidos[motivo] += 1
+        removidos["bytes_freed"] += tamanho
+
+    # Órfãos em datasets/
+    for nome in os.listdir(DATASETS_DIR):
+        path = f"{DATASETS_DIR}/{nome}"
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            # Temporário renomeado ou dataset removido desde o listdir
+            continue
+        if agora - st.st_mtime > CARENCIA_ORFAOS_S and _orfao(nome, DATASETS_DIR):
+            remover(path, st.st_size, "orphans")
+
+    # plots/: órfãos e expirados; o restante entra na ordem de uso
+    restantes = []
+    for nome in os.listdir(PLOTS_DIR):
+        path = f"{PLOTS_DIR}/{nome}"
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        idade = agora - st.st_mtime
+        if idade > CARENCIA_ORFAOS_S and _orfao(nome, PLOTS_DIR):
+            remover(path, st.st_size, "orphans")
+        elif idade > max_idade_s:
+            remover(path, st.st_size, "expired")
+        else:
+            restantes.append((st.st_mtime, st.st_size, path))
+
+    total = sum(tamanho for _, tamanho, _ in restantes)
+    for _, tamanho, path in sorted(restantes):
+        if total <= max_bytes:
+            break
+        remover(path, tamanho, "evicted")
+        total -= tamanho
+
+    removidos["bytes_remaining"] = total
+    if any(removidos[m] for m in ("orphans", "expired", "evicted")):
+        logger.info(f"Coleta de plots/ e datasets/: {removidos}")
+    return removidos
+
+
+_parar = threading.Event()
+_coletor = None
+
+
+def _executar_coletor():
+    while True:
+        try:
+            coletar()
+        except Exception as e:
+            logger.error(f"Erro na coleta de plots/: {str(e)}")
+        if _parar.wait(COLETOR_INTERVALO_S):
+            return
+
+
+def iniciar_coletor():
+    """
+    Inicia a coleta periódica em uma thread de fundo.
+    """
+    global _coletor
+    if COLETOR_INTERVALO_S <= 0 or _coletor is not None:
+        return
+    _parar.clear()
+    _coletor = threading.Thread(target=_executar_coletor, name="coletor-plots", daemon=True)
+    _coletor.start()
+
+
+def parar_coletor():
+    global _coletor
+    if _coletor is not None:
+        _parar.set()
+        _coletor.join()
+        _coletor = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "coletar":
+        print("Uso: python cache_graficos.py coletar")
+        sys.exit(1)
+    print(coletar())
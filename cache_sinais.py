@@ -0,0 +1,268 @@
+"""
+Cache LRU em memória dos sinais carregados e suavizados.
+
+Guarda os arrays tempo/saida/entrada por file_id e a saída suavizada por
+(file_id, window_length, polyorder). As chaves incluem a assinatura
+(mtime, tamanho) do arquivo do dataset, de modo que uma alteração no
+arquivo invalida as entradas antigas.
+
+Com MEMORIA_COMPARTILHADA=1, os sinais e as saídas suavizadas ficam em
+blocos de memória compartilhada entre os processos do host
+(memoria_compartilhada.py); o cache local guarda apenas as visões dos
+blocos anexados.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import memoria_compartilhada as compartilhada
+from armazenamento import caminho_dataset, carregar_dataset
+from filtros import recomendar_filtro
+from instrumentacao import etapa
+
+# Tamanho máximo do cache em MB
+CACHE_SINAIS_MB = float(os.environ.get("CACHE_SINAIS_MB", "256"))
+
+
+class CacheLRU:
+    """
+    Cache LRU limitado por bytes, com contadores de acerto, falha e remoção.
+    ao_remover(chave), se dado, é chamado para cada entrada que sai do cache,
+    inclusive a substituída por outro valor na mesma chave, e para cada valor
+    maior que o cache inteiro, que nem chega a ser guardado.
+    """
+
+    def __init__(self, max_mb, ao_remover=None):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ao_remover = ao_remover
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item[0]
+
+    def _removidas(self, chaves):
+        # Chamado fora do lock: ao_remover pode fazer E/S
+        if self.ao_remover is not None:
+            for chave in chaves:
+                self.ao_remover(chave)
+
+    def put(self, chave, valor, tamanho):
+        removidas = []
+        with self._lock:
+            if chave in self._itens:
+                anterior, tam = self._itens.pop(chave)
+                self.bytes_usados -= tam
+                if anterior is not valor:
+                    # Duas falhas simultâneas na mesma chave: o valor substituído
+                    # também tem dono (a referência ao bloco compartilhado)
+                    removidas.append(chave)
+            if tamanho > self.max_bytes:
+                # Não guardado: o dono do valor (ex.: o bloco compartilhado) precisa soltá-lo
+                removidas.append(chave)
+            else:
+                self._itens[chave] = (valor, tamanho)
+                self.bytes_usados += tamanho
+            while self.bytes_usados > self.max_bytes:
+                antiga, (_, tam) = self._itens.popitem(last=False)
+                self.bytes_usados -= tam
+                self.evictions += 1
+                removidas.append(antiga)
+        self._removidas(removidas)
+        return valor
+
+    def invalidar(self, file_id, manter=None):
+        """
+        Remove as entradas de um file_id, exceto as com assinatura `manter`.
+        """
+        with self._lock:
+            removidas = [c for c in self._itens if c[1] == file_id and c[2] != manter]
+            for chave in removidas:
+                self.bytes_usados -= self._itens.pop(chave)[1]
+        self._removidas(removidas)
+
+    def limpar(self):
+        with self._lock:
+            removidas = list(self._itens)
+            self._itens.clear()
+            self.bytes_usados = 0
+        self._removidas(removidas)
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._itens),
+                "bytes": self.bytes_usados,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+cache = CacheLRU(CACHE_SINAIS_MB, ao_remover=compartilhada.liberar if compartilhada.MEMORIA_COMPARTILHADA else None)
+
+
+def _assinatura(file_id):
+    path = caminho_dataset(file_id)
+    if not os.path.exists(path):
+        # Datasets ainda em CSV são convertidos na primeira leitura
+        carregar_dataset(file_id)
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _somente_leitura(*arrays):
+    for a in arrays:
+        a.setflags(write=False)
+    return arrays
+
+
+def _compartilhado(chave, calcular, nome_etapa):
+    """
+    Linhas do array 2-D da chave na memória compartilhada: anexa o bloco de
+    outro processo ou calcula e publica. Sem espaço no limite, fica com a
+    cópia local.
+    """
+    with etapa("anexar"):
+        array = compartilhada.anexar(chave)
+    if array is None:
+        with etapa(nome_etapa):
+            local = calcular()
+        with etapa("publicar"):
+            array = compartilhada.publicar(chave, local)
+        if array is None:
+            return _somente_leitura(*local)
+    return tuple(array)
+
+
+def obter_sinais(file_id):
+    """
+    Retorna (tempo, saida, entrada) do dataset, usando o cache quando possível.
+    """
+    assinatura = _assinatura(file_id)
+    chave = ("sinais", file_id, assinatura)
+    sinais = cache.get(chave)
+    if sinais is None:
+        cache.invalidar(file_id, manter=assinatura)
+        if compartilhada.MEMORIA_COMPARTILHADA:
+            sinais = _compartilhado(chave, lambda: np.stack(carregar_dataset(file_id)), "carregar")
+        else:
+            with etapa("carregar"):
+                sinais = _somente_leitura(*(np.array(c) for c in carregar_dataset(file_id)))
+        cache.put(chave, sinais, sum(c.nbytes for c in sinais))
+    return sinais
+
+
+def obter_suavizado(file_id, window_length, polyorder):
+    """
+    Retorna a saída do dataset suavizada pelo filtro Savitzky-Golay.
+    """
+    assinatura = _assinatura(file_id)
+    chave = ("suavizado", file_id, assinatura, window_length, polyorder)
+    y = cache.get(chave)
+    if y is None:
+        # Importado sob demanda: o scipy.signal leva cerca de 1 s para carregar
+        from scipy.signal import savgol_filter
+        _, saida, _ = obter_sinais(file_id)
+        if compartilhada.MEMORIA_COMPARTILHADA:
+            y, = _compartilhado(
+                chave, lambda: savgol_filter(saida, window_length=window_length, polyorder=polyorder)[None], "savgol"
+            )
+        else:
+            with etapa("savgol"):
+                y, = _somente_leitura(savgol_filter(saida, window_length=window_length, polyorder=polyorder))
+        cache.put(chave, y, y.nbytes)
+    return y
+
+
+def obter_filtro_recomendado(file_id, criterio="gcv"):
+    """
+    Retorna o filtro (janela, ordem) recomendado para o dataset pelo critério dado.
+    """
+    assinatura = _assinatura(file_id)
+    chave = ("filtro", file_id, assinatura, criterio)
+    recomendado = cache.get(chave)
+    if recomendado is None:
+        _, saida, _ = obter_sinais(file_id)
+        with etapa("recomendar_filtro"):
+            recomendado = cache.put(chave, recomendar_filtro(saida, criterio), 512)
+    return dict(recomendado)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Cada valor entregue ao cache é solto exatamente uma vez: quando sai
+    # dele, quando é substituído na mesma chave ou quando nem entra por ser
+    # maior que o cache inteiro
+    falhas = []
+
+    def verificar(nome, condicao):
+        print(f"  {nome}: {'ok' if condicao else 'FALHOU'}")
+        if not condicao:
+            falhas.append(nome)
+
+    print("CacheLRU.ao_remover:")
+    soltas = []
+    lru = CacheLRU(1 / 1024, ao_remover=soltas.append)  # 1 KB
+    lru.put(("sinais", "grande", 0), "v", 2048)
+    verificar("valor maior que o cache", soltas == [("sinais", "grande", 0)] and lru.estatisticas()["entries"] == 0)
+    lru.put(("sinais", "a", 0), "a", 600)
+    lru.put(("sinais", "b", 0), "b", 600)
+    verificar("remoção por tamanho", soltas[-1] == ("sinais", "a", 0) and lru.bytes_usados == 600)
+    soltas.clear()
+    lru.put(("sinais", "b", 0), "b2", 600)
+    verificar("valor substituído", soltas == [("sinais", "b", 0)] and lru.get(("sinais", "b", 0)) == "b2")
+    lru.put(("sinais", "b", 0), "b2", 600)
+    verificar("mesmo valor de novo", len(soltas) == 1)
+    lru.put(("sinais", "b", 0), "b3", 4096)
+    verificar("substituído por valor grande", soltas[1:] == [("sinais", "b", 0)] * 2 and lru.bytes_usados == 0)
+    soltas.clear()
+    lru.put(("sinais", "c", 1), "c", 100)
+    lru.invalidar("c", manter=2)
+    lru.put(("sinais", "d", 0), "d", 100)
+    lru.limpar()
+    verificar("invalidar e limpar", soltas == [("sinais", "c", 1), ("sinais", "d", 0)])
+
+    if compartilhada.fcntl is not None:
+        # Duas falhas simultâneas na mesma chave com o bloco real: as duas
+        # referências do processo são soltas, e o bloco é fechado
+        print("Memória compartilhada:")
+        chave = ("sinais", "verificacao", os.getpid())
+        nome = compartilhada._nome(chave)
+        lru = CacheLRU(1, ao_remover=compartilhada.liberar)
+        try:
+            primeira = compartilhada.publicar(chave, np.zeros((3, 4)))
+            segunda = compartilhada.anexar(chave)
+            lru.put(chave, tuple(primeira), primeira.nbytes)
+            lru.put(chave, tuple(segunda), segunda.nbytes)
+            del primeira, segunda
+            with compartilhada._registro() as blocos:
+                refs = list(blocos[nome]["refs"])
+            verificar("uma referência por entrada", refs == [os.getpid()])
+            lru.limpar()
+            with compartilhada._registro() as blocos:
+                refs = list(blocos[nome]["refs"])
+            verificar("referências soltas", refs == [] and nome not in compartilhada._anexados)
+        finally:
+            with compartilhada._registro() as blocos:
+                compartilhada._remover(nome)
+                blocos.pop(nome, None)
+
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,257 @@
+"""
+Catálogo SQLite dos datasets.
+
+Guarda, por file_id, o resumo pré-calculado do experimento (amostras,
+faixas de tempo/saída/entrada, período de amostragem, amplitude e instante
+do degrau de entrada, estimativa do ruído da saída) e o resultado da última
+identificação. É preenchido no upload e no /identify/, e serve a listagem
+GET /datasets com filtros, ordenação e paginação.
+
+O catálogo é um índice derivado dos arquivos em datasets/. Para (re)indexar
+todos os datasets existentes, em paralelo:
+
+    python catalogo.py reconstruir
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from armazenamento import DATASETS_DIR, caminho_dataset, carregar_dataset, carregar_metadados, listar_datasets
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_DB = os.environ.get("CATALOGO_DB", f"{DATASETS_DIR}/catalogo.sqlite3")
+
+# Colunas do resumo calculado a partir das amostras
+COLUNAS_RESUMO = (
+    "samples", "time_min", "time_max", "output_min", "output_max", "input_min", "input_max",
+    "sample_period", "step_size", "step_time", "noise_std"
+)
+# Campos numéricos aceitos nos filtros de faixa (<campo>_min, <campo>_max)
+NUMERICAS = COLUNAS_RESUMO + ("k", "tau", "theta", "uploaded_at", "identified_at")
+# Campos aceitos na ordenação da listagem
+ORDENACOES = ("file_id", "filename", "method") + NUMERICAS
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    file_id TEXT PRIMARY KEY,
+    filename TEXT,
+    sha256 TEXT,
+    uploaded_at REAL,
+    samples INTEGER,
+    time_min REAL,
+    time_max REAL,
+    output_min REAL,
+    output_max REAL,
+    input_min REAL,
+    input_max REAL,
+    sample_period REAL,
+    step_size REAL,
+    step_time REAL,
+    noise_std REAL,
+    method TEXT,
+    k REAL,
+    tau REAL,
+    theta REAL,
+    identification TEXT,
+    identified_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_sha256 ON datasets (sha256);
+CREATE INDEX IF NOT EXISTS idx_datasets_uploaded_at ON datasets (uploaded_at);
+CREATE INDEX IF NOT EXISTS idx_datasets_method ON datasets (method);
+"""
+
+
+_esquema_criado = False
+
+
+@contextmanager
+def _conectar():
+    """
+    Conexão por operação (as chamadas vêm de threads e processos diferentes),
+    com commit ao final.
+    """
+    global _esquema_criado
+    conexao = sqlite3.connect(CATALOGO_DB, timeout=30)
+    conexao.row_factory = sqlite3.Row
+    try:
+        if not _esquema_criado:
+            conexao.executescript(_ESQUEMA)
+            _esquema_criado = True
+        with conexao:
+            yield conexao
+    finally:
+        conexao.close()
+
+
+def resumir(file_id):
+    """
+    Resumo do dataset calculado sobre as colunas memory-mapped.
+    """
+    tempo, saida, entrada = carregar_dataset(file_id)
+    n = len(tempo)
+    passos = np.diff(tempo)
+
+    # Degrau de entrada: níveis inicial e final (medianas de 5% do registro)
+    m = max(n // 20, 1)
+    u0, u1 = np.median(entrada[:m]), np.median(entrada[-m:])
+    step_size = float(u1 - u0)
+    cruzamento = np.flatnonzero(np.abs(entrada - u0) > abs(step_size) / 2) if step_size else []
+    step_time = float(tempo[cruzamento[0]]) if len(cruzamento) else None
+
+    # Ruído: desvio robusto (MAD) das diferenças da saída, que removem a parte lenta
+    if n > 2:
+        d = np.diff(saida)
+        noise_std = float(1.4826 * np.median(np.abs(d - np.median(d))) / np.sqrt(2))
+    else:
+        noise_std = None
+
+    return {
+        "samples": n,
+        "time_min": float(tempo.min()),
+        "time_max": float(tempo.max()),
+        "output_min": float(saida.min()),
+        "output_max": float(saida.max()),
+        "input_min": float(entrada.min()),
+        "input_max": float(entrada.max()),
+        "sample_period": float(np.median(passos)) if n > 1 else None,
+        "step_size": step_size,
+        "step_time": step_time,
+        "noise_std": noise_std
+    }
+
+
+def _gravar_resumo(conexao, file_id, resumo, metadados):
+    campos = ("file_id", "filename", "sha256", "uploaded_at") + COLUNAS_RESUMO
+    # Datasets anteriores aos metadados de upload: data do arquivo
+    uploaded_at = metadados.get("uploaded_at") or os.path.getmtime(caminho_dataset(file_id))
+    valores = (file_id, metadados.get("filename"), metadados.get("sha256"), uploaded_at) + tuple(
+        resumo[c] for c in COLUNAS_RESUMO
+    )
+    # Mantém a última identificação ao reindexar
+    atualizacao = ", ".join(f"{c} = excluded.{c}" for c in campos[1:])
+    conexao.execute(
+        f"INSERT INTO datasets ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))}) "
+        f"ON CONFLICT (file_id) DO UPDATE SET {atualizacao}",
+        valores
+    )
+
+
+def indexar(file_id, metadados=None):
+    """
+    Calcula o resumo do dataset e o grava no catálogo. Retorna o resumo.
+    """
+    metadados = metadados if metadados is not None else carregar_metadados(file_id)
+    resumo = resumir(file_id)
+    with _conectar() as conexao:
+        _gravar_resumo(conexao, file_id, resumo, metadados)
+    return resumo
+
+
+def registrar_identificacao(file_id, metodo, resultado):
+    """
+    Guarda o resultado da última identificação do dataset.
+    """
+    with _conectar() as conexao:
+        conexao.execute(
+            "UPDATE datasets SET method = ?, k = ?, tau = ?, theta = ?, identification = ?, identified_at = ? "
+            "WHERE file_id = ?",
+            (metodo, resultado["k"], resultado["tau"], resultado["theta"], json.dumps(resultado), time.time(), file_id)
+        )
+
+
+def _item(linha):
+    item = dict(linha)
+    item["identification"] = json.loads(item["identification"]) if item["identification"] else None
+    return item
+
+
+def listar(filtros=None, ordenar="uploaded_at", descendente=False, limite=50, deslocamento=0):
+    """
+    Datasets do catálogo. filtros: {"filename": texto, "method": método,
+    "identified": bool, "<coluna>_min"/"<coluna>_max": limites numéricos}.
+    Retorna (total, itens).
+    """
+    if ordenar not in ORDENACOES:
+        raise ValueError(f"Ordenação inválida. Use um de: {', '.join(ORDENACOES)}")
+    condicoes, parametros = [], []
+    for nome, valor in (filtros or {}).items():
+        if valor is None:
+            continue
+        if nome == "filename":
+            condicoes.append("filename LIKE ?")
+            parametros.append(f"%{valor}%")
+        elif nome == "method":
+            condicoes.append("method = ?")
+            parametros.append(valor)
+        elif nome == "identified":
+            condicoes.append("identified_at IS NOT NULL" if valor else "identified_at IS NULL")
+        elif nome.endswith(("_min", "_max")) and nome[:-4] in NUMERICAS:
+            condicoes.append(f"{nome[:-4]} {'>=' if nome.endswith('_min') else '<='} ?")
+            parametros.append(valor)
+        else:
+            raise ValueError(f"Filtro inválido: {nome}")
+    onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    with _conectar() as conexao:
+        total = conexao.execute(f"SELECT COUNT(*) FROM datasets {onde}", parametros).fetchone()[0]
+        linhas = conexao.execute(
+            f"SELECT * FROM datasets {onde} ORDER BY {ordenar} {'DESC' if descendente else 'ASC'}, file_id "
+            f"LIMIT ? OFFSET ?",
+            parametros + [limite, deslocamento]
+        ).fetchall()
+    return total, [_item(linha) for linha in linhas]
+
+
+def obter(file_id):
+    with _conectar() as conexao:
+        linha = conexao.execute("SELECT * FROM datasets WHERE file_id = ?", (file_id,)).fetchone()
+    return _item(linha) if linha is not None else None
+
+
+def _resumir_com_metadados(file_id):
+    return file_id, resumir(file_id), carregar_metadados(file_id)
+
+
+def reconstruir(workers=None):
+    """
+    Reindexa todos os datasets de datasets/ em paralelo e remove do catálogo
+    os que não existem mais. Retorna (indexados, erros).
+    """
+    file_ids = listar_datasets()
+    indexados, erros = 0, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = {executor.submit(_resumir_com_metadados, file_id): file_id for file_id in file_ids}
+        with _conectar() as conexao:
+            for futuro, file_id in futuros.items():
+                try:
+                    _, resumo, metadados = futuro.result()
+                except Exception as e:
+                    erros[file_id] = str(e)
+                    continue
+                _gravar_resumo(conexao, file_id, resumo, metadados)
+                indexados += 1
+            existentes = set(file_ids)
+            for (file_id,) in conexao.execute("SELECT file_id FROM datasets").fetchall():
+                if file_id not in existentes:
+                    conexao.execute("DELETE FROM datasets WHERE file_id = ?", (file_id,))
+    return indexados, erros
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "reconstruir":
+        print("Uso: python catalogo.py reconstruir")
+        sys.exit(1)
+    inicio = time.perf_counter()
+    indexados, erros = reconstruir()
+    for file_id, erro in erros.items():
+        print(f"Erro ao indexar {file_id}: {erro}")
+    print(f"{indexados} datasets indexados em {time.perf_counter() - inicio:.2f} s")
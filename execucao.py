@@ -0,0 +1,95 @@
+"""
+Camada de execução para as etapas numéricas e de renderização.
+
+Tira o trabalho pesado (loadmat, savgol_filter, simulação, savefig) do event
+loop do asyncio, rodando-o em um pool de threads ou de processos. O número de
+tarefas em andamento é limitado; com a fila cheia, as requisições recebem
+HTTP 503 com o cabeçalho Retry-After.
+"""
+import os
+import time
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from instrumentacao import cronometrar, incorporar, perfil_pedido
+
+logger = logging.getLogger(__name__)
+
+# "thread" ou "process"
+EXECUCAO_MODO = os.environ.get("EXECUCAO_MODO", "thread")
+EXECUCAO_WORKERS = int(os.environ.get("EXECUCAO_WORKERS", str(os.cpu_count() or 2)))
+# Máximo de tarefas em andamento (executando + aguardando) antes de recusar com 503
+EXECUCAO_FILA_MAX = int(os.environ.get("EXECUCAO_FILA_MAX", str(4 * EXECUCAO_WORKERS)))
+EXECUCAO_RETRY_AFTER = int(os.environ.get("EXECUCAO_RETRY_AFTER", "2"))
+
+
+class ServidorSobrecarregado(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Servidor sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": str(EXECUCAO_RETRY_AFTER)}
+        )
+
+
+_executor = None
+_em_andamento = 0
+
+
+def obter_executor():
+    global _executor
+    if _executor is None:
+        if EXECUCAO_MODO == "process":
+            _executor = ProcessPoolExecutor(max_workers=EXECUCAO_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=EXECUCAO_WORKERS, thread_name_prefix="execucao")
+        logger.info(f"Pool de execução criado: modo={EXECUCAO_MODO}, workers={EXECUCAO_WORKERS}")
+    return _executor
+
+
+async def executar(func, *args, **kwargs):
+    """
+    Executa func(*args, **kwargs) no pool e aguarda o resultado sem bloquear o event loop.
+    No modo "process", func e seus argumentos precisam ser serializáveis (pickle).
+    A espera na fila e as etapas medidas no worker entram na requisição em andamento.
+    """
+    global _em_andamento
+    if _em_andamento >= EXECUCAO_FILA_MAX:
+        logger.warning(f"Fila de execução cheia ({_em_andamento} tarefas em andamento)")
+        raise ServidorSobrecarregado()
+    _em_andamento += 1
+    try:
+        loop = asyncio.get_running_loop()
+        submetido = time.time()
+        resultado, medidas = await loop.run_in_executor(
+            obter_executor(), functools.partial(cronometrar, func, perfil_pedido(), *args, **kwargs)
+        )
+        # Etapa com o nome da função (prefixado pelo módulo, fora do backend)
+        nome = func.__name__.lstrip("_")
+        if func.__module__ not in ("backend", "__main__"):
+            nome = f"{func.__module__}.{nome}"
+        incorporar(nome, submetido, medidas)
+        return resultado
+    finally:
+        _em_andamento -= 1
+
+
+def estatisticas():
+    return {
+        "mode": EXECUCAO_MODO,
+        "workers": EXECUCAO_WORKERS,
+        "in_flight": _em_andamento,
+        "queued": max(0, _em_andamento - EXECUCAO_WORKERS),
+        "max_in_flight": EXECUCAO_FILA_MAX
+    }
+
+
+def encerrar():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,175 @@
+"""
+Análise em lote do filtro Savitzky-Golay e escolha automática da janela.
+
+Os núcleos de todos os pares (janela, ordem) são pré-calculados e
+empilhados em uma matriz; a suavização de todos os pares é então um único
+produto matricial sobre as janelas deslizantes do sinal. As bordas
+reproduzem o modo "interp" do scipy.signal.savgol_filter.
+
+A janela recomendada minimiza a validação cruzada generalizada (GCV)
+ou, com o critério "whiteness", a autocorrelação dos resíduos.
+
+As métricas são acumuladas em blocos de amostras, com no máximo
+ELEMENTOS_BLOCO elementos por matriz, de modo que a memória não cresce com
+o tamanho do sinal.
+"""
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+CRITERIOS = ("gcv", "whiteness")
+
+# Grade padrão da busca automática
+JANELA_MIN = 5
+JANELA_MAX = 151
+ORDENS = (2, 3)
+# Elementos (pares × amostras ou amostras × janela) por matriz de um bloco
+ELEMENTOS_BLOCO = 2 ** 21
+
+
+def grade_padrao(n, janela_max=JANELA_MAX, ordens=ORDENS):
+    """
+    Pares (janela, ordem) com janelas ímpares de JANELA_MIN até janela_max (limitado a n).
+    """
+    janela_max = min(janela_max, n if n % 2 == 1 else n - 1)
+    return [
+        (w, p)
+        for p in ordens
+        for w in range(JANELA_MIN, janela_max + 1, 2)
+        if p < w
+    ]
+
+
+@lru_cache(maxsize=None)
+def _ajuste_polinomial(w, p):
+    """
+    Vandermonde (w, p+1) da janela centrada e sua pseudo-inversa: o
+    polinômio ajustado à janela y é vander @ (ajuste @ y).
+    """
+    m = w // 2
+    vander = np.vander((np.arange(w) - m) / max(m, 1), p + 1)
+    ajuste = np.linalg.pinv(vander)
+    vander.setflags(write=False)
+    ajuste.setflags(write=False)
+    return vander, ajuste
+
+
+def nucleo_savgol(w, p):
+    # Valor do polinômio no centro da janela (termo constante)
+    return _ajuste_polinomial(w, p)[1][-1]
+
+
+def suavizar_lote(y, pares, inicio=0, fim=None):
+    """
+    Suaviza y com todos os pares (janela, ordem) de uma vez, nas amostras
+    [inicio, fim). Retorna (P, fim - inicio).
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    fim = n if fim is None else fim
+    w_max = max(w for w, _ in pares)
+    meia = w_max // 2
+
+    # Núcleos centrados e completados com zeros até w_max
+    nucleos = np.zeros((len(pares), w_max))
+    for i, (w, p) in enumerate(pares):
+        inicio_nucleo = (w_max - w) // 2
+        nucleos[i, inicio_nucleo:inicio_nucleo + w] = nucleo_savgol(w, p)
+
+    # Interior: um único produto matricial sobre as janelas deslizantes do
+    # trecho (com zeros além das extremidades do sinal)
+    esquerda, direita = max(inicio - meia, 0), min(fim + meia, n)
+    trecho = np.pad(y[esquerda:direita], (meia - (inicio - esquerda), meia - (direita - fim)))
+    janelas = np.ascontiguousarray(sliding_window_view(trecho, w_max))
+    suavizado = (janelas @ nucleos.T).T
+
+    # Bordas (modo "interp"): polinômio ajustado à primeira/última janela
+    for i, (w, p) in enumerate(pares):
+        m = w // 2
+        vander, ajuste = _ajuste_polinomial(w, p)
+        if inicio < m:
+            borda = vander[:m] @ (ajuste @ y[:w])
+            suavizado[i, :min(m, fim) - inicio] = borda[inicio:min(m, fim)]
+        if fim > n - m:
+            borda = vander[w - m:] @ (ajuste @ y[n - w:])
+            a = max(n - m, inicio)
+            suavizado[i, a - inicio:] = borda[a - (n - m):fim - (n - m)]
+    return suavizado
+
+
+def avaliar_filtros(y, pares):
+    """
+    Métricas de cada par (janela, ordem): redução de ruído, preservação do
+    sinal, GCV e autocorrelação (lag 1) dos resíduos. As somas são
+    acumuladas por bloco de amostras; o sinal é centrado antes, o que não
+    muda os resíduos (os núcleos preservam constantes) e evita cancelamento
+    nas variâncias.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    yc = y - y.mean()
+    norma_y = np.linalg.norm(yc)
+    bloco = max(ELEMENTOS_BLOCO // max(len(pares), max(w for w, _ in pares)), 1)
+
+    soma_r, soma_rr, soma_s, soma_ss, soma_sy, soma_lag = (np.zeros(len(pares)) for _ in range(6))
+    r_primeiro = r_anterior = None
+    for inicio in range(0, n, bloco):
+        fim = min(inicio + bloco, n)
+        suavizado = suavizar_lote(yc, pares, inicio, fim)
+        residuo = yc[inicio:fim] - suavizado
+        soma_r += residuo.sum(axis=1)
+        soma_rr += np.einsum("ij,ij->i", residuo, residuo)
+        soma_s += suavizado.sum(axis=1)
+        soma_ss += np.einsum("ij,ij->i", suavizado, suavizado)
+        soma_sy += suavizado @ yc[inicio:fim]
+        soma_lag += np.einsum("ij,ij->i", residuo[:, 1:], residuo[:, :-1])
+        if r_anterior is None:
+            r_primeiro = residuo[:, 0]
+        else:
+            soma_lag += r_anterior * residuo[:, 0]
+        r_anterior = residuo[:, -1]
+
+    media_r = soma_r / n
+    var_r = soma_rr / n - media_r ** 2
+
+    # Traço da matriz de suavização ≈ n·(coeficiente central do núcleo)
+    centro = np.array([nucleo_savgol(w, p)[w // 2] for w, p in pares])
+    gcv = soma_rr / n / (1 - centro) ** 2
+
+    # Correlação de Pearson entre o sinal e cada versão suavizada (yc tem média zero)
+    norma_s = np.sqrt(np.maximum(soma_ss - soma_s ** 2 / n, 0.0))
+    correlacao = soma_sy / (norma_s * norma_y)
+
+    # Autocorrelação dos resíduos centrados: Σ (r[i] - μ)(r[i+1] - μ) / Σ (r[i] - μ)²
+    lag = soma_lag - media_r * (2 * soma_r - r_primeiro - r_anterior) + (n - 1) * media_r ** 2
+    autocorrelacao = lag / (n * var_r)
+
+    return {
+        "noise_reduction": np.sqrt(np.maximum(var_r, 0.0)) / (norma_y / np.sqrt(n)),
+        "signal_preservation": correlacao,
+        "gcv": gcv,
+        "residual_autocorrelation": autocorrelacao
+    }
+
+
+def recomendar_filtro(y, criterio="gcv", pares=None):
+    """
+    Escolhe o par (janela, ordem) pelo critério dado, avaliando a grade inteira em lote.
+    """
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Critério inválido. Use um de {', '.join(CRITERIOS)}")
+    pares = pares or grade_padrao(len(y))
+    metricas = avaliar_filtros(y, pares)
+    if criterio == "gcv":
+        pontuacao = metricas["gcv"]
+    else:
+        pontuacao = np.abs(metricas["residual_autocorrelation"])
+    i = int(np.nanargmin(pontuacao))
+    return {
+        "window_length": pares[i][0],
+        "polyorder": pares[i][1],
+        "criterion": criterio,
+        "score": float(pontuacao[i]),
+        "candidates": len(pares)
+    }
@@ -0,0 +1,248 @@
+"""
+Identificação de modelos de primeira ordem com tempo morto (FOPDT).
+
+Além dos métodos de dois pontos (Smith e Sundaresan), o método de mínimos
+quadrados ajusta (k, tau, theta) à resposta medida completa, simulando o
+modelo com o sinal de entrada registrado. A planta é discretizada de forma
+exata (segurador de ordem zero e atraso fracionário, como em simulacao.py)
+e as sensibilidades em relação aos parâmetros vêm da mesma recursão, o que
+dá um jacobiano analítico.
+"""
+import numpy as np
+
+from cache_sinais import obter_sinais, obter_suavizado
+from instrumentacao import etapa
+
+METODOS = ("smith", "sundaresan", "least_squares")
+
+# Quantil da normal para os intervalos de confiança de 95%
+Z_95 = 1.959963984540054
+
+
+class ErroIdentificacao(Exception):
+    """Os dados não permitem identificar o modelo com os parâmetros dados."""
+
+
+def identificar_dois_pontos(t, y, entrada, metodo, offset_percent):
+    """
+    Métodos de dois pontos (Smith ou Sundaresan) sobre a saída suavizada y.
+    """
+    # Valores iniciais e finais
+    y_inicial = y[0]
+    y_final = y[-1]
+    dy = y_final - y_inicial
+
+    # Calcular pontos de interesse baseado no método escolhido
+    if metodo == "smith":
+        y1 = y_inicial + 0.283 * dy
+        y2 = y_inicial + 0.632 * dy
+    else:  # sundaresan
+        y1 = y_inicial + 0.353 * dy
+        y2 = y_inicial + 0.853 * dy
+
+    # Calcular offset baseado em percentual
+    offset = int(len(t) * offset_percent / 100)
+    if offset < 1:
+        offset = 1
+
+    # Encontrar índices onde a resposta atinge y1 e y2
+    idx1 = np.where(y[offset:] >= y1)[0]
+    idx2 = np.where(y[offset:] >= y2)[0]
+
+    if len(idx1) == 0 or len(idx2) == 0:
+        raise ErroIdentificacao(
+            "A resposta não atingiu os níveis necessários para identificação. Tente ajustar os parâmetros."
+        )
+
+    # Corrigir índices para compensar o offset
+    t1 = t[offset + idx1[0]]
+    t2 = t[offset + idx2[0]]
+
+    if t1 >= t2:
+        raise ErroIdentificacao(
+            f"t1 ({t1}) não é menor que t2 ({t2}). Tente ajustar os parâmetros de suavização."
+        )
+
+    # Cálculo dos parâmetros do modelo
+    if metodo == "smith":
+        tau = 1.5 * (t2 - t1)
+        theta = t2 - tau
+    else:  # sundaresan
+        tau = 2/3 * (t2 - t1)
+        theta = 1.3 * t1 - 0.29 * t2
+
+    # Cálculo do ganho
+    k = dy / (entrada.max() - entrada.min())
+
+    return {
+        "k": float(k),
+        "tau": float(tau),
+        "theta": float(theta),
+        "t1": float(t1),
+        "t2": float(t2),
+        "y1": float(y1),
+        "y2": float(y2)
+    }
+
+
+def _atrasar(u, d):
+    # u[n - d], com o valor inicial repetido antes do começo do registro
+    if d <= 0:
+        return u
+    if d >= len(u):
+        return np.full_like(u, u[0])
+    return np.concatenate([np.full(d, u[0]), u[:-d]])
+
+
+def _simular_fopdt(du, h, k, tau, theta, sensibilidades=False):
+    """
+    Resposta (desvio) do FOPDT ao desvio de entrada du, amostrado com passo h.
+    y[n+1] = a·y[n] + k·x[n], com x[n] = (1 - c)·u[n-d] + (c - a)·u[n-d-1].
+    Com sensibilidades=True retorna também dy/dk, dy/dtau e dy/dtheta.
+    """
+    # Importado sob demanda (carregamento lento do scipy.signal)
+    from scipy.signal import lfilter
+    a = np.exp(-h / tau)
+    atraso = max(theta, 0.0) / h
+    d = int(np.floor(atraso + 1e-9))
+    f = min(max(atraso - d, 0.0), 1.0)
+    c = np.exp(-(1.0 - f) * h / tau)
+    u_d = _atrasar(du, d)
+    u_d1 = _atrasar(du, d + 1)
+
+    x = (1.0 - c) * u_d + (c - a) * u_d1
+    base = lfilter([0.0, 1.0], [1.0, -a], x)
+    y = k * base
+    if not sensibilidades:
+        return y
+
+    # Derivadas dos coeficientes
+    da_dtau = a * h / tau ** 2
+    dc_dtau = c * (1.0 - f) * h / tau ** 2
+    dc_dtheta = c / tau
+
+    dy_dk = base
+    # s[n+1] = a·s[n] + da/dtau·y[n] + k·dx/dtau[n]
+    dx_dtau = -dc_dtau * u_d + (dc_dtau - da_dtau) * u_d1
+    dy_dtau = lfilter([0.0, 1.0], [1.0, -a], da_dtau * y + k * dx_dtau)
+    dx_dtheta = dc_dtheta * (u_d1 - u_d)
+    dy_dtheta = k * lfilter([0.0, 1.0], [1.0, -a], dx_dtheta)
+    return y, dy_dk, dy_dtau, dy_dtheta
+
+
+def _grade_uniforme(t, *sinais):
+    # O modelo discreto supõe amostragem uniforme; reamostra se necessário
+    passos = np.diff(t)
+    if np.allclose(passos, passos[0], rtol=1e-3):
+        return (t,) + sinais
+    t_uniforme = np.linspace(t[0], t[-1], len(t))
+    return (t_uniforme,) + tuple(np.interp(t_uniforme, t, s) for s in sinais)
+
+
+def simular_modelo(t, entrada, k, tau, theta, y0):
+    """
+    Resposta do modelo FOPDT identificado ao sinal de entrada registrado.
+    """
+    t, entrada = _grade_uniforme(np.asarray(t, dtype=float), np.asarray(entrada, dtype=float))
+    h = t[1] - t[0]
+    return y0 + _simular_fopdt(entrada - entrada[0], h, k, tau, theta)
+
+
+def identificar_minimos_quadrados(t, y, entrada, chute):
+    """
+    Ajusta (k, tau, theta) e o nível inicial y0 à resposta medida y, partindo
+    do chute inicial {"k", "tau", "theta"}. Retorna os parâmetros, o resíduo
+    do ajuste e os intervalos de confiança (95%) dos parâmetros.
+    """
+    from scipy.optimize import least_squares
+    t, y, entrada = _grade_uniforme(
+        np.asarray(t, dtype=float), np.asarray(y, dtype=float), np.asarray(entrada, dtype=float)
+    )
+    if len(t) < 10:
+        raise ErroIdentificacao("Amostras insuficientes para o ajuste por mínimos quadrados.")
+    h = t[1] - t[0]
+    duracao = t[-1] - t[0]
+    du = entrada - entrada[0]
+    if np.all(du == 0):
+        raise ErroIdentificacao("O sinal de entrada não varia; não é possível ajustar o modelo.")
+
+    def residuos(p):
+        k, tau, theta, y0 = p
+        return y0 + _simular_fopdt(du, h, k, tau, theta) - y
+
+    def jacobiano(p):
+        k, tau, theta, _ = p
+        _, dk, dtau, dtheta = _simular_fopdt(du, h, k, tau, theta, sensibilidades=True)
+        return np.column_stack([dk, dtau, dtheta, np.ones_like(y)])
+
+    tau_min = 0.01 * h
+    p0 = np.array([
+        chute["k"],
+        min(max(chute["tau"], tau_min * 10), duracao),
+        min(max(chute["theta"], 0.0), duracao),
+        y[0]
+    ])
+    ajuste = least_squares(
+        residuos, p0, jac=jacobiano,
+        bounds=([-np.inf, tau_min, 0.0, -np.inf], [np.inf, 10 * duracao, duracao, np.inf]),
+        x_scale=np.maximum(np.abs(p0), [1e-12, h, h, 1e-12]),
+        method="trf"
+    )
+    if not ajuste.success:
+        raise ErroIdentificacao(f"O ajuste por mínimos quadrados não convergiu: {ajuste.message}")
+
+    k, tau, theta, y0 = ajuste.x
+    n, n_params = len(y), len(ajuste.x)
+    ssr = float(np.sum(ajuste.fun ** 2))
+    variancia = ssr / max(n - n_params, 1)
+    try:
+        covariancia = variancia * np.linalg.inv(ajuste.jac.T @ ajuste.jac)
+        desvios = np.sqrt(np.clip(np.diag(covariancia), 0.0, None))
+    except np.linalg.LinAlgError:
+        desvios = np.full(n_params, np.nan)
+
+    def _json(v):
+        return float(v) if np.isfinite(v) else None
+
+    nomes = ("k", "tau", "theta", "y0")
+    return {
+        "k": float(k),
+        "tau": float(tau),
+        "theta": float(theta),
+        "y0": float(y0),
+        "rmse": float(np.sqrt(ssr / n)),
+        "r2": float(1 - ssr / np.sum((y - y.mean()) ** 2)),
+        "iterations": int(ajuste.nfev),
+        "std_errors": {nome: _json(dp) for nome, dp in zip(nomes, desvios)},
+        "confidence_95": {
+            nome: [_json(v - Z_95 * dp), _json(v + Z_95 * dp)]
+            for nome, v, dp in zip(nomes, ajuste.x, desvios)
+        }
+    }
+
+
+def identificar_dataset(file_id, metodo, window_length, polyorder, offset_percent):
+    """
+    Carrega (via cache) e suaviza o dataset e identifica o modelo.
+    """
+    t, y_original, entrada = obter_sinais(file_id)
+    y = obter_suavizado(file_id, window_length, polyorder)
+    return identificar_sinais(t, y_original, y, entrada, metodo, offset_percent)
+
+
+def identificar_sinais(t, y_original, y, entrada, metodo, offset_percent):
+    """
+    Identifica o modelo a partir dos sinais já carregados (y é a saída suavizada).
+    """
+    if metodo != "least_squares":
+        with etapa("dois_pontos"):
+            return identificar_dois_pontos(t, y, entrada, metodo, offset_percent)
+
+    # Mínimos quadrados sobre a resposta medida, partindo da estimativa de Smith
+    with etapa("dois_pontos"):
+        resultado = identificar_dois_pontos(t, y, entrada, "smith", offset_percent)
+    with etapa("minimos_quadrados"):
+        ajuste = identificar_minimos_quadrados(t, y_original, entrada, resultado)
+    resultado.update({nome: ajuste[nome] for nome in ("k", "tau", "theta")})
+    resultado["fit"] = ajuste
+    return resultado
@@ -0,0 +1,209 @@
+"""
+Identificação FOPDT online, amostra a amostra, para acompanhar um ensaio
+ao degrau enquanto ele acontece.
+
+Entrada e saída passam pelo mesmo filtro passa-baixa de primeira ordem
+(média móvel exponencial), o que suaviza o ruído sem alterar a relação
+dinâmica entre elas. O modelo discreto do FOPDT com segurador de ordem zero
+e atraso de d amostras,
+
+    y[n] = a·y[n-1] + b·u[n-1-d] + c,
+
+é ajustado recursivamente para um conjunto fixo de atrasos candidatos.
+O ajuste é o de variáveis instrumentais recursivas (RIV): igual ao RLS, mas
+com a saída simulada pelo próprio modelo estimado como instrumento no lugar
+da saída medida, o que evita o viés do RLS quando a saída tem ruído. O
+candidato cuja simulação fica mais próxima da saída filtrada define a
+estimativa:
+
+    k = b / (1 - a),  tau = -h / ln(a),  theta = d·h
+
+O histórico da entrada filtrada necessário para os atrasos fica em um
+buffer circular limitado. O trabalho por amostra é constante (não depende
+do tamanho do registro), e uma estimativa é emitida a cada N amostras.
+Diferente do /identify/, theta é o atraso entre entrada e saída, e não o
+instante medido desde o início do registro.
+
+Para reproduzir um dataset armazenado como se fosse um ensaio ao vivo:
+
+    python identificacao_online.py <file_id> [amostras_por_estimativa]
+"""
+import sys
+
+import numpy as np
+
+# Atrasos candidatos avaliados em paralelo (acima disso, a faixa é amostrada)
+ATRASOS_CANDIDATOS_MAX = 64
+# Variância inicial dos parâmetros e limite do traço da covariância (evita
+# o crescimento sem limite pelo esquecimento enquanto não há excitação)
+RLS_P0 = 1e4
+RLS_TRACO_MAX = 1e8
+
+
+class BufferCircular:
+    """
+    Últimas `capacidade` amostras de um sinal, sem realocar.
+    """
+
+    def __init__(self, capacidade):
+        self.dados = np.zeros(capacidade)
+        self.capacidade = capacidade
+        self.n = 0
+
+    def adicionar(self, valor):
+        self.dados[self.n % self.capacidade] = valor
+        self.n += 1
+
+    def atras(self, passos):
+        """
+        Valores de `passos` amostras atrás (0 = a mais recente); antes do
+        começo do registro, repete a primeira amostra.
+        """
+        passos = np.minimum(passos, min(self.n, self.capacidade) - 1)
+        return self.dados[(self.n - 1 - passos) % self.capacidade]
+
+
+class IdentificadorOnline:
+    def __init__(self, atraso_max=200, esquecimento=1.0, suavizacao=0.3, estimar_a_cada=50):
+        if not 0 < suavizacao <= 1:
+            raise ValueError("suavizacao deve estar em (0, 1]")
+        if not 0 < esquecimento <= 1:
+            raise ValueError("esquecimento deve estar em (0, 1]")
+        if atraso_max < 0 or estimar_a_cada < 1:
+            raise ValueError("atraso_max não pode ser negativo e estimar_a_cada deve ser pelo menos 1")
+        self.atrasos = np.unique(
+            np.linspace(0, atraso_max, min(atraso_max + 1, ATRASOS_CANDIDATOS_MAX)).round().astype(int)
+        )
+        self.esquecimento = esquecimento
+        self.suavizacao = suavizacao
+        self.estimar_a_cada = estimar_a_cada
+        self.reiniciar()
+
+    def reiniciar(self):
+        m = len(self.atrasos)
+        self.parametros = np.zeros((m, 3))
+        self.P = np.tile(np.eye(3) * RLS_P0, (m, 1, 1))
+        self.erro2 = np.zeros(m)
+        self.y_modelo = np.zeros(m)
+        self.u_filtrada = BufferCircular(int(self.atrasos[-1]) + 2)
+        self.n = 0
+        self.t0 = self.t = None
+        self.yf = self.uf = None
+        self.u_min, self.u_max = np.inf, -np.inf
+
+    def _atualizar(self, t, y, u):
+        # Filtro passa-baixa igual para entrada e saída
+        if self.n == 0:
+            self.t0, self.yf, self.uf = t, y, u
+            self.y_modelo[:] = y
+        else:
+            a = self.suavizacao
+            y_anterior = self.yf
+            self.yf += a * (y - self.yf)
+            self.uf += a * (u - self.uf)
+            u_atrasada = self.u_filtrada.atras(self.atrasos)
+            phi = np.empty((len(self.atrasos), 3))
+            phi[:, 0] = y_anterior
+            phi[:, 1] = u_atrasada
+            phi[:, 2] = 1.0
+            # Instrumento: regressor com a saída simulada no lugar da medida
+            z = phi.copy()
+            z[:, 0] = self.y_modelo
+
+            # RIV de todos os candidatos de uma vez
+            erro = self.yf - np.einsum("ij,ij->i", self.parametros, phi)
+            P_z = np.einsum("ijk,ik->ij", self.P, z)
+            ganho = P_z / (self.esquecimento + np.einsum("ij,ij->i", phi, P_z))[:, None]
+            self.parametros += ganho * erro[:, None]
+            self.P -= ganho[:, :, None] * np.einsum("ij,ijk->ik", phi, self.P)[:, None, :]
+            esquecer = np.trace(self.P, axis1=1, axis2=2) < RLS_TRACO_MAX
+            self.P[esquecer] /= self.esquecimento
+
+            # Simulação de cada candidato com os parâmetros atualizados; candidatos
+            # instáveis voltam a usar a saída medida (RLS) até se estabilizarem
+            self.y_modelo = np.einsum("ij,ij->i", self.parametros, z)
+            instaveis = ~np.isfinite(self.y_modelo) | (np.abs(self.parametros[:, 0]) >= 1)
+            self.y_modelo[instaveis] = self.yf
+            # Erro quadrático médio de simulação: média de todo o registro ou, com
+            # esquecimento, média exponencial com a mesma memória do ajuste
+            peso = max(1.0 / self.n, 1.0 - self.esquecimento)
+            self.erro2 += peso * ((self.yf - self.y_modelo) ** 2 - self.erro2)
+            divergentes = ~np.isfinite(self.parametros).all(axis=1)
+            if divergentes.any():
+                self.parametros[divergentes] = 0.0
+                self.P[divergentes] = np.eye(3) * RLS_P0
+        self.u_filtrada.adicionar(self.uf)
+        self.t = t
+        self.n += 1
+        self.u_min, self.u_max = min(self.u_min, u), max(self.u_max, u)
+
+    def estimativa(self):
+        """
+        Estimativa atual a partir do candidato de menor erro de simulação.
+        """
+        h = (self.t - self.t0) / (self.n - 1) if self.n > 1 else None
+        a, b, _ = self.parametros.T
+        # Só candidatos estáveis e sem ganho nulo têm um FOPDT correspondente
+        admissiveis = (a > 0) & (a < 1) & (b != 0)
+        estimativa = {
+            "samples": self.n,
+            "time": self.t,
+            "sample_period": h,
+            "valid": False,
+            "k": None,
+            "tau": None,
+            "theta": None
+        }
+        if h is None or not admissiveis.any() or self.u_max - self.u_min <= 0:
+            return estimativa
+        i = np.flatnonzero(admissiveis)[np.argmin(self.erro2[admissiveis])]
+        estimativa.update({
+            "valid": True,
+            "k": float(b[i] / (1 - a[i])),
+            "tau": float(-h / np.log(a[i])),
+            "theta": float(self.atrasos[i] * h),
+            "delay_samples": int(self.atrasos[i]),
+            "a": float(a[i]),
+            "b": float(b[i]),
+            "simulation_rmse": float(np.sqrt(self.erro2[i]))
+        })
+        return estimativa
+
+    def adicionar(self, tempo, saida, entrada):
+        """
+        Processa um bloco de amostras e retorna as estimativas emitidas nele
+        (uma a cada estimar_a_cada amostras).
+        """
+        tempo, saida, entrada = (np.asarray(c, dtype=float).ravel() for c in (tempo, saida, entrada))
+        if not len(tempo) == len(saida) == len(entrada):
+            raise ValueError("time, output e input devem ter o mesmo número de amostras")
+        if not (np.all(np.isfinite(tempo)) and np.all(np.isfinite(saida)) and np.all(np.isfinite(entrada))):
+            raise ValueError("As amostras devem ser números finitos")
+        if np.any(np.diff(tempo) <= 0) or (len(tempo) and self.t is not None and tempo[0] <= self.t):
+            raise ValueError("O tempo deve ser estritamente crescente entre as amostras")
+        estimativas = []
+        for t, y, u in zip(tempo.tolist(), saida.tolist(), entrada.tolist()):
+            self._atualizar(t, y, u)
+            if self.n % self.estimar_a_cada == 0:
+                estimativas.append(self.estimativa())
+        return estimativas
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python identificacao_online.py <file_id> [amostras_por_estimativa]")
+        sys.exit(1)
+    import time
+    from armazenamento import carregar_dataset
+
+    tempo, saida, entrada = carregar_dataset(sys.argv[1])
+    identificador = IdentificadorOnline(estimar_a_cada=int(sys.argv[2]) if len(sys.argv) > 2 else 500)
+    inicio = time.perf_counter()
+    estimativas = identificador.adicionar(tempo, saida, entrada)
+    duracao = time.perf_counter() - inicio
+    for e in estimativas:
+        if e["valid"]:
+            print(f"t={e['time']:.1f}  k={e['k']:.4g}  tau={e['tau']:.4g}  theta={e['theta']:.4g}  rmse={e['simulation_rmse']:.3g}")
+        else:
+            print(f"t={e['time']:.1f}  sem estimativa")
+    print(f"{len(tempo)} amostras em {duracao:.2f} s ({duracao / len(tempo) * 1e6:.1f} µs por amostra)")
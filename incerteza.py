@@ -0,0 +1,177 @@
+"""
+Análise de Monte Carlo da malha fechada sob incerteza do modelo.
+
+Os controladores IMC e ITAE são sintonizados para o modelo nominal
+(k, tau, theta), e a malha é simulada com milhares de plantas perturbadas,
+sorteadas uniformemente em nominal·(1 ± incerteza). As simulações usam o
+simulacao.simular_malhas(), uma planta por vez, e podem ser divididas em
+blocos de amostras executados em paralelo. O resultado são
+envelopes de percentis da resposta ao degrau e as distribuições do
+sobressinal e do tempo de acomodação.
+"""
+import math
+
+import numpy as np
+
+from instrumentacao import etapa
+from metricas import FAIXA_ACOMODACAO, calc_overshoot, calc_settling_time
+from simulacao import simular_malhas
+
+PERCENTIS_PADRAO = (5, 25, 50, 75, 95)
+# Classes dos histogramas das métricas
+CLASSES_HISTOGRAMA = 20
+# Intervalos da grade em que o tempo de acomodação é calculado
+INTERVALOS_METRICAS = 1000
+# Limite de passos de integração por planta sorteada. Só atua com θ pequeno
+# diante do horizonte (mais de 100·θ), em que o custo de cada planta
+# cresceria com horizonte/θ
+MAX_PASSOS_AMOSTRA = 2000
+# Máximo de elementos (linhas × pontos) simulados de uma vez em um bloco
+ELEMENTOS_BLOCO = 2**23
+
+
+def amostrar_modelos(k, tau, theta, incerteza_percent, amostras, semente=None):
+    """
+    Modelos (amostras, 3) sorteados uniformemente em nominal·(1 ± incerteza/100),
+    com incerteza_percent = (k, tau, theta) em %.
+    """
+    rng = np.random.default_rng(semente)
+    u = np.asarray(incerteza_percent, dtype=float) / 100
+    return np.array([k, tau, theta], dtype=float) * rng.uniform(1 - u, 1 + u, size=(amostras, 3))
+
+
+def grade_simulacao(simulation_time):
+    """
+    Grade das métricas, comum a todas as plantas e controladores, com
+    INTERVALOS_METRICAS intervalos. Não depende das plantas sorteadas, da
+    divisão em blocos nem dos pontos de saída.
+    """
+    return np.linspace(0, simulation_time, INTERVALOS_METRICAS + 1)
+
+
+def simular_bloco(modelos, controladores, t, n_filtro=0.0, grade=None):
+    """
+    Simula um bloco de modelos (m, 3) com cada controlador (Kp, Ti, Td).
+    Retorna as respostas (C, m, n) em float32 e as métricas {nome: (C, m)}.
+
+    Cada planta é integrada com o próprio passo, com até MAX_PASSOS_AMOSTRA
+    passos. O sobressinal vem das amostras da integração, e o tempo de
+    acomodação é calculado na grade de grade_simulacao() (ou em t, sem ela).
+    """
+    t_metricas = grade if grade is not None else t
+    horizonte = float(t_metricas[-1])
+    k, tau, theta = modelos.T
+    # Linhas por vez, para limitar a memória das respostas na grade das métricas
+    linhas = max(1, ELEMENTOS_BLOCO // len(t_metricas))
+    y = np.empty((len(controladores), len(modelos), len(t)), dtype=np.float32)
+    metricas = {
+        "overshoot": np.empty(y.shape[:2]),
+        "settling_time": np.empty(y.shape[:2]),
+        "settled": np.empty(y.shape[:2], dtype=bool)
+    }
+    for c, (kp, ti, td) in enumerate(controladores):
+        for inicio in range(0, len(modelos), linhas):
+            fatia = slice(inicio, inicio + linhas)
+            ym = np.empty((len(k[fatia]), len(t_metricas)))
+            pico = np.empty(len(ym))
+            with etapa("simulacao"):
+                respostas = simular_malhas(
+                    k[fatia], tau[fatia], theta[fatia], kp, ti, td, horizonte, n_filtro, max_passos=MAX_PASSOS_AMOSTRA
+                )
+                for j, (h, yj) in enumerate(respostas):
+                    tj = np.arange(len(yj)) * h
+                    ym[j] = np.interp(t_metricas, tj, yj)
+                    y[c, inicio + j] = np.interp(t, tj, yj)
+                    # Com o derivativo ideal, o pico fica logo depois de um
+                    # salto em múltiplo de θ, que a grade das métricas perderia
+                    pico[j] = yj[:math.floor(horizonte / h + 1e-9) + 1].max()
+            with etapa("metricas"):
+                with np.errstate(invalid="ignore", over="ignore"):
+                    # Sobressinal do pico em relação ao valor final da grade
+                    metricas["overshoot"][c, fatia] = calc_overshoot(np.stack([pico, ym[:, -1]], axis=1))
+                    metricas["settling_time"][c, fatia] = calc_settling_time(t_metricas, ym)
+                    metricas["settled"][c, fatia] = np.abs(ym[:, -1] - 1) <= FAIXA_ACOMODACAO
+    return y, metricas
+
+
+def _json(valores):
+    # inf/NaN (malhas instáveis) viram null
+    return [float(v) if np.isfinite(v) else None for v in valores]
+
+
+def _distribuicao(valores, percentis):
+    finitos = valores[np.isfinite(valores)]
+    if len(finitos) == 0:
+        return {"count": 0, "mean": None, "percentiles": {f"p{p:g}": None for p in percentis}, "histogram": None}
+    contagens, limites = np.histogram(finitos, bins=CLASSES_HISTOGRAMA)
+    return {
+        "count": int(len(finitos)),
+        "mean": float(finitos.mean()),
+        "percentiles": dict(zip((f"p{p:g}" for p in percentis), _json(np.percentile(finitos, percentis)))),
+        "histogram": {"edges": limites.tolist(), "counts": contagens.tolist()}
+    }
+
+
+def envelopes(y, percentis):
+    """
+    Percentis (interpolação linear, como np.percentile) de cada instante de
+    y (m, n) sobre as m respostas: (len(percentis), n). Ordena uma cópia
+    transposta, contígua por instante, o que é bem mais rápido que
+    np.percentile ao longo do eixo 0.
+    """
+    ordenado = np.ascontiguousarray(y.T)
+    # Respostas divergentes (NaN) contam como +inf: ficam no topo dos envelopes
+    ordenado[np.isnan(ordenado)] = np.inf
+    ordenado.sort(axis=1)
+    posicao = np.asarray(percentis, dtype=float) / 100 * (y.shape[0] - 1)
+    abaixo = np.floor(posicao).astype(int)
+    acima = np.minimum(abaixo + 1, y.shape[0] - 1)
+    fracao = posicao - abaixo
+    inferior, superior = ordenado[:, abaixo].T, ordenado[:, acima].T
+    with np.errstate(invalid="ignore"):
+        return np.where(fracao[:, None] > 0, inferior + fracao[:, None] * (superior - inferior), inferior)
+
+
+def resumir(partes, percentis=PERCENTIS_PADRAO):
+    """
+    Junta os blocos de simular_bloco e calcula, por controlador, os envelopes
+    de percentis da resposta e as distribuições do sobressinal e do tempo de
+    acomodação.
+    """
+    y = np.concatenate([p[0] for p in partes], axis=1)
+    metricas = {nome: np.concatenate([p[1][nome] for p in partes], axis=1) for nome in partes[0][1]}
+    resumos = []
+    for c in range(y.shape[0]):
+        resumos.append({
+            "envelopes": dict(zip((f"p{p:g}" for p in percentis), (_json(e) for e in envelopes(y[c], percentis)))),
+            "settled_fraction": float(metricas["settled"][c].mean()),
+            "distributions": {
+                nome: _distribuicao(metricas[nome][c], percentis) for nome in ("overshoot", "settling_time")
+            }
+        })
+    return resumos
+
+
+if __name__ == "__main__":
+    import time
+    from sintonia import sintonia_imc, sintonia_itae
+
+    # 10000 plantas (±20%) com os controladores IMC (lambda = 1) e ITAE, em
+    # um núcleo, com o horizonte e os pontos padrão do /monte-carlo/. θ
+    # pequeno é o caso mais caro: mais passos de integração por planta
+    t = np.linspace(0, 50.0, 500)
+    grade = grade_simulacao(50.0)
+    # Fora da medição: a primeira simulação importa o scipy.signal
+    simular_bloco(amostrar_modelos(1.0, 10.0, 2.0, (20, 20, 20), 1), [sintonia_imc(1.0, 10.0, 2.0, 1.0)], t)
+    print("10000 amostras, simulação + resumo:")
+    for k, tau, theta in ((1.0, 10.0, 2.0), (1.0, 10.0, 0.5), (1.0, 10.0, 0.2)):
+        controladores = [sintonia_imc(k, tau, theta, 1.0), sintonia_itae(k, tau, theta)]
+        modelos = amostrar_modelos(k, tau, theta, (20, 20, 20), 10000, semente=0)
+        inicio = time.perf_counter()
+        parte = simular_bloco(modelos, controladores, t, 0.0, grade)
+        simulacao = time.perf_counter() - inicio
+        imc, _ = resumir([parte])
+        total = time.perf_counter() - inicio
+        sobressinal = imc["distributions"]["overshoot"]["percentiles"]
+        print(f"  k={k} tau={tau} theta={theta}: {simulacao:.2f} s + {total - simulacao:.2f} s "
+              f"(sobressinal IMC p50 {sobressinal['p50']:.1f}%, p95 {sobressinal['p95']:.1f}%)")
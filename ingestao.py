@@ -0,0 +1,210 @@
+"""
+Leitura dos arquivos de upload para o armazenamento colunar.
+
+Formatos aceitos: .mat v5 (scipy.io.loadmat), .mat v7.3 (HDF5, requer h5py),
+CSV e Parquet (requer pyarrow). As colunas são tomadas pela posição, como
+no .mat v5: tempo, saida e entrada. Com exceção do .mat v5, cujo leitor
+carrega o arquivo inteiro, os arquivos são percorridos em blocos de
+INGESTAO_BLOCO_AMOSTRAS amostras e gravados direto no .npy, de modo que
+registros com milhões de amostras não precisam caber na memória.
+"""
+import os
+import logging
+
+import numpy as np
+
+from armazenamento import salvar_dataset, salvar_dataset_em_blocos
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_UPLOAD = (".mat", ".csv", ".parquet")
+INGESTAO_BLOCO_AMOSTRAS = int(os.environ.get("INGESTAO_BLOCO_AMOSTRAS", "262144"))
+
+# Arquivos .mat v7.3 são HDF5 com um cabeçalho MATLAB de 512 bytes
+_ASSINATURA_HDF5 = b"\x89HDF\r\n\x1a\n"
+
+
+def _blocos(n):
+    for inicio in range(0, n, INGESTAO_BLOCO_AMOSTRAS):
+        yield inicio, min(inicio + INGESTAO_BLOCO_AMOSTRAS, n)
+
+
+def ler_mat_v5(path):
+    """
+    Extrai (tempo, saida, entrada) de um arquivo .mat v5 (carregado inteiro).
+    """
+    from scipy.io import loadmat
+    try:
+        mat_data = loadmat(path)
+        logger.info(f"Chaves disponíveis no arquivo .mat: {mat_data.keys()}")
+        
+        # Verificar se a estrutura esperada existe
+        if 'reactionExperiment' not in mat_data:
+            # Tentar encontrar outras estruturas de dados
+            data_keys = [k for k in mat_data.keys() if not k.startswith('__')]
+            logger.info(f"Estrutura 'reactionExperiment' não encontrada. Chaves disponíveis: {data_keys}")
+            
+            if len(data_keys) > 0:
+                # Usar a primeira estrutura de dados disponível
+                key = data_keys[0]
+                logger.info(f"Usando a estrutura '{key}' como fonte de dados")
+                
+                # Tentar extrair dados dessa estrutura
+                try:
+                    dados = mat_data[key]
+                    # Verificar se é uma matriz ou estrutura
+                    if isinstance(dados, np.ndarray):
+                        if dados.ndim == 2:
+                            # Assumir que as colunas são tempo, saída, entrada
+                            if dados.shape[1] >= 3:
+                                tempo = dados[:, 0]
+                                saida = dados[:, 1]
+                                entrada = dados[:, 2]
+                            else:
+                                raise ValueError(f"A matriz '{key}' não tem colunas suficientes (precisa de pelo menos 3)")
+                        else:
+                            raise ValueError(f"A estrutura '{key}' não é uma matriz 2D")
+                    else:
+                        raise ValueError(f"A estrutura '{key}' não é uma matriz numpy")
+                except Exception as e:
+                    logger.error(f"Erro ao extrair dados da estrutura '{key}': {str(e)}")
+                    raise ValueError(f"Não foi possível extrair dados da estrutura '{key}': {str(e)}")
+            else:
+                raise ValueError("Estrutura de dados não reconhecida no arquivo .mat")
+        else:
+            # Extrair dados da estrutura reactionExperiment
+            try:
+                dados = mat_data["reactionExperiment"][0, 0]
+                tempo = dados[0].ravel()
+                saida = dados[1].ravel()
+                entrada = dados[2].ravel()
+            except Exception as e:
+                logger.error(f"Erro ao extrair dados da estrutura 'reactionExperiment': {str(e)}")
+                raise ValueError(f"Erro ao extrair dados da estrutura 'reactionExperiment': {str(e)}")
+    except Exception as e:
+        logger.error(f"Erro ao carregar arquivo .mat: {str(e)}")
+        raise ValueError(f"Erro ao carregar arquivo .mat: {str(e)}")
+    
+    return tempo, saida, entrada
+
+
+def mat_v73(path):
+    with open(path, "rb") as f:
+        f.seek(512)
+        return f.read(len(_ASSINATURA_HDF5)) == _ASSINATURA_HDF5
+
+
+def _coluna_hdf5(dataset, linha=None):
+    """
+    Função (inicio, fim) -> amostras de um vetor ou de uma linha de uma matriz HDF5.
+    O MATLAB grava as matrizes transpostas: um vetor coluna n×1 aparece como (1, n).
+    """
+    if linha is not None:
+        return dataset.shape[1], lambda i, j: dataset[linha, i:j]
+    if dataset.ndim == 1:
+        return dataset.shape[0], lambda i, j: dataset[i:j]
+    if dataset.ndim == 2 and dataset.shape[0] == 1:
+        return dataset.shape[1], lambda i, j: dataset[0, i:j]
+    if dataset.ndim == 2 and dataset.shape[1] == 1:
+        return dataset.shape[0], lambda i, j: dataset[i:j, 0]
+    raise ValueError(f"O campo '{dataset.name}' não é um vetor")
+
+
+def _colunas_mat_v73(arquivo):
+    import h5py
+
+    if "reactionExperiment" in arquivo and isinstance(arquivo["reactionExperiment"], h5py.Group):
+        grupo = arquivo["reactionExperiment"]
+        # Ordem dos campos da struct, como no .mat v5
+        if "MATLAB_fields" in grupo.attrs:
+            campos = [b"".join(c).decode() for c in grupo.attrs["MATLAB_fields"]]
+        else:
+            campos = list(grupo.keys())
+        campos = [c for c in campos if isinstance(grupo.get(c), h5py.Dataset)]
+        if len(campos) < 3:
+            raise ValueError("A estrutura 'reactionExperiment' não tem campos suficientes (precisa de pelo menos 3)")
+        return [_coluna_hdf5(grupo[c]) for c in campos[:3]]
+
+    data_keys = [k for k in arquivo.keys() if not k.startswith("#")]
+    logger.info(f"Estrutura 'reactionExperiment' não encontrada. Chaves disponíveis: {data_keys}")
+    if not data_keys:
+        raise ValueError("Estrutura de dados não reconhecida no arquivo .mat")
+    key = data_keys[0]
+    dados = arquivo[key]
+    if not isinstance(dados, h5py.Dataset) or dados.ndim != 2:
+        raise ValueError(f"A estrutura '{key}' não é uma matriz 2D")
+    # Matriz n×3 do MATLAB: cada coluna é uma linha do dataset HDF5
+    if dados.shape[0] < 3:
+        raise ValueError(f"A matriz '{key}' não tem colunas suficientes (precisa de pelo menos 3)")
+    return [_coluna_hdf5(dados, linha) for linha in range(3)]
+
+
+def ingerir_mat_v73(path, file_id):
+    try:
+        import h5py
+    except ImportError:
+        raise ValueError("Arquivos .mat v7.3 (HDF5) requerem o pacote h5py")
+
+    with h5py.File(path, "r") as arquivo:
+        colunas = _colunas_mat_v73(arquivo)
+        n = colunas[0][0]
+        if any(tamanho != n for tamanho, _ in colunas):
+            raise ValueError("As colunas do arquivo .mat têm tamanhos diferentes")
+        blocos = (tuple(ler(i, j) for _, ler in colunas) for i, j in _blocos(n))
+        return salvar_dataset_em_blocos(file_id, n, blocos)
+
+
+def _contar_linhas(path):
+    # Linhas não vazias, sem carregar o arquivo
+    with open(path, "rb") as f:
+        return sum(1 for linha in f if linha.strip())
+
+
+def _colunas_bloco(matriz):
+    if matriz.shape[0] < 3:
+        raise ValueError("O arquivo precisa de pelo menos 3 colunas (tempo, saida, entrada)")
+    return matriz[0], matriz[1], matriz[2]
+
+
+def ingerir_csv(path, file_id):
+    import pandas as pd
+
+    n = _contar_linhas(path) - 1  # cabeçalho
+    if n < 1:
+        raise ValueError("O arquivo CSV não tem amostras")
+    leitor = pd.read_csv(path, chunksize=INGESTAO_BLOCO_AMOSTRAS)
+    blocos = (_colunas_bloco(df.iloc[:, :3].to_numpy(dtype=np.float64).T) for df in leitor)
+    return salvar_dataset_em_blocos(file_id, n, blocos)
+
+
+def ingerir_parquet(path, file_id):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Arquivos Parquet requerem o pacote pyarrow")
+
+    arquivo = pq.ParquetFile(path)
+    nomes = arquivo.schema_arrow.names
+    if len(nomes) < 3:
+        raise ValueError("O arquivo precisa de pelo menos 3 colunas (tempo, saida, entrada)")
+    blocos = (
+        tuple(np.asarray(lote.column(i).to_numpy(zero_copy_only=False), dtype=np.float64) for i in range(3))
+        for lote in arquivo.iter_batches(batch_size=INGESTAO_BLOCO_AMOSTRAS, columns=nomes[:3])
+    )
+    return salvar_dataset_em_blocos(file_id, arquivo.metadata.num_rows, blocos)
+
+
+def ingerir(path, file_id):
+    """
+    Converte o arquivo de upload (pela extensão) para o armazenamento colunar.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return ingerir_csv(path, file_id)
+    if ext == ".parquet":
+        return ingerir_parquet(path, file_id)
+    if ext != ".mat":
+        raise ValueError(f"Formato não suportado: {ext}")
+    if mat_v73(path):
+        return ingerir_mat_v73(path, file_id)
+    return salvar_dataset(file_id, *ler_mat_v5(path))
@@ -0,0 +1,239 @@
+"""
+Medição do tempo das etapas das requisições.
+
+Cada requisição HTTP acumula a duração das suas etapas (carregamento,
+suavização, identificação, simulação, renderização, espera na fila do pool
+etc.). Ao final, as durações vão para histogramas no formato do Prometheus
+(GET /metrics) e para o cabeçalho Server-Timing da resposta.
+
+As etapas que rodam no pool de execução (threads ou processos) são medidas
+dentro do worker por cronometrar(), que devolve as durações junto com o
+resultado; executar() as acrescenta às da requisição.
+
+Com PERFIL_HABILITADO=1, uma requisição com o cabeçalho ``X-Profile: 1`` é
+amostrada por um profiler estatístico nas etapas executadas no pool. As
+pilhas (formato "folded", uma linha por pilha com o número de amostras)
+ficam disponíveis em GET /profiles/{id}, com o id no cabeçalho X-Profile-Id.
+"""
+import os
+import sys
+import time
+import uuid
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# Limites dos baldes dos histogramas (s)
+BALDES_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PERFIL_HABILITADO = os.environ.get("PERFIL_HABILITADO", "0") == "1"
+# Intervalo entre amostras do profiler (ms) e perfis mantidos em memória
+PERFIL_INTERVALO_MS = float(os.environ.get("PERFIL_INTERVALO_MS", "2"))
+PERFIS_MAX = 20
+
+# Etapas da requisição em andamento: lista de (nome, duração em s)
+_etapas = contextvars.ContextVar("etapas", default=None)
+# Pilhas amostradas da requisição em andamento (Counter), se o perfil foi pedido
+_perfil = contextvars.ContextVar("perfil", default=None)
+
+
+class Histograma:
+    """
+    Histograma cumulativo por conjunto de rótulos, no modelo do Prometheus.
+    """
+
+    def __init__(self, nome, descricao, rotulos, baldes=BALDES_S):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self.baldes = baldes
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.baldes) + 1), 0.0, 0]
+            serie[0][bisect_left(self.baldes, valor)] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = sorted((r, [list(s[0]), s[1], s[2]]) for r, s in self._series.items())
+        for rotulos, (contagens, soma, total) in series:
+            base = ",".join(f'{nome}="{valor}"' for nome, valor in zip(self.rotulos, rotulos))
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + ("+Inf",), contagens):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+            linhas.append(f"{self.nome}_sum{{{base}}} {soma}")
+            linhas.append(f"{self.nome}_count{{{base}}} {total}")
+        return linhas
+
+
+etapas_segundos = Histograma(
+    "api_stage_duration_seconds", "Duração das etapas das requisições.", ("stage",)
+)
+requisicoes_segundos = Histograma(
+    "api_request_duration_seconds", "Duração das requisições HTTP.", ("method", "route", "status")
+)
+
+
+def registrar(nome, duracao):
+    """
+    Acrescenta uma etapa à requisição em andamento (sem requisição, não faz nada).
+    """
+    etapas = _etapas.get()
+    if etapas is not None:
+        etapas.append((nome, duracao))
+
+
+@contextmanager
+def etapa(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nome, time.perf_counter() - inicio)
+
+
+def iniciar_requisicao(perfil=False):
+    """
+    Começa a medir uma requisição. Retorna a lista em que as etapas serão acumuladas.
+    """
+    etapas = []
+    _etapas.set(etapas)
+    _perfil.set(Counter() if perfil and PERFIL_HABILITADO else None)
+    return etapas
+
+
+def finalizar_requisicao(etapas, duracao, metodo, rota, status):
+    """
+    Registra as etapas e a duração total nos histogramas e retorna o valor
+    do cabeçalho Server-Timing.
+    """
+    requisicoes_segundos.observar(duracao, metodo, rota, str(status))
+    somas = OrderedDict()
+    for nome, segundos in etapas:
+        etapas_segundos.observar(segundos, nome)
+        somas[nome] = somas.get(nome, 0.0) + segundos
+    somas["total"] = duracao
+    return ", ".join(f"{nome};dur={segundos * 1000:.2f}" for nome, segundos in somas.items())
+
+
+# Etapas executadas no pool
+
+class _Amostrador(threading.Thread):
+    """
+    Profiler estatístico: amostra a pilha de uma thread em intervalos fixos.
+    """
+
+    def __init__(self, thread_id, intervalo_s):
+        super().__init__(name="amostrador-perfil", daemon=True)
+        self.thread_id = thread_id
+        self.intervalo_s = intervalo_s
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo_s):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                codigo = frame.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        return self.pilhas
+
+
+def cronometrar(func, perfil, *args, **kwargs):
+    """
+    Executa func no worker medindo as etapas internas. Retorna
+    (resultado, {"inicio", "fim", "etapas", "perfil"}); inicio e fim são
+    horários do relógio de parede, comparáveis entre processos.
+    """
+    etapas = []
+    _etapas.set(etapas)
+    amostrador = None
+    if perfil:
+        amostrador = _Amostrador(threading.get_ident(), PERFIL_INTERVALO_MS / 1000)
+        amostrador.start()
+    inicio = time.time()
+    try:
+        resultado = func(*args, **kwargs)
+    finally:
+        fim = time.time()
+        pilhas = amostrador.parar() if amostrador is not None else None
+        _etapas.set(None)
+    return resultado, {"inicio": inicio, "fim": fim, "etapas": etapas, "perfil": pilhas}
+
+
+def perfil_pedido():
+    return _perfil.get() is not None
+
+
+def incorporar(nome, submetido, medidas):
+    """
+    Acrescenta à requisição em andamento as medidas de uma tarefa do pool:
+    a espera na fila, a duração total da tarefa e as etapas internas.
+    """
+    etapas = _etapas.get()
+    if etapas is None:
+        return
+    etapas.append(("fila", max(medidas["inicio"] - submetido, 0.0)))
+    etapas.append((nome, medidas["fim"] - medidas["inicio"]))
+    etapas.extend(medidas["etapas"])
+    perfil = _perfil.get()
+    if perfil is not None and medidas["perfil"]:
+        perfil.update(medidas["perfil"])
+
+
+# Perfis concluídos
+
+_perfis = OrderedDict()
+_lock_perfis = threading.Lock()
+
+
+def guardar_perfil():
+    """
+    Guarda as pilhas amostradas da requisição em andamento e retorna o id, ou None.
+    """
+    pilhas = _perfil.get()
+    if not pilhas:
+        return None
+    perfil_id = str(uuid.uuid4())
+    with _lock_perfis:
+        _perfis[perfil_id] = "\n".join(f"{pilha} {n}" for pilha, n in pilhas.most_common()) + "\n"
+        while len(_perfis) > PERFIS_MAX:
+            _perfis.popitem(last=False)
+    return perfil_id
+
+
+def obter_perfil(perfil_id):
+    with _lock_perfis:
+        return _perfis.get(perfil_id)
+
+
+def exportar(medidores=()):
+    """
+    Texto do /metrics: os histogramas e os medidores dados como
+    (nome, tipo, descrição, [(rótulos, valor)]).
+    """
+    linhas = etapas_segundos.exportar() + requisicoes_segundos.exportar()
+    for nome, tipo, descricao, amostras in medidores:
+        linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} {tipo}"]
+        for rotulos, valor in amostras:
+            base = ",".join(f'{k}="{v}"' for k, v in rotulos.items())
+            linhas.append(f"{nome}{{{base}}} {valor}" if base else f"{nome} {valor}")
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,172 @@
+"""
+Jobs assíncronos de identificação em lote sobre a biblioteca de datasets.
+
+Cada job distribui um arquivo por tarefa em um pool de processos próprio,
+separado do pool das requisições interativas (execucao.py). Os resultados
+parciais ficam disponíveis enquanto o job roda, e o cancelamento descarta
+as tarefas que ainda não começaram.
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import catalogo
+from cache_sinais import obter_filtro_recomendado
+from identificacao import ErroIdentificacao, identificar_dataset
+
+logger = logging.getLogger(__name__)
+
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", str(os.cpu_count() or 2)))
+# Jobs mantidos em memória (os mais antigos já finalizados são descartados)
+JOBS_MAX = int(os.environ.get("JOBS_MAX", "100"))
+
+
+def identificar_arquivo(file_id, metodo, window_length, polyorder, offset_percent, renderizar=None):
+    """
+    Tarefa de um job: identifica um dataset e, opcionalmente, gera o gráfico
+    com renderizar(file_id, metodo, window_length, polyorder, resultado).
+    window_length None usa o filtro recomendado para o dataset.
+    """
+    if window_length is None:
+        recomendado = obter_filtro_recomendado(file_id)
+        window_length = recomendado["window_length"]
+        polyorder = recomendado["polyorder"]
+    if polyorder >= window_length:
+        polyorder = window_length - 1
+
+    resultado = identificar_dataset(file_id, metodo, window_length, polyorder, offset_percent)
+    resultado["filter_params"] = {
+        "window_length": window_length,
+        "polyorder": polyorder,
+        "offset_percent": offset_percent
+    }
+    if renderizar is not None:
+        resultado["plot_path"] = renderizar(file_id, metodo, window_length, polyorder, resultado)
+    try:
+        catalogo.registrar_identificacao(file_id, metodo, resultado)
+    except Exception as e:
+        logger.error(f"Erro ao registrar identificação de {file_id} no catálogo: {str(e)}")
+    return resultado
+
+
+class Job:
+    def __init__(self, file_ids, parametros):
+        self.id = str(uuid.uuid4())
+        self.file_ids = list(file_ids)
+        self.parametros = parametros
+        self.status = "running"
+        self.criado_em = time.time()
+        self.finalizado_em = None
+        self.resultados = {}
+        self.erros = {}
+        self.futuros = {}
+        self._lock = threading.Lock()
+
+    def _concluir_tarefa(self, file_id, futuro):
+        with self._lock:
+            if futuro.cancelled():
+                pass
+            elif futuro.exception() is not None:
+                erro = futuro.exception()
+                self.erros[file_id] = str(erro) if isinstance(erro, ErroIdentificacao) else f"Erro ao identificar modelo: {erro}"
+            else:
+                self.resultados[file_id] = futuro.result()
+            if all(f.done() for f in self.futuros.values()) and self.status == "running":
+                self.status = "completed"
+                self.finalizado_em = time.time()
+
+    def cancelar(self):
+        with self._lock:
+            if self.status != "running":
+                return False
+            self.status = "cancelled"
+            self.finalizado_em = time.time()
+            futuros = list(self.futuros.values())
+        for futuro in futuros:
+            futuro.cancel()
+        return True
+
+    def resumo(self, incluir_resultados=True):
+        with self._lock:
+            concluidos = len(self.resultados) + len(self.erros)
+            resumo = {
+                "job_id": self.id,
+                "status": self.status,
+                "parameters": self.parametros,
+                "progress": {
+                    "total": len(self.file_ids),
+                    "done": concluidos,
+                    "succeeded": len(self.resultados),
+                    "failed": len(self.erros),
+                    "fraction": concluidos / len(self.file_ids) if self.file_ids else 1.0
+                },
+                "created_at": self.criado_em,
+                "finished_at": self.finalizado_em
+            }
+            if incluir_resultados:
+                resumo["results"] = dict(self.resultados)
+                resumo["errors"] = dict(self.erros)
+            return resumo
+
+
+_executor = None
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def _obter_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=JOBS_WORKERS)
+    return _executor
+
+
+def criar_job(file_ids, metodo, window_length, polyorder, offset_percent, renderizar=None):
+    """
+    Cria e inicia um job. renderizar precisa ser uma função de módulo (serializável).
+    """
+    job = Job(file_ids, {
+        "metodo": metodo,
+        "window_length": window_length,
+        "polyorder": polyorder,
+        "offset_percent": offset_percent,
+        "render_plots": renderizar is not None
+    })
+    with _lock:
+        _jobs[job.id] = job
+        # Descartar os jobs finalizados mais antigos
+        while len(_jobs) > JOBS_MAX:
+            antigo = next((j for j in _jobs.values() if j.status != "running"), None)
+            if antigo is None:
+                break
+            del _jobs[antigo.id]
+
+    executor = _obter_executor()
+    with job._lock:
+        for file_id in job.file_ids:
+            job.futuros[file_id] = executor.submit(
+                identificar_arquivo, file_id, metodo, window_length, polyorder, offset_percent, renderizar
+            )
+    for file_id, futuro in job.futuros.items():
+        futuro.add_done_callback(lambda f, file_id=file_id: job._concluir_tarefa(file_id, f))
+    if not job.file_ids:
+        job.status = "completed"
+        job.finalizado_em = time.time()
+    logger.info(f"Job {job.id} iniciado com {len(job.file_ids)} datasets")
+    return job
+
+
+def obter_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def encerrar():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -9,7 +9,8 @@ const API_CONFIG = {
         identify: '/identify/',
         tune: '/tune/',
         plot: '/plot/',
-        analyzeFilter: '/analyze-filter/'
+        analyzeFilter: '/analyze-filter/',
+        identifySession: '/ws/identify/'
     },
     
     // Função para obter URL completa de uma imagem
@@ -19,6 +20,11 @@ const API_CONFIG = {
             path = path.substring(1);
         }
         return `${this.baseUrl}/${path}`;
+    },
+    
+    // URL WebSocket (ws:// ou wss://) de um endpoint
+    getWebSocketUrl: function(path) {
+        return `${this.baseUrl.replace(/^http/, 'ws')}${path}`;
     }
 };
  
\ No newline at end of file
@@ -86,19 +86,72 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('Navegando de volta para a aba de Sintonia');
     });
     
+    // Sessão interativa de identificação: atualiza os parâmetros do modelo enquanto os sliders são arrastados
+    let identifySession = null;
+    let identifySessionFileId = null;
+    let identifySeq = 0;
+    
+    function openIdentifySession(fileId) {
+        if (identifySession && identifySessionFileId === fileId) {
+            return;
+        }
+        if (identifySession) {
+            identifySession.close();
+        }
+        const session = new WebSocket(API_CONFIG.getWebSocketUrl(`${API_CONFIG.endpoints.identifySession}${fileId}`));
+        session.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            // Respostas de parâmetros já superados são ignoradas
+            if (data.type !== 'result' || data.seq !== identifySeq) {
+                return;
+            }
+            document.getElementById('model-k').value = data.k;
+            document.getElementById('model-tau').value = data.tau;
+            document.getElementById('model-theta').value = data.theta;
+            displayModelParams(data);
+        };
+        session.onclose = () => {
+            if (identifySession === session) {
+                identifySession = null;
+                identifySessionFileId = null;
+            }
+        };
+        identifySession = session;
+        identifySessionFileId = fileId;
+    }
+    
+    function sendIdentifyParams() {
+        if (!identifySession || identifySession.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        identifySeq += 1;
+        identifySession.send(JSON.stringify({
+            seq: identifySeq,
+            metodo: document.getElementById('method').value,
+            window_length: parseInt(windowLengthSlider.value),
+            polyorder: parseInt(polyorderSlider.value),
+            offset_percent: parseFloat(offsetPercentSlider.value)
+        }));
+    }
+    
     // Atualizar valores dos sliders quando alterados
     windowLengthSlider.addEventListener('input', () => {
         windowLengthValue.textContent = windowLengthSlider.value;
+        sendIdentifyParams();
     });
     
     polyorderSlider.addEventListener('input', () => {
         polyorderValue.textContent = polyorderSlider.value;
+        sendIdentifyParams();
     });
     
     offsetPercentSlider.addEventListener('input', () => {
         offsetPercentValue.textContent = offsetPercentSlider.value;
+        sendIdentifyParams();
     });
     
+    document.getElementById('method').addEventListener('change', sendIdentifyParams);
+    
     lambdaSlider.addEventListener('input', () => {
         lambdaValue.textContent = parseFloat(lambdaSlider.value).toFixed(1);
     });
@@ -117,14 +170,14 @@ document.addEventListener('DOMContentLoaded', function() {
         const file = fileInput.files[0];
         
         if (!file) {
-            showAlert('Por favor, selecione um arquivo .mat', 'danger');
+            showAlert('Por favor, selecione um arquivo .mat, .csv ou .parquet', 'danger');
             return;
         }
         
         console.log("Arquivo selecionado:", file.name);
         
-        if (!file.name.endsWith('.mat')) {
-            showAlert('Apenas arquivos .mat são aceitos', 'danger');
+        if (!/\.(mat|csv|parquet)$/i.test(file.name)) {
+            showAlert('Apenas arquivos .mat, .csv e .parquet são aceitos', 'danger');
             return;
         }
         
@@ -209,6 +262,9 @@ document.addEventListener('DOMContentLoaded', function() {
             document.getElementById('identify-plot').src = API_CONFIG.getImageUrl(data.plot_path);
             document.getElementById('model-params-card').style.display = 'block';
             
+            // A partir daqui, os sliders atualizam os parâmetros pela sessão interativa
+            openIdentifySession(formData.get('file_id'));
+            
             showAlert('Modelo identificado com sucesso!', 'success');
         } catch (error) {
             console.error('Erro completo:', error);
@@ -0,0 +1,280 @@
+"""
+Arrays dos datasets compartilhados entre processos (uvicorn --workers N e
+o pool de processos de execucao.py).
+
+Com MEMORIA_COMPARTILHADA=1, os sinais carregados e as saídas suavizadas
+do cache_sinais.py são publicados em blocos de multiprocessing.shared_memory.
+O nome de cada bloco é derivado da chave do cache (file_id, assinatura do
+arquivo e parâmetros do filtro), de modo que qualquer processo do host
+anexa o mesmo bloco sem cópia. Um dataset é carregado e filtrado uma vez
+por host, e não uma vez por processo.
+
+Um registro comum aos processos (arquivo JSON protegido por flock) guarda,
+por bloco, o tamanho, o último acesso e os PIDs que o mantêm anexado, um
+por entrada do cache local (a contagem de referências). Um processo solta
+a referência quando a entrada sai do seu cache local. Ao publicar além de MEMORIA_COMPARTILHADA_MB, os
+blocos sem referências de processos vivos são removidos, do acesso mais
+antigo para o mais recente. Se ainda assim não houver espaço, o array fica
+só na memória do processo.
+
+Os blocos sobrevivem aos processos (o cache continua quente após um
+reinício). Para removê-los:
+
+    python memoria_compartilhada.py limpar
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import weakref
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from armazenamento import DATASETS_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MEMORIA_COMPARTILHADA = os.environ.get("MEMORIA_COMPARTILHADA", "0") == "1" and fcntl is not None
+MEMORIA_COMPARTILHADA_MB = float(os.environ.get("MEMORIA_COMPARTILHADA_MB", "1024"))
+
+# Cabeçalho do bloco: número de linhas e de colunas do array float64
+_CABECALHO = 16
+# Instâncias do servidor com diretórios de datasets diferentes não compartilham blocos
+_INSTANCIA = hashlib.sha1(os.path.abspath(DATASETS_DIR).encode()).hexdigest()[:8]
+_REGISTRO = os.path.join(tempfile.gettempdir(), f"sinais_{_INSTANCIA}.json")
+
+# Blocos anexados por este processo: nome -> (SharedMemory, array sobre o bloco)
+_anexados = {}
+# Blocos soltos cujo array ainda estava em uso: (SharedMemory, weakref do array);
+# fechados em uma próxima chamada. O numpy não mantém o buffer exportado, então
+# shm.close() não falha com o array vivo: é o weakref que diz quando fechar
+_pendentes = []
+_lock = threading.Lock()
+
+
+def _nome(chave):
+    return f"sc{_INSTANCIA}{hashlib.sha1(repr(chave).encode()).hexdigest()[:16]}"
+
+
+def _abrir(nome, tamanho=0):
+    """
+    Abre (tamanho > 0: cria) um bloco sem o resource_tracker, que o removeria
+    quando o processo que o abriu terminasse.
+    """
+    try:
+        return shared_memory.SharedMemory(nome, create=tamanho > 0, size=tamanho, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(nome, create=tamanho > 0, size=tamanho)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _remover(nome):
+    # Aberto com o resource_tracker: unlink() remove o registro que o open fez
+    try:
+        shm = shared_memory.SharedMemory(nome)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _registro():
+    """
+    Registro {nome: {"bytes", "refs", "accessed_at"}} com lock exclusivo entre
+    processos; as alterações são gravadas ao sair.
+    """
+    with _lock, open(f"{_REGISTRO}.lock", "a") as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(_REGISTRO) as f:
+                    blocos = json.load(f)
+            except (OSError, ValueError):
+                blocos = {}
+            yield blocos
+            tmp_path = f"{_REGISTRO}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(blocos, f)
+            os.replace(tmp_path, _REGISTRO)
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+def _array(shm):
+    linhas, colunas = np.frombuffer(shm.buf, dtype=np.int64, count=2)
+    array = np.ndarray((int(linhas), int(colunas)), dtype=np.float64, buffer=shm.buf, offset=_CABECALHO)
+    array.setflags(write=False)
+    return array
+
+
+def _fechar_pendentes():
+    for pendente in list(_pendentes):
+        shm, array = pendente
+        if array() is None:
+            shm.close()
+            _pendentes.remove(pendente)
+
+
+def _soltar(nome):
+    # Fecha o bloco quando nenhuma visão do seu array estiver em uso
+    shm, array = _anexados.pop(nome)
+    _pendentes.append((shm, weakref.ref(array)))
+    del array
+    _fechar_pendentes()
+
+
+def _anexar(blocos, nome):
+    bloco = blocos.get(nome)
+    if bloco is None:
+        return None
+    if nome not in _anexados:
+        try:
+            shm = _abrir(nome)
+        except FileNotFoundError:
+            # Removido fora do registro (reinício do host, limpeza manual)
+            del blocos[nome]
+            return None
+        _anexados[nome] = (shm, _array(shm))
+    # Uma referência por chamada: duas threads que falham na mesma chave
+    # anexam duas vezes, e cada entrada do cache solta a sua
+    bloco["refs"].append(os.getpid())
+    bloco["accessed_at"] = time.time()
+    return _anexados[nome][1]
+
+
+def anexar(chave):
+    """
+    Array (linhas, colunas) publicado para a chave, anexado sem cópia, ou None.
+    """
+    with _registro() as blocos:
+        _fechar_pendentes()
+        return _anexar(blocos, _nome(chave))
+
+
+def publicar(chave, array):
+    """
+    Copia o array 2-D float64 para um bloco compartilhado e retorna a visão
+    somente leitura do bloco, ou None se não couber no limite.
+    """
+    array = np.asarray(array, dtype=np.float64)
+    nome = _nome(chave)
+    tamanho = _CABECALHO + array.nbytes
+    limite = int(MEMORIA_COMPARTILHADA_MB * 1024 * 1024)
+    if tamanho > limite:
+        return None
+    with _registro() as blocos:
+        # Publicado por outro processo desde a última consulta
+        anexado = _anexar(blocos, nome)
+        if anexado is not None:
+            return anexado
+        usados = sum(b["bytes"] for b in blocos.values())
+        livres = sorted(
+            (b["accessed_at"], n) for n, b in blocos.items() if not any(_vivo(pid) for pid in b["refs"])
+        )
+        while usados + tamanho > limite and livres:
+            _, removido = livres.pop(0)
+            _remover(removido)
+            usados -= blocos.pop(removido)["bytes"]
+        if usados + tamanho > limite:
+            return None
+        # Sobra de um processo que terminou antes de registrar o bloco
+        _remover(nome)
+        shm = _abrir(nome, tamanho)
+        np.ndarray(2, dtype=np.int64, buffer=shm.buf)[:] = array.shape
+        np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf, offset=_CABECALHO)[:] = array
+        _anexados[nome] = (shm, _array(shm))
+        blocos[nome] = {"bytes": tamanho, "refs": [os.getpid()], "accessed_at": time.time()}
+        return _anexados[nome][1]
+
+
+def liberar(chave):
+    """
+    Solta a referência deste processo ao bloco da chave (chamado quando a
+    entrada sai do cache local).
+    """
+    nome = _nome(chave)
+    if nome not in _anexados:
+        return
+    with _registro() as blocos:
+        bloco = blocos.get(nome)
+        if bloco is not None and os.getpid() in bloco["refs"]:
+            bloco["refs"].remove(os.getpid())
+            if os.getpid() in bloco["refs"]:
+                return
+        # Pode ainda estar em uso por uma requisição em andamento
+        _soltar(nome)
+
+
+def encerrar():
+    """
+    Solta todas as referências deste processo, mantendo os blocos para os demais.
+    """
+    if not _anexados:
+        return
+    with _registro() as blocos:
+        for nome in list(_anexados):
+            bloco = blocos.get(nome)
+            if bloco is not None:
+                bloco["refs"] = [pid for pid in bloco["refs"] if pid != os.getpid()]
+            _soltar(nome)
+
+
+def estatisticas():
+    if not MEMORIA_COMPARTILHADA:
+        return {"enabled": False}
+    with _registro() as blocos:
+        return {
+            "enabled": True,
+            "blocks": len(blocos),
+            "bytes": sum(b["bytes"] for b in blocos.values()),
+            "max_bytes": int(MEMORIA_COMPARTILHADA_MB * 1024 * 1024),
+            "attached": len(_anexados)
+        }
+
+
+def limpar():
+    """
+    Remove todos os blocos do registro. Retorna quantos foram removidos.
+    """
+    with _registro() as blocos:
+        for nome in blocos:
+            _remover(nome)
+        removidos = len(blocos)
+        blocos.clear()
+    return removidos
+
+
+if __name__ == "__main__":
+    if fcntl is None:
+        print("Memória compartilhada indisponível nesta plataforma")
+        sys.exit(1)
+    if len(sys.argv) < 2 or sys.argv[1] not in ("limpar", "listar"):
+        print("Uso: python memoria_compartilhada.py limpar|listar")
+        sys.exit(1)
+    if sys.argv[1] == "limpar":
+        print(f"{limpar()} blocos removidos")
+    else:
+        with _registro() as blocos:
+            for nome, bloco in sorted(blocos.items(), key=lambda b: -b[1]["accessed_at"]):
+                vivos = [pid for pid in bloco["refs"] if _vivo(pid)]
+                print(f"{nome}  {bloco['bytes'] / 1024 / 1024:.1f} MB  refs={vivos}")
@@ -0,0 +1,113 @@
+"""
+Métricas de desempenho da resposta ao degrau.
+
+Todas as funções são vetorizadas: y pode ser uma resposta (n,) ou um lote
+(M, n) com uma resposta por linha, sempre amostrado no mesmo vetor t (n,).
+Cada métrica é calculada em uma única passada, sem laços em Python.
+"""
+import numpy as np
+
+# Faixa de acomodação (5%)
+FAIXA_ACOMODACAO = 0.05
+
+
+def _normalizar(y):
+    # Normaliza cada resposta entre o valor inicial (0) e o final (1)
+    y0 = y[..., :1]
+    variacao = y[..., -1:] - y0
+    sem_variacao = variacao == 0
+    y_norm = (y - y0) / np.where(sem_variacao, 1.0, variacao)
+    return np.where(sem_variacao, 1.0, y_norm)
+
+
+def _primeiro_indice(mascara):
+    # Índice do primeiro True em cada linha, ou -1 se não houver
+    return np.where(mascara.any(axis=-1), mascara.argmax(axis=-1), -1)
+
+
+# Tempo de subida (10% a 90%); NaN se a resposta não atinge os 90%
+def calc_rise_time(t, y):
+    y_norm = _normalizar(np.asarray(y, dtype=float))
+    i10 = _primeiro_indice(y_norm >= 0.1)
+    i90 = _primeiro_indice(y_norm >= 0.9)
+    return np.where((i10 >= 0) & (i90 >= 0), t[i90] - t[i10], np.nan)
+
+
+# Sobressinal (%) em relação ao valor final
+def calc_overshoot(y):
+    y = np.asarray(y, dtype=float)
+    final = y[..., -1]
+    positivo = final > 0
+    overshoot = (y.max(axis=-1) / np.where(positivo, final, 1.0) - 1) * 100
+    return np.where(positivo, np.maximum(overshoot, 0.0), 0.0)
+
+
+# Tempo de acomodação (5%): instante seguinte à última saída da faixa
+def calc_settling_time(t, y):
+    y_norm = _normalizar(np.asarray(y, dtype=float))
+    fora = np.abs(y_norm - 1) > FAIXA_ACOMODACAO
+    n = y_norm.shape[-1]
+    # Última amostra fora da faixa (busca do fim para o começo)
+    ultima_fora = n - 1 - _primeiro_indice(fora[..., ::-1])
+    idx = np.where(ultima_fora >= n, 0, np.minimum(ultima_fora + 1, n - 1))
+    return t[idx]
+
+
+# Instante do pico
+def calc_peak_time(t, y):
+    return t[np.asarray(y).argmax(axis=-1)]
+
+
+# Erro em regime (última amostra)
+def calc_steady_state_error(y, referencia=1.0):
+    return referencia - np.asarray(y)[..., -1]
+
+
+# Índices integrais do erro
+def calc_iae(t, y, referencia=1.0):
+    return np.trapezoid(np.abs(referencia - y), t, axis=-1)
+
+
+def calc_ise(t, y, referencia=1.0):
+    return np.trapezoid((referencia - y) ** 2, t, axis=-1)
+
+
+def calc_itae(t, y, referencia=1.0):
+    return np.trapezoid(t * np.abs(referencia - y), t, axis=-1)
+
+
+def metricas_lote(t, y, referencia=1.0):
+    """
+    Todas as métricas de um lote de respostas, como arrays (uma posição por resposta).
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return {
+        "rise_time": calc_rise_time(t, y),
+        "overshoot": calc_overshoot(y),
+        "settling_time": calc_settling_time(t, y),
+        "peak_time": calc_peak_time(t, y),
+        "steady_state_error": calc_steady_state_error(y, referencia),
+        "iae": calc_iae(t, y, referencia),
+        "ise": calc_ise(t, y, referencia),
+        "itae": calc_itae(t, y, referencia)
+    }
+
+
+def _para_json(valor):
+    valor = float(valor)
+    return valor if np.isfinite(valor) else None
+
+
+def calc_metricas(t, y, referencia=1.0):
+    """
+    Métricas de uma resposta (dicionário) ou de um lote (lista de dicionários).
+    Valores indefinidos (ex.: subida não atingida) são retornados como None.
+    """
+    metricas = metricas_lote(t, y, referencia)
+    if np.ndim(y) == 1:
+        return {nome: _para_json(v) for nome, v in metricas.items()}
+    return [
+        {nome: _para_json(v[i]) for nome, v in metricas.items()}
+        for i in range(len(y))
+    ]
@@ -0,0 +1,98 @@
+"""
+Otimização automática do lambda da sintonia IMC.
+
+A cada rodada, uma grade log-espaçada de candidatos é simulada de uma vez
+(vetorizada em resposta_degrau, com o passo de integração convergido). O
+intervalo de busca é então reduzido em torno do melhor candidato, até
+atingir a precisão ou MAX_RODADAS rodadas. A busca não depende do relógio,
+e os resultados são memorizados por (k, tau, theta, objetivo, ...), de modo
+que requisições repetidas retornam imediatamente o mesmo lambda.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from metricas import calc_iae, calc_itae, calc_overshoot, calc_settling_time
+from simulacao import passo_integracao, resposta_degrau
+from sintonia import sintonia_imc
+
+OBJETIVOS = ("iae", "itae", "settling_time")
+
+# Candidatos avaliados por rodada e número máximo de rodadas
+CANDIDATOS_POR_RODADA = 16
+MAX_RODADAS = 8
+
+
+def _avaliar(k, tau, theta, lambdas, objetivo, max_overshoot, t):
+    kp, ti, td = sintonia_imc(k, tau, theta, lambdas)
+    y = resposta_degrau(k, tau, theta, kp, ti, td, t)
+    if objetivo == "iae":
+        custo = calc_iae(t, y)
+    elif objetivo == "itae":
+        custo = calc_itae(t, y)
+    else:
+        custo = calc_settling_time(t, y)
+    # Restrição de sobressinal
+    overshoot = calc_overshoot(y)
+    custo = np.where(overshoot <= max_overshoot, custo, np.inf)
+    # Respostas instáveis ou divergentes
+    custo = np.where(np.all(np.isfinite(y), axis=1), custo, np.inf)
+    return custo, overshoot
+
+
+@lru_cache(maxsize=1024)
+def otimizar_lambda(k, tau, theta, objetivo="iae", lam_min=None, lam_max=None,
+                    max_overshoot=5.0, simulation_time=None, num_points=1000):
+    """
+    Busca o lambda em [lam_min, lam_max] que minimiza o objetivo escolhido
+    ("iae", "itae" ou "settling_time"), respeitando o sobressinal máximo (%).
+    Levanta ValueError se nenhum candidato atende à restrição. num_points é
+    o mínimo de pontos da grade das métricas. O dicionário retornado é
+    compartilhado pelo cache e não deve ser alterado.
+    """
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"Objetivo inválido. Use um de {', '.join(OBJETIVOS)}")
+    lam_min = lam_min if lam_min is not None else 0.01 * (tau + theta)
+    lam_max = lam_max if lam_max is not None else 3.0 * (tau + theta)
+    if not 0 < lam_min < lam_max:
+        raise ValueError("A faixa de lambda deve satisfazer 0 < lam_min < lam_max")
+    simulation_time = simulation_time if simulation_time is not None else 10.0 * (tau + theta)
+    # Métricas na grade do passo de integração (que só depende de tau e
+    # theta): com o derivativo ideal, a resposta tem degraus em múltiplos de
+    # theta, e uma grade mais grossa perderia os picos logo após eles
+    passo, _ = passo_integracao(tau, theta, simulation_time)
+    passos = math.ceil(simulation_time / passo - 1e-9)
+    t = np.linspace(0, simulation_time, max(num_points, passos + 1))
+
+    lo, hi = np.log(lam_min), np.log(lam_max)
+    melhor_lam, melhor_custo, melhor_overshoot = None, np.inf, None
+    avaliacoes = rodadas = 0
+    while rodadas < MAX_RODADAS:
+        grade = np.linspace(lo, hi, CANDIDATOS_POR_RODADA)
+        custo, overshoot = _avaliar(k, tau, theta, np.exp(grade), objetivo, max_overshoot, t)
+        avaliacoes += len(grade)
+        rodadas += 1
+        i = int(np.argmin(custo))
+        if custo[i] < melhor_custo:
+            melhor_lam, melhor_custo, melhor_overshoot = float(np.exp(grade[i])), float(custo[i]), float(overshoot[i])
+        if not np.isfinite(custo[i]):
+            break
+        # Reduzir o intervalo aos vizinhos do melhor candidato
+        lo, hi = grade[max(i - 1, 0)], grade[min(i + 1, len(grade) - 1)]
+        if hi - lo < 1e-4:
+            break
+
+    if melhor_lam is None:
+        raise ValueError(
+            f"Nenhum lambda em [{lam_min:.4g}, {lam_max:.4g}] atende ao sobressinal máximo de {max_overshoot}%"
+        )
+    return {
+        "lambda": melhor_lam,
+        "objective": objetivo,
+        "value": melhor_custo,
+        "overshoot": melhor_overshoot,
+        "bounds": [float(lam_min), float(lam_max)],
+        "evaluations": avaliacoes,
+        "rounds": rodadas
+    }
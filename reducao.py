@@ -0,0 +1,63 @@
+"""
+Redução de séries para o modo format=data dos endpoints.
+
+Em vez de renderizar um PNG, os endpoints podem retornar as séries para o
+gráfico ser desenhado no cliente. Cada série é reduzida a um número máximo
+de pontos pelo algoritmo Largest-Triangle-Three-Buckets (LTTB), que mantém
+picos, vales e degraus visíveis com poucas amostras.
+"""
+import numpy as np
+
+# Limites do número de pontos por série
+PONTOS_MIN = 3
+PONTOS_PADRAO = 1000
+
+
+def lttb(x, y, n_pontos):
+    """
+    Índices das amostras escolhidas pelo LTTB (sempre inclui a primeira e a última).
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < PONTOS_MIN:
+        return np.arange(n)
+
+    # Baldes entre a primeira e a última amostra
+    limites = np.floor(np.linspace(1, n - 1, n_pontos - 1)).astype(int)
+    # Média de cada balde (o ponto "seguinte" de cada triângulo), de uma vez
+    x_medio = np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+    y_medio = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+    x_medio = np.append(x_medio[1:], x[-1])
+    y_medio = np.append(y_medio[1:], y[-1])
+
+    indices = np.empty(n_pontos, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Área do triângulo (a, candidato, média do próximo balde), sem o fator 1/2
+        area = np.abs(
+            (x[a] - x_medio[i]) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (y_medio[i] - y[a])
+        )
+        a = inicio + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def _lista(v):
+    # JSON não representa NaN/infinito (respostas instáveis, por exemplo)
+    v = np.asarray(v, dtype=float)
+    return [float(e) if np.isfinite(e) else None for e in v]
+
+
+def serie(nome, x, y, n_pontos=PONTOS_PADRAO, painel=0):
+    """
+    Série reduzida pronta para JSON. painel indica o subgráfico (0 = superior).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if np.all(np.isfinite(y)):
+        idx = lttb(x, y, n_pontos)
+    else:
+        idx = np.unique(np.linspace(0, len(x) - 1, min(n_pontos, len(x))).astype(int))
+    return {"name": nome, "panel": painel, "x": _lista(x[idx]), "y": _lista(y[idx])}
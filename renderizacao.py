@@ -0,0 +1,238 @@
+"""
+Renderização dos gráficos com a API orientada a objetos do matplotlib.
+
+Cada tipo de gráfico tem uma figura pré-montada (eixos, títulos, grades e
+linhas de referência), criada uma vez por thread com Figure e
+FigureCanvasAgg, sem o estado global do pyplot. A cada renderização só os
+dados das linhas são atualizados, e a imagem é gerada em memória (PNG ou
+WebP), com a resolução definida por GRAFICOS_DPI.
+
+Séries longas são reduzidas pelo LTTB (reducao.py) a alguns pontos por
+pixel horizontal antes do desenho: o custo da rasterização no Agg cresce
+com o número de segmentos, e o resultado é visualmente o mesmo.
+"""
+import io
+import os
+import threading
+
+import numpy as np
+
+from reducao import lttb
+from instrumentacao import etapa
+
+FORMATOS_IMAGEM = ("png", "webp")
+TIPOS_MIDIA = {"png": "image/png", "webp": "image/webp"}
+
+# Backend não interativo, definido antes de o matplotlib ser importado (vale também nos workers)
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+GRAFICOS_DPI = float(os.environ.get("GRAFICOS_DPI", "100"))
+# Pontos desenhados por pixel horizontal do eixo; 0 desenha todas as amostras
+GRAFICOS_PONTOS_POR_PIXEL = float(os.environ.get("GRAFICOS_PONTOS_POR_PIXEL", "2"))
+
+
+def _matplotlib():
+    # Importado na primeira figura, e não na partida do servidor (o import leva centenas de ms)
+    import matplotlib
+    return matplotlib
+
+
+class ModeloGrafico:
+    """
+    Figura reutilizável: as linhas de cada painel ficam em um conjunto que
+    cresce sob demanda; as que sobram em uma renderização ficam ocultas.
+    """
+
+    def __init__(self, figsize, paineis=1, titulos=(), xlabel=None, ylabels=(), loc_legenda="best"):
+        _matplotlib()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.figura = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figura)
+        self.eixos = self.figura.subplots(paineis, 1, squeeze=False)[:, 0]
+        self.loc_legenda = loc_legenda
+        for i, eixo in enumerate(self.eixos):
+            eixo.grid(True)
+            if i < len(titulos) and titulos[i]:
+                eixo.set_title(titulos[i])
+            if i < len(ylabels) and ylabels[i]:
+                eixo.set_ylabel(ylabels[i])
+        if xlabel:
+            self.eixos[-1].set_xlabel(xlabel)
+        self._linhas = [[] for _ in self.eixos]
+        self._usadas = [0] * len(self.eixos)
+        self._marcas = []
+
+    def iniciar(self):
+        self._usadas = [0] * len(self.eixos)
+        for marca in self._marcas:
+            marca.remove()
+        self._marcas = []
+        return self
+
+    def linha(self, painel, x, y, cor, estilo="-", largura=1.5, alpha=1.0, rotulo=None):
+        linhas = self._linhas[painel]
+        i = self._usadas[painel]
+        if i == len(linhas):
+            linhas.append(self.eixos[painel].plot([], [])[0])
+        self._usadas[painel] += 1
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        limite = int(GRAFICOS_PONTOS_POR_PIXEL * self._largura_px(painel))
+        if 0 < limite < len(x) and np.all(np.isfinite(y)):
+            idx = lttb(x, y, limite)
+            x, y = x[idx], y[idx]
+        linhas[i].set_data(x, y)
+        linhas[i].update({
+            "color": cor,
+            "linestyle": estilo,
+            "linewidth": largura,
+            "alpha": alpha,
+            "label": rotulo if rotulo is not None else "_nolegend_",
+            "visible": True
+        })
+
+    def _largura_px(self, painel):
+        return self.eixos[painel].get_position().width * self.figura.get_figwidth() * GRAFICOS_DPI
+
+    def horizontal(self, painel, y, cor, estilo="--", rotulo=None):
+        self._marcas.append(self.eixos[painel].axhline(y, color=cor, linestyle=estilo, label=rotulo))
+
+    def vertical(self, painel, x, cor, estilo="--", rotulo=None):
+        self._marcas.append(self.eixos[painel].axvline(x, color=cor, linestyle=estilo, label=rotulo))
+
+    def renderizar(self, formato="png", dpi=None, titulo=None):
+        for painel, linhas in enumerate(self._linhas):
+            for linha in linhas[self._usadas[painel]:]:
+                linha.set_visible(False)
+                linha.set_label("_nolegend_")
+        if titulo is not None:
+            self.eixos[0].set_title(titulo)
+        for eixo in self.eixos:
+            eixo.relim(visible_only=True)
+            eixo.autoscale_view()
+            if any(not h.get_label().startswith("_") for h in eixo.get_lines() if h.get_visible()):
+                eixo.legend(loc=self.loc_legenda)
+            elif eixo.get_legend() is not None:
+                eixo.get_legend().remove()
+        buffer = io.BytesIO()
+        with etapa("savefig"):
+            self.figura.savefig(buffer, format=formato, dpi=dpi or GRAFICOS_DPI)
+        return buffer.getvalue()
+
+
+def _modelo_dados():
+    return ModeloGrafico((10, 6), 2, titulos=("Dados do Experimento",), xlabel="Tempo")
+
+
+def _modelo_identificacao():
+    return ModeloGrafico((12, 8), 2, xlabel="Tempo")
+
+
+def _modelo_resposta():
+    modelo = ModeloGrafico(
+        (12, 8), 2, titulos=("Comparação de Respostas - IMC vs ITAE",),
+        xlabel="Tempo (s)", ylabels=("Saída", "Erro")
+    )
+    modelo.eixos[0].axhline(1, color="gray", linestyle="--")
+    modelo.eixos[1].axhline(0, color="gray", linestyle="--")
+    return modelo
+
+
+def _modelo_varredura():
+    modelo = ModeloGrafico((12, 8), 1, xlabel="Tempo (s)", ylabels=("Saída",))
+    modelo.eixos[0].axhline(1, color="gray", linestyle="--")
+    return modelo
+
+
+def _modelo_filtros():
+    return ModeloGrafico(
+        (12, 8), 1, titulos=("Comparação de Diferentes Parâmetros de Filtro",),
+        xlabel="Tempo", ylabels=("Saída",)
+    )
+
+
+_CONSTRUTORES = {
+    "dados": _modelo_dados,
+    "identificacao": _modelo_identificacao,
+    "resposta": _modelo_resposta,
+    "varredura": _modelo_varredura,
+    "filtros": _modelo_filtros
+}
+
+# Figuras não são thread-safe: cada thread mantém os seus modelos
+_local = threading.local()
+
+
+def _modelo(tipo):
+    modelos = getattr(_local, "modelos", None)
+    if modelos is None:
+        modelos = _local.modelos = {}
+    if tipo not in modelos:
+        modelos[tipo] = _CONSTRUTORES[tipo]()
+    return modelos[tipo].iniciar()
+
+
+def grafico_dados(tempo, saida, entrada, formato="png", dpi=None):
+    modelo = _modelo("dados")
+    modelo.linha(0, tempo, saida, "b", rotulo="Saída")
+    modelo.linha(1, tempo, entrada, "r", rotulo="Entrada")
+    return modelo.renderizar(formato, dpi)
+
+
+def grafico_identificacao(t, y_original, y, entrada, resultado, metodo, y_modelo=None, formato="png", dpi=None):
+    """
+    Dados originais e suavizados com os pontos identificados; y_modelo é a
+    resposta do modelo ajustado (mínimos quadrados), quando houver.
+    """
+    y1, y2 = resultado["y1"], resultado["y2"]
+    modelo = _modelo("identificacao")
+    modelo.linha(0, t, y_original, "b", alpha=0.5, rotulo="Dados Originais")
+    modelo.linha(0, t, y, "r", rotulo="Dados Suavizados")
+    modelo.horizontal(0, y1, "g", rotulo=f"y1 ({y1:.2f})")
+    modelo.horizontal(0, y2, "m", rotulo=f"y2 ({y2:.2f})")
+    modelo.vertical(0, resultado["t1"], "g", estilo="-.")
+    modelo.vertical(0, resultado["t2"], "m", estilo="-.")
+    if y_modelo is not None:
+        fit = resultado["fit"]
+        modelo.linha(0, t, y_modelo, "k", largura=2, rotulo=f"Modelo ajustado (RMSE {fit['rmse']:.3g})")
+    modelo.linha(1, t, entrada, "k", rotulo="Entrada")
+    titulo = f"Identificação de Modelo - Método {metodo.replace('_', ' ').capitalize()}"
+    return modelo.renderizar(formato, dpi, titulo=titulo)
+
+
+def grafico_resposta(t1, y1, t2, y2, formato="png", dpi=None):
+    modelo = _modelo("resposta")
+    modelo.linha(0, t1, y1, "b", largura=2, rotulo="IMC")
+    modelo.linha(0, t2, y2, "r", largura=2, rotulo="ITAE")
+    modelo.linha(1, t1, 1 - y1, "b", largura=2, rotulo="Erro IMC")
+    modelo.linha(1, t2, 1 - y2, "r", largura=2, rotulo="Erro ITAE")
+    return modelo.renderizar(formato, dpi)
+
+
+def grafico_varredura(t, y, results, formato="png", dpi=None):
+    n_imc = sum(1 for r in results if r["method"] == "IMC")
+    cores = _matplotlib().colormaps["viridis"](np.linspace(0, 1, max(n_imc, 1)))
+    modelo = _modelo("varredura")
+    for i, r in enumerate(results):
+        if r["method"] == "IMC":
+            rotulo = f"IMC λ={r['lambda']:.3g}" if n_imc <= 10 else None
+            modelo.linha(0, t, y[i], cores[i], largura=1, rotulo=rotulo)
+        else:
+            modelo.linha(0, t, y[i], "r", estilo="--", largura=2, rotulo="ITAE" if i == n_imc else None)
+    return modelo.renderizar(formato, dpi, titulo=f"Varredura de Lambda - {n_imc} malhas IMC")
+
+
+def grafico_filtros(t, y_original, filtrados, recomendado=None, formato="png", dpi=None):
+    """
+    filtrados: lista de (janela, ordem, y); recomendado: (janela, ordem, y) ou None.
+    """
+    modelo = _modelo("filtros")
+    modelo.linha(0, t, y_original, "k", alpha=0.5, rotulo="Original")
+    ciclo = _matplotlib().rcParams["axes.prop_cycle"].by_key()["color"]
+    for i, (janela, ordem, y) in enumerate(filtrados):
+        modelo.linha(0, t, y, ciclo[i % len(ciclo)], rotulo=f"Janela={janela}, Ordem={ordem}")
+    if recomendado is not None:
+        janela, ordem, y = recomendado
+        modelo.linha(0, t, y, "k", estilo="--", largura=2, rotulo=f"Recomendado: Janela={janela}, Ordem={ordem}")
+    return modelo.renderizar(formato, dpi)
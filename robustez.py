@@ -0,0 +1,186 @@
+"""
+Robustez da malha PID + FOPDT no domínio da frequência.
+
+A função de malha aberta
+
+    L(jω) = C(jω)·k·e^(-jωθ)/(τjω + 1),  C(s) = Kp·(1 + 1/(Ti·s) + Td·s/(1 + Td·s/N))
+
+é avaliada de forma exata (o atraso é e^(-jωθ), sem aproximação de Padé)
+em uma grade logarítmica de frequências, vetorizada nas frequências e nos
+controladores: cada linha de uma matriz (M, n) é uma malha. Com N = 0 o
+derivativo é ideal, como em simulacao.py.
+
+Com ganho de malha Kp·k positivo, a fase de C fica em (-90°, 90°) e a da
+planta sem atraso em (-90°, 0°], e a fase total é calculada sem
+desenrolamento numérico: ∠C + ∠G - ωθ.
+
+Margens (menor valor entre todos os cruzamentos da grade):
+
+- ganho (GM): 1/|L| onde a fase cruza -180° (módulo 360°)
+- fase (PM): 180° + ∠L onde |L| cruza 1
+- Ms = max |1/(1 + L)| e Mt = max |L/(1 + L)|
+
+Os cruzamentos são interpolados linearmente em log ω entre os pontos da
+grade. Comparação com python-control (Padé de ordem 20) e benchmark:
+
+    python robustez.py
+"""
+import numpy as np
+
+# Pontos da grade de frequências e décadas além das constantes de tempo da malha
+PONTOS_FREQUENCIA_PADRAO = 1000
+DECADAS_EXTRAS = 2
+# Malhas avaliadas por bloco (limita a memória das matrizes (M, n))
+BLOCO_MALHAS = 256
+
+
+def grade_frequencias(tau, theta, ti, td=0.0, n_filtro=0.0, pontos=PONTOS_FREQUENCIA_PADRAO):
+    """
+    Grade logarítmica comum a todas as malhas, de DECADAS_EXTRAS décadas
+    abaixo da maior constante de tempo até DECADAS_EXTRAS acima da menor.
+    """
+    constantes = [np.ravel(np.asarray(c, dtype=float)) for c in (tau, theta, ti)]
+    tf = np.ravel(np.asarray(td, dtype=float) / np.where(np.asarray(n_filtro) > 0, n_filtro, np.inf))
+    constantes = np.concatenate(constantes + [tf])
+    constantes = constantes[np.isfinite(constantes) & (constantes > 0)]
+    if len(constantes) == 0:
+        constantes = np.array([1.0])
+    return np.logspace(
+        np.log10(1 / constantes.max()) - DECADAS_EXTRAS,
+        np.log10(1 / constantes.min()) + DECADAS_EXTRAS,
+        pontos
+    )
+
+
+def resposta_frequencia(k, tau, theta, kp, ti, td, w, n_filtro=0.0):
+    """
+    Retorna (L, fase) nas frequências w (n,): L complexo e fase contínua em
+    radianos. Os parâmetros podem ser escalares ou arrays (M,); o resultado
+    é (n,) ou (M, n).
+    """
+    w = np.asarray(w, dtype=float)
+    params = np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in (k, tau, theta, kp, ti, td, n_filtro)))
+    k, tau, theta, kp, ti, td, n_filtro = (p[..., None] for p in params)
+    s = 1j * w
+    filtrado = n_filtro > 0
+    derivativo = td * s / (1 + np.where(filtrado, td / np.where(filtrado, n_filtro, 1.0), 0.0) * s)
+    controlador = kp * (1 + 1 / (ti * s) + derivativo)
+    planta = k / (tau * s + 1)
+    fase = np.angle(controlador) + np.angle(planta) - w * theta
+    return controlador * planta * np.exp(-1j * w * theta), fase
+
+
+def _menor(valores, cruza):
+    # Menor valor entre os cruzamentos de cada linha e seu índice (inf e -1 sem cruzamento)
+    valores = np.where(cruza, valores, np.inf)
+    idx = valores.argmin(axis=-1)
+    menor = np.take_along_axis(valores, idx[..., None], axis=-1)[..., 0]
+    return menor, np.where(np.isfinite(menor), idx, -1)
+
+
+def margens(w, L, fase):
+    """
+    Margens de uma matriz L (M, n) com a fase contínua (M, n). Retorna um dict
+    de arrays (M,): gain_margin, phase_margin (graus), ms, mt e as frequências
+    phase_crossover, gain_crossover, ms_frequency. Margens sem cruzamento na
+    grade são inf e as frequências correspondentes, NaN.
+    """
+    log_w = np.log(w)
+    log_mag = np.log(np.abs(L))
+
+    # Cruzamentos de ganho: log|L| muda de sinal
+    g0, g1 = log_mag[..., :-1], log_mag[..., 1:]
+    cruza_ganho = (g0 >= 0) != (g1 >= 0)
+    frac = np.where(cruza_ganho, g0 / np.where(cruza_ganho, g0 - g1, 1.0), 0.0)
+    fase_c = fase[..., :-1] + frac * np.diff(fase, axis=-1)
+    pm, i_pm = _menor(180 + np.degrees(fase_c), cruza_ganho)
+    w_pm = np.exp(log_w[:-1] + frac * np.diff(log_w))
+
+    # Cruzamentos de fase: (fase + π)/2π passa por um inteiro
+    q = (fase + np.pi) / (2 * np.pi)
+    n0, n1 = np.floor(q[..., :-1]), np.floor(q[..., 1:])
+    cruza_fase = n0 != n1
+    nivel = np.maximum(n0, n1)
+    dq = np.diff(q, axis=-1)
+    frac = np.where(cruza_fase, (nivel - q[..., :-1]) / np.where(cruza_fase, dq, 1.0), 0.0)
+    mag_c = np.exp(g0 + frac * (g1 - g0))
+    gm, i_gm = _menor(1 / mag_c, cruza_fase)
+    w_gm = np.exp(log_w[:-1] + frac * np.diff(log_w))
+
+    sensibilidade = np.abs(1 / (1 + L))
+    complementar = np.abs(L / (1 + L))
+    i_ms = sensibilidade.argmax(axis=-1)
+
+    def no_cruzamento(freqs, idx):
+        valores = np.take_along_axis(freqs, np.maximum(idx, 0)[..., None], axis=-1)[..., 0]
+        return np.where(idx >= 0, valores, np.nan)
+
+    return {
+        "gain_margin": gm,
+        "phase_margin": pm,
+        "ms": sensibilidade.max(axis=-1),
+        "mt": complementar.max(axis=-1),
+        "phase_crossover": no_cruzamento(w_gm, i_gm),
+        "gain_crossover": no_cruzamento(w_pm, i_pm),
+        "ms_frequency": w[i_ms]
+    }
+
+
+def analisar(k, tau, theta, kp, ti, td, w, n_filtro=0.0, resposta=False):
+    """
+    Margens de M malhas (parâmetros escalares ou arrays (M,)) na grade w,
+    em blocos de BLOCO_MALHAS. Com resposta=True, inclui também L e a fase (M, n).
+    """
+    params = np.broadcast_arrays(*(np.atleast_1d(np.asarray(p, dtype=float)) for p in (k, tau, theta, kp, ti, td, n_filtro)))
+    m = len(params[0])
+    partes, respostas = [], []
+    for inicio in range(0, m, BLOCO_MALHAS):
+        bloco = [p[inicio:inicio + BLOCO_MALHAS] for p in params]
+        # Malhas com parâmetros não finitos (ITAE com theta = 0) resultam em NaN
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            L, fase = resposta_frequencia(*bloco[:6], w, n_filtro=bloco[6])
+            partes.append(margens(w, L, fase))
+        if resposta:
+            respostas.append((L, fase))
+    resultado = {nome: np.concatenate([p[nome] for p in partes]) for nome in partes[0]} if partes else {}
+    if resposta:
+        resultado["L"] = np.concatenate([r[0] for r in respostas])
+        resultado["phase"] = np.concatenate([r[1] for r in respostas])
+    return resultado
+
+
+if __name__ == "__main__":
+    import time
+    from control import tf, pade, series, margin
+    from sintonia import sintonia_imc, sintonia_itae
+
+    def margens_pade(k, tau, theta, kp, ti, td):
+        num_pade, den_pade = pade(theta, 20)
+        malha = series(tf([kp * td * ti, kp * ti, kp], [ti, 0]), tf(k, [tau, 1]), tf(num_pade, den_pade))
+        gm, pm, _, _ = margin(malha)
+        return gm, pm
+
+    print(f"{'modelo':<22}{'sintonia':<10}{'GM exata':>10}{'GM Padé':>10}{'PM exata':>10}{'PM Padé':>10}{'Ms':>8}")
+    for k, tau, theta in [(1.0, 10.0, 2.0), (2.5, 30.0, 8.0), (0.8, 5.0, 5.0)]:
+        for nome, (kp, ti, td) in (("IMC", sintonia_imc(k, tau, theta, 1.0)), ("ITAE", sintonia_itae(k, tau, theta))):
+            w = grade_frequencias(tau, theta, ti, td)
+            r = analisar(k, tau, theta, kp, ti, td, w)
+            gm_p, pm_p = margens_pade(k, tau, theta, kp, ti, td)
+            print(f"{str((k, tau, theta)):<22}{nome:<10}{r['gain_margin'][0]:>10.4f}{gm_p:>10.4f}"
+                  f"{r['phase_margin'][0]:>10.2f}{pm_p:>10.2f}{r['ms'][0]:>8.3f}")
+
+    # Lote: 2000 malhas IMC (modelos × lambdas) de uma vez
+    rng = np.random.default_rng(0)
+    k, tau, theta = rng.uniform(0.5, 3, 2000), rng.uniform(5, 50, 2000), rng.uniform(0.5, 20, 2000)
+    lam = rng.uniform(0.5, 20, 2000)
+    kp, ti, td = sintonia_imc(k, tau, theta, lam)
+    w = grade_frequencias(tau, theta, ti, td)
+    inicio = time.perf_counter()
+    analisar(k, tau, theta, kp, ti, td, w)
+    lote = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for i in range(20):
+        margens_pade(k[i], tau[i], theta[i], kp[i], ti[i], td[i])
+    pade_por_malha = (time.perf_counter() - inicio) / 20
+    print(f"\n2000 malhas × {len(w)} frequências: {lote * 1000:.1f} ms ({lote / 2000 * 1e6:.1f} µs por malha)")
+    print(f"python-control com Padé 20: {pade_por_malha * 1000:.1f} ms por malha")
@@ -0,0 +1,167 @@
+"""
+Sessões interativas de identificação por WebSocket.
+
+Uma sessão é aberta para um file_id e mantém os sinais do dataset em
+memória enquanto a conexão durar. O cliente envia os parâmetros a cada
+mudança (sliders da interface) e recebe só o resultado dos parâmetros
+mais recentes: atualizações que chegam enquanto um cálculo está em
+andamento substituem as anteriores ainda não calculadas, e um resultado
+que já foi superado por parâmetros novos é descartado em vez de enviado.
+
+O cálculo roda em uma thread do processo do servidor (e não no pool de
+execucao.py, que no modo "process" serializaria os sinais a cada
+atualização), com no máximo um cálculo em andamento por sessão.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+
+from cache_sinais import obter_filtro_recomendado, obter_sinais, obter_suavizado
+from identificacao import METODOS, ErroIdentificacao, identificar_sinais, simular_modelo
+from reducao import PONTOS_MIN, serie
+
+logger = logging.getLogger(__name__)
+
+# Sessões abertas ao mesmo tempo; as excedentes são recusadas
+SESSOES_MAX = int(os.environ.get("SESSOES_MAX", "32"))
+# Pontos por série nas curvas enviadas a cada atualização
+SESSAO_PONTOS_PADRAO = int(os.environ.get("SESSAO_PONTOS", "500"))
+
+_abertas = 0
+# abrir() roda em asyncio.to_thread e fechar() no event loop
+_lock_abertas = threading.Lock()
+
+
+class SessaoCheia(Exception):
+    """Limite de sessões abertas atingido."""
+
+
+class SessaoIdentificacao:
+    def __init__(self, file_id, max_points=SESSAO_PONTOS_PADRAO):
+        self.file_id = file_id
+        self.max_points = max(max_points, PONTOS_MIN)
+        self.t, self.y_original, self.entrada = obter_sinais(file_id)
+        self._pendente = None
+        self._descartadas = 0
+        self._nova = asyncio.Event()
+
+    def inicial(self):
+        """
+        Mensagem de abertura: curvas que não mudam com os parâmetros e o filtro recomendado.
+        """
+        return {
+            "type": "ready",
+            "file_id": self.file_id,
+            "samples": len(self.t),
+            "recommended_filter": obter_filtro_recomendado(self.file_id),
+            "series": [
+                serie("Dados Originais", self.t, self.y_original, self.max_points),
+                serie("Entrada", self.t, self.entrada, self.max_points, painel=1)
+            ]
+        }
+
+    def atualizar(self, mensagem):
+        """
+        Registra os parâmetros mais recentes. Os que ainda não foram calculados são descartados.
+        """
+        if self._pendente is not None:
+            self._descartadas += 1
+        self._pendente = mensagem
+        self._nova.set()
+
+    def _parametros(self, mensagem):
+        metodo = mensagem.get("metodo", "smith")
+        if metodo not in METODOS:
+            raise ErroIdentificacao("Método inválido. Use 'smith', 'sundaresan' ou 'least_squares'")
+        window_length = mensagem.get("window_length", 11)
+        polyorder = mensagem.get("polyorder", 3)
+        if mensagem.get("auto_filter"):
+            recomendado = obter_filtro_recomendado(self.file_id)
+            window_length = recomendado["window_length"]
+            polyorder = recomendado["polyorder"]
+        window_length, polyorder = int(window_length), int(polyorder)
+        if window_length % 2 == 0:
+            window_length += 1
+        window_length = max(window_length, 3)
+        if polyorder >= window_length:
+            polyorder = window_length - 1
+        return metodo, window_length, polyorder, float(mensagem.get("offset_percent", 15.0))
+
+    def _calcular(self, mensagem):
+        inicio = time.perf_counter()
+        metodo, window_length, polyorder, offset_percent = self._parametros(mensagem)
+        y = obter_suavizado(self.file_id, window_length, polyorder)
+        resultado = identificar_sinais(self.t, self.y_original, y, self.entrada, metodo, offset_percent)
+        series = [serie("Dados Suavizados", self.t, y, self.max_points)]
+        if "fit" in resultado:
+            fit = resultado["fit"]
+            y_modelo = simular_modelo(self.t, self.entrada, fit["k"], fit["tau"], fit["theta"], fit["y0"])
+            series.append(serie("Modelo ajustado", self.t, y_modelo, self.max_points))
+        return {
+            "type": "result",
+            **resultado,
+            "filter_params": {
+                "window_length": window_length,
+                "polyorder": polyorder,
+                "offset_percent": offset_percent
+            },
+            "series": series,
+            "elapsed_ms": (time.perf_counter() - inicio) * 1000
+        }
+
+    async def processar(self, enviar):
+        """
+        Calcula os parâmetros mais recentes e envia o resultado com enviar(mensagem),
+        até a tarefa ser cancelada.
+        """
+        while True:
+            await self._nova.wait()
+            self._nova.clear()
+            mensagem, self._pendente = self._pendente, None
+            if mensagem is None:
+                continue
+            seq = mensagem.get("seq")
+            try:
+                resposta = await asyncio.to_thread(self._calcular, mensagem)
+            except (ErroIdentificacao, ValueError, TypeError) as e:
+                resposta = {"type": "error", "detail": str(e)}
+            except Exception as e:
+                logger.error(f"Erro na sessão de identificação de {self.file_id}: {str(e)}")
+                resposta = {"type": "error", "detail": f"Erro ao identificar modelo: {str(e)}"}
+            if self._pendente is not None:
+                # Superado por parâmetros que chegaram durante o cálculo
+                self._descartadas += 1
+                continue
+            resposta["seq"] = seq
+            resposta["superseded"] = self._descartadas
+            self._descartadas = 0
+            await enviar(resposta)
+
+
+def abrir(file_id, max_points=SESSAO_PONTOS_PADRAO):
+    """
+    Abre uma sessão carregando os sinais do dataset. Chamar fechar() ao final.
+    """
+    global _abertas
+    with _lock_abertas:
+        if _abertas >= SESSOES_MAX:
+            raise SessaoCheia()
+        _abertas += 1
+    try:
+        return SessaoIdentificacao(file_id, max_points)
+    except Exception:
+        fechar()
+        raise
+
+
+def fechar():
+    global _abertas
+    with _lock_abertas:
+        _abertas -= 1
+
+
+def estatisticas():
+    with _lock_abertas:
+        return {"open": _abertas, "max_open": SESSOES_MAX}
@@ -0,0 +1,29 @@
+"""
+Regras de sintonia PID (IMC e ITAE) para modelos FOPDT.
+
+As funções aceitam escalares ou arrays NumPy (com broadcast), para que
+varreduras de lambda e lotes de modelos sejam sintonizados de uma vez.
+"""
+# Constantes da tabela ITAE (resposta ao degrau de referência)
+A, B, C, D, E, F = 0.965, -0.85, 0.796, -0.147, 0.308, 0.929
+
+
+def sintonia_imc(k, tau, theta, lam):
+    """
+    Retorna (Kp, Ti, Td) do PID IMC com lambda ajustável.
+    """
+    kp = (2*tau + theta) / (k * (2*lam + theta))
+    ti = tau + theta/2
+    td = (tau * theta) / (2*tau + theta)
+    return kp, ti, td
+
+
+def sintonia_itae(k, tau, theta):
+    """
+    Retorna (Kp, Ti, Td) do PID ITAE.
+    """
+    theta_tau = theta / tau
+    kp = (A / k) * (theta_tau ** B)
+    ti = tau * (C + D * theta_tau)
+    td = tau * E * (theta_tau ** F)
+    return kp, ti, td